@@ -0,0 +1,418 @@
+"""
+Audio properties (duration, bitrate, sample rate, channels) read from file
+headers, without decoding any audio.
+
+Files are memory-mapped and only the structures needed are parsed:
+
+- MP3: the Xing/Info or VBRI header of the first frame; without one, the
+  bitrate of a constant-bitrate file, or a walk over the frame headers
+- MP4/M4A: the mdhd atom of the sound track (mvhd as a fallback) and the
+  mp4a sample entry
+- WAV: the fmt and data chunks
+- FLAC: the STREAMINFO block
+
+Results for the whole library are stored in the audio_metadata table with the
+size and modification time of each file, so a scan only reads files that were
+added or changed since the previous one. Catalogue durations (typed in the
+spreadsheet) can then be compared with the measured ones.
+"""
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from app.db.queries import (
+    get_audio_metadata_to_read,
+    get_measured_song_durations,
+    prune_audio_metadata,
+    store_audio_metadata,
+)
+from app.playlists import duration_to_seconds
+
+# Parallel file reads during a scan (AUDIO_METADATA_WORKERS in .env)
+METADATA_WORKERS = int(os.getenv("AUDIO_METADATA_WORKERS", "8"))
+
+# Differences up to this many seconds are not reported (DURATION_TOLERANCE_SECONDS in .env)
+DURATION_TOLERANCE_SECONDS = int(os.getenv("DURATION_TOLERANCE_SECONDS", "2"))
+
+# Rows written to the database per transaction during a scan
+_STORE_BATCH = 500
+
+# How far into an MP3 file (after the ID3 tag) to look for the first frame
+_MP3_SYNC_SEARCH = 64 * 1024
+
+# kbit/s by [MPEG version 1 / 2 and 2.5][layer 1, 2, 3][bitrate index]
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+_MP3_VERSIONS = {0: 2.5, 2: 2, 3: 1}
+
+
+def _mp3_frame_header(data, offset: int) -> Optional[Dict]:
+    """Decode the 4-byte MPEG audio frame header at offset, or None if it is not one."""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version = _MP3_VERSIONS.get((b1 >> 3) & 3)
+    layer = 4 - ((b1 >> 1) & 3)
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+    if version is None or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if layer == 2 or version == 1 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return {
+        "version": version,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channels": 1 if (b3 >> 6) == 3 else 2,
+        "samples": samples,
+        "length": length,
+    }
+
+
+def _skip_id3v2(data) -> int:
+    """Offset of the first byte after any ID3v2 tags at the start of the file."""
+    offset = 0
+    while data[offset:offset + 3] == b"ID3" and offset + 10 <= len(data):
+        flags = data[offset + 5]
+        size = 0
+        for byte in data[offset + 6:offset + 10]:
+            size = (size << 7) | (byte & 0x7F)
+        offset += 10 + size + (10 if flags & 0x10 else 0)
+    return offset
+
+
+def _read_mp3(data) -> Optional[Dict]:
+    start = _skip_id3v2(data)
+    end = len(data) - (128 if data[-128:-125] == b"TAG" else 0)
+
+    # First frame header followed by another one (a lone 0xFF 0xEx can be tag data)
+    offset, frame = start, None
+    limit = min(end, start + _MP3_SYNC_SEARCH)
+    while offset < limit:
+        offset = data.find(b"\xff", offset, limit)
+        if offset < 0:
+            return None
+        frame = _mp3_frame_header(data, offset)
+        if frame and (offset + frame["length"] >= end or _mp3_frame_header(data, offset + frame["length"])):
+            break
+        frame = None
+        offset += 1
+    if frame is None:
+        return None
+
+    info = {"format": "mp3", "sample_rate": frame["sample_rate"], "channels": frame["channels"]}
+    mono = frame["channels"] == 1
+    side_info = (17 if mono else 32) if frame["version"] == 1 else (9 if mono else 17)
+    xing = offset + 4 + side_info
+    frames = audio_bytes = None
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack_from(">I", data, xing + 4)[0]
+        field = xing + 8
+        if flags & 1:
+            frames = struct.unpack_from(">I", data, field)[0]
+            field += 4
+        if flags & 2:
+            audio_bytes = struct.unpack_from(">I", data, field)[0]
+    elif data[offset + 36:offset + 40] == b"VBRI":
+        audio_bytes, frames = struct.unpack_from(">II", data, offset + 36 + 10)
+
+    if frames:
+        duration = frames * frame["samples"] / frame["sample_rate"]
+        audio_bytes = audio_bytes or end - offset
+        info.update(duration=duration, bitrate=round(audio_bytes * 8 / duration) if duration else frame["bitrate"])
+        return info
+
+    # No VBR header: a constant bitrate file if the first frames agree,
+    # otherwise count the frames
+    position, bitrates, count = offset, set(), 0
+    while count < 10:
+        header = _mp3_frame_header(data, position)
+        if header is None:
+            break
+        bitrates.add(header["bitrate"])
+        position += header["length"]
+        count += 1
+    if len(bitrates) == 1:
+        info.update(duration=(end - offset) * 8 / frame["bitrate"], bitrate=frame["bitrate"])
+        return info
+
+    position, count = offset, 0
+    while position < end:
+        header = _mp3_frame_header(data, position)
+        if header is None or header["length"] <= 0:
+            break
+        position += header["length"]
+        count += 1
+    duration = count * frame["samples"] / frame["sample_rate"]
+    info.update(duration=duration, bitrate=round((position - offset) * 8 / duration) if duration else None)
+    return info
+
+
+def _mp4_atoms(data, start: int, end: int):
+    """Yield (type, payload start, atom end) for the atoms between start and end."""
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield kind, offset + header, min(offset + size, end)
+        offset += size
+
+
+def _mp4_child(data, start: int, end: int, kind: bytes):
+    for child, payload, child_end in _mp4_atoms(data, start, end):
+        if child == kind:
+            return payload, child_end
+    return None
+
+
+def _mp4_timed_duration(data, payload: int) -> Optional[tuple]:
+    """(timescale, duration) of an mvhd or mdhd atom."""
+    if data[payload] == 1:
+        timescale, duration = struct.unpack_from(">IQ", data, payload + 4 + 16)
+    else:
+        timescale, duration = struct.unpack_from(">II", data, payload + 4 + 8)
+    return (timescale, duration) if timescale else None
+
+
+def _read_mp4(data) -> Optional[Dict]:
+    moov = _mp4_child(data, 0, len(data), b"moov")
+    if moov is None:
+        return None
+    info = {"format": "mp4"}
+    timed = None
+    for kind, payload, end in _mp4_atoms(data, *moov):
+        if kind != b"trak":
+            continue
+        mdia = _mp4_child(data, payload, end, b"mdia")
+        hdlr = mdia and _mp4_child(data, *mdia, b"hdlr")
+        if not hdlr or data[hdlr[0] + 8:hdlr[0] + 12] != b"soun":
+            continue
+        mdhd = _mp4_child(data, *mdia, b"mdhd")
+        timed = mdhd and _mp4_timed_duration(data, mdhd[0])
+        stbl = _mp4_child(data, *mdia, b"minf")
+        stbl = stbl and _mp4_child(data, *stbl, b"stbl")
+        stsd = stbl and _mp4_child(data, *stbl, b"stsd")
+        if stsd:
+            # Sample entry after the stsd version/flags and entry count
+            entry = stsd[0] + 8
+            info["channels"] = struct.unpack_from(">H", data, entry + 8 + 16)[0]
+            info["sample_rate"] = struct.unpack_from(">I", data, entry + 8 + 24)[0] >> 16
+        break
+    if not timed:
+        mvhd = _mp4_child(data, *moov, b"mvhd")
+        timed = mvhd and _mp4_timed_duration(data, mvhd[0])
+    if not timed:
+        return None
+    timescale, duration = timed
+    info["duration"] = duration / timescale
+    mdat = _mp4_child(data, 0, len(data), b"mdat")
+    audio_bytes = (mdat[1] - mdat[0]) if mdat else len(data)
+    info["bitrate"] = round(audio_bytes * 8 / info["duration"]) if info["duration"] else None
+    return info
+
+
+def _read_wav(data) -> Optional[Dict]:
+    if data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    fmt = data_size = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk, size = struct.unpack_from("<4sI", data, offset)
+        if chunk == b"fmt ":
+            fmt = struct.unpack_from("<HHII", data, offset + 8)
+        elif chunk == b"data":
+            # Streams written on the fly may leave the size unset
+            data_size = min(size, len(data) - offset - 8)
+            break
+        offset += 8 + size + (size & 1)
+    if fmt is None or data_size is None or not fmt[3]:
+        return None
+    _, channels, sample_rate, byte_rate = fmt
+    return {
+        "format": "wav",
+        "duration": data_size / byte_rate,
+        "bitrate": byte_rate * 8,
+        "sample_rate": sample_rate,
+        "channels": channels,
+    }
+
+
+def _read_flac(data) -> Optional[Dict]:
+    start = _skip_id3v2(data)
+    if data[start:start + 4] != b"fLaC" or data[start + 4] & 0x7F != 0:
+        return None
+    streaminfo = start + 8
+    packed = struct.unpack_from(">Q", data, streaminfo + 10)[0]
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        return None
+    duration = total_samples / sample_rate
+    return {
+        "format": "flac",
+        "duration": duration,
+        "bitrate": round((len(data) - start) * 8 / duration),
+        "sample_rate": sample_rate,
+        "channels": channels,
+    }
+
+
+_READERS = {
+    ".mp3": _read_mp3,
+    ".m4a": _read_mp4,
+    ".mp4": _read_mp4,
+    ".wav": _read_wav,
+    ".flac": _read_flac,
+}
+
+
+def read_audio_info(path: str) -> Optional[Dict]:
+    """
+    Read the audio properties of a file from its headers.
+
+    Returns:
+        Dict with format, duration (seconds), bitrate (bit/s), sample_rate
+        and channels; None for an unsupported or unreadable file
+    """
+    reader = _READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        return None
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            try:
+                return reader(data)
+            except (struct.error, IndexError, ValueError, ZeroDivisionError):
+                return None
+
+
+def _read_row(root: str, path: str, size: int, mtime_ns: int) -> tuple:
+    error = None
+    try:
+        info = read_audio_info(os.path.join(root, path)) or {}
+        if not info:
+            error = "Unrecognised audio header"
+    except OSError as e:
+        info, error = {}, str(e)
+    return (
+        path, size, mtime_ns, info.get("format"), info.get("duration"), info.get("bitrate"),
+        info.get("sample_rate"), info.get("channels"), error,
+    )
+
+
+def scan_audio_metadata(
+    root: Optional[str] = None,
+    full: bool = False,
+    force: bool = False,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> Optional[Dict]:
+    """
+    Read the headers of the library files that are new or changed.
+
+    The library index and the catalogue file check are brought up to date
+    first, so the measured durations can be matched to catalogue songs.
+
+    Args:
+        root: Library root (defaults to MUSIC_LIBRARY_PATH)
+        full: List every library directory again
+        force: Read every file again, not only new or changed ones
+        workers: Number of parallel file reads
+        progress: Called as progress(fraction, message)
+
+    Returns:
+        Dict with the number of files read, the ones that could not be
+        parsed and the elapsed seconds; None when there is no library
+    """
+    # Imported here: library_integrity imports the queries this module uses
+    from app.library_integrity import check_catalogue_files
+
+    started = time.perf_counter()
+    check = check_catalogue_files(root=root, full=full, progress=progress)
+    if check is None:
+        return None
+
+    prune_audio_metadata()
+    to_read = get_audio_metadata_to_read(force=force)
+    unreadable, batch = 0, []
+    with ThreadPoolExecutor(max_workers=workers or METADATA_WORKERS) as pool:
+        futures = [pool.submit(_read_row, check["root"], *row) for row in to_read]
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            unreadable += row[-1] is not None
+            batch.append(row)
+            if len(batch) >= _STORE_BATCH:
+                store_audio_metadata(batch)
+                batch = []
+            if progress and done % 50 == 0:
+                progress(done / len(futures), f"Read {done} of {len(futures)} files")
+    store_audio_metadata(batch)
+
+    return {
+        "root": check["root"],
+        "read": len(to_read),
+        "unreadable": unreadable,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def get_duration_discrepancies(tolerance: Optional[int] = None) -> List[Dict]:
+    """
+    Catalogue songs whose spreadsheet duration is missing or differs from
+    the duration measured in their audio file by more than the tolerance.
+
+    Returns:
+        Dicts with music_ref, title, artist, path, the catalogue duration
+        text and seconds, the measured seconds and the difference (None when
+        the catalogue has no duration), largest differences first and
+        songs without a catalogue duration last
+    """
+    if tolerance is None:
+        tolerance = DURATION_TOLERANCE_SECONDS
+    discrepancies = []
+    for row in get_measured_song_durations():
+        catalogue_seconds = duration_to_seconds(row["duration"])
+        measured = row["measured_duration"]
+        difference = None if catalogue_seconds is None else round(measured - catalogue_seconds)
+        if difference is not None and abs(difference) <= tolerance:
+            continue
+        discrepancies.append(
+            {
+                "music_ref": row["music_ref"],
+                "title": row["title"],
+                "artist": row["artist"],
+                "path": row["path"],
+                "catalogue_duration": row["duration"],
+                "catalogue_seconds": catalogue_seconds,
+                "measured_seconds": round(measured),
+                "difference": difference,
+            }
+        )
+    discrepancies.sort(key=lambda d: (d["difference"] is None, -abs(d["difference"] or 0)))
+    return discrepancies
@@ -0,0 +1,163 @@
+"""
+Prefetching of the recommended songs of the exercise being edited, so that
+switching the preview between candidate songs starts playing at once.
+
+When a song of an exercise is picked or its audio player is loaded, the
+exercise's recommended tracks are registered with the audio server (their
+stream URLs are ready and their paths validated) and, in a small background
+thread pool, the parts a player reads first - the start of the file and its
+last bytes, where MP4 indexes and ID3v1 tags live - are pulled into the OS
+page cache. On Linux this is a posix_fadvise(WILLNEED)
+readahead hint, so nothing is copied into Python; elsewhere the bytes are
+read and discarded. The bytes warmed are bounded by PREFETCH_BUDGET_MB:
+once it is spent the least recently prefetched tracks are forgotten.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
+
+from app.audio_server import register_track
+from app.library_index import resolve_song_file
+
+# Parallel prefetches (PREFETCH_WORKERS in .env)
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))
+
+# Total bytes kept warm (PREFETCH_BUDGET_MB in .env)
+PREFETCH_BUDGET_BYTES = int(os.getenv("PREFETCH_BUDGET_MB", "64")) * 1024 * 1024
+
+# Bytes warmed at the start and at the end of each track
+HEAD_BYTES = 1024 * 1024
+TAIL_BYTES = 128 * 1024
+
+_READ_CHUNK = 256 * 1024
+
+_lock = threading.Lock()
+_executor = None
+# (path, mtime_ns) -> bytes warmed, oldest first
+_warmed: "OrderedDict[tuple, int]" = OrderedDict()
+_warmed_bytes = 0
+_pending = set()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        return _executor
+
+
+def _warm_ranges(size: int):
+    """(offset, length) ranges of a file of the given size to warm."""
+    if size <= HEAD_BYTES + TAIL_BYTES:
+        return [(0, size)]
+    return [(0, HEAD_BYTES), (size - TAIL_BYTES, TAIL_BYTES)]
+
+
+def warm_file(path: str) -> int:
+    """
+    Pull the start and end of a file into the page cache.
+
+    Returns:
+        The number of bytes warmed
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        ranges = _warm_ranges(size)
+        if hasattr(os, "posix_fadvise"):
+            for offset, length in ranges:
+                os.posix_fadvise(f.fileno(), offset, length, os.POSIX_FADV_WILLNEED)
+        else:
+            buffer = bytearray(_READ_CHUNK)
+            for offset, length in ranges:
+                f.seek(offset)
+                while length > 0:
+                    read = f.readinto(memoryview(buffer)[:min(length, _READ_CHUNK)])
+                    if not read:
+                        break
+                    length -= read
+    return sum(length for _, length in ranges)
+
+
+def _prefetch(key: tuple):
+    global _warmed_bytes
+    path = key[0]
+    try:
+        warmed = warm_file(path)
+    except OSError:
+        warmed = None
+    evicted = []
+    with _lock:
+        _pending.discard(key)
+        if warmed is None:
+            return
+        # Forget the oldest tracks to stay within the budget
+        while _warmed and _warmed_bytes + warmed > PREFETCH_BUDGET_BYTES:
+            (old_path, _), old_bytes = _warmed.popitem(last=False)
+            _warmed_bytes -= old_bytes
+            evicted.append(old_path)
+        _warmed[key] = warmed
+        _warmed_bytes += warmed
+    for old_path in evicted:
+        register_track(old_path, prefetched=False)
+    register_track(path, prefetched=True)
+
+
+def prefetch_tracks(paths: Iterable[str]) -> int:
+    """
+    Register tracks with the audio server and warm them in the background.
+
+    Tracks already warm are only marked as recently used. Returns at once.
+
+    Returns:
+        The number of tracks queued for warming
+    """
+    queued = 0
+    for path in paths:
+        if register_track(path) is None:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        key = (path, stat.st_mtime_ns)
+        expected = sum(length for _, length in _warm_ranges(stat.st_size))
+        with _lock:
+            if key in _warmed:
+                _warmed.move_to_end(key)
+                continue
+            if key in _pending or expected > PREFETCH_BUDGET_BYTES:
+                continue
+            _pending.add(key)
+        _get_executor().submit(_prefetch, key)
+        queued += 1
+    return queued
+
+
+def prefetch_song_previews(songs) -> int:
+    """
+    Prefetch the audio files of catalogue songs (e.g. the recommended songs
+    of the exercise being edited). Files are found through the library index.
+
+    Returns:
+        The number of tracks queued for warming
+    """
+    paths = []
+    for song in songs:
+        path = resolve_song_file(song)
+        if path and path not in paths:
+            paths.append(path)
+    return prefetch_tracks(paths)
+
+
+def get_prefetch_stats() -> Dict[str, int]:
+    """Tracks and bytes currently counted as warm, and prefetches in flight."""
+    with _lock:
+        return {
+            "tracks": len(_warmed),
+            "bytes": _warmed_bytes,
+            "budget_bytes": PREFETCH_BUDGET_BYTES,
+            "pending": len(_pending),
+        }
@@ -0,0 +1,379 @@
+"""
+Sidecar HTTP server streaming music library files to the audio player.
+
+st.audio(file_path) reads the whole file into the Streamlit server's memory
+and sends it through its media file manager on that rerun. Instead, the
+player is given the URL of this server, which runs in a daemon thread of the
+Streamlit process and serves library files with HTTP Range support (so the
+browser fetches only what it plays and can seek) using zero-copy
+os.sendfile. Memory use stays flat however many previews are playing.
+
+Tracks can be registered ahead of playback (see app/audio_prefetch.py), which
+resolves and validates their paths once, and the time to first byte of every
+preview is recorded, split by whether the track had been prefetched.
+
+URLs use the host the browser reached the app on, so previews work from
+other machines when the server listens on all interfaces
+(AUDIO_SERVER_HOST=0.0.0.0). When it listens on loopback only, the default,
+browsers on other machines are given no URL and the player falls back to
+st.audio.
+
+Only audio files inside MUSIC_LIBRARY_PATH are served, and each URL carries
+an HMAC signature made with a per-process secret, so the server cannot be
+used to read arbitrary files.
+"""
+import hashlib
+import hmac
+import mimetypes
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from app.library_index import AUDIO_EXTENSIONS
+
+# Interface and port to listen on (AUDIO_SERVER_HOST / AUDIO_SERVER_PORT in .env);
+# another free port is used when this one is taken
+SERVER_HOST = os.getenv("AUDIO_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("AUDIO_SERVER_PORT", "8601"))
+
+# URL the browser uses to reach the server, e.g. behind a reverse proxy
+# (AUDIO_SERVER_PUBLIC_URL in .env); defaults to http://<host>:<port>, with
+# the host the browser reached the app on
+PUBLIC_URL = os.getenv("AUDIO_SERVER_PUBLIC_URL")
+
+# Set AUDIO_SERVER_ENABLED=0 in .env to hand files to st.audio instead
+SERVER_ENABLED = os.getenv("AUDIO_SERVER_ENABLED", "1") != "0"
+
+# Bytes per sendfile call, or per read when sendfile is not available
+_CHUNK_SIZE = 1024 * 1024
+
+# The first chunk is small so the time to first byte is measured accurately
+_FIRST_CHUNK_SIZE = 64 * 1024
+
+# Registered tracks kept, most recently used first out
+_REGISTRY_SIZE = 2048
+
+# Time-to-first-byte samples kept per kind (prefetched or cold)
+_TTFB_SAMPLES = 500
+
+# Interfaces that only accept connections from this machine, and that accept them from anywhere
+_LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+_WILDCARD_HOSTS = ("0.0.0.0", "::", "")
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+_secret = secrets.token_bytes(32)
+_lock = threading.Lock()
+_server = None
+_base_url = None
+# Relative URL path -> {"path": real path, "prefetched": bool}
+_registry: "OrderedDict[str, Dict]" = OrderedDict()
+_ttfb = {True: deque(maxlen=_TTFB_SAMPLES), False: deque(maxlen=_TTFB_SAMPLES)}
+
+mimetypes.add_type("audio/mp4", ".m4a")
+mimetypes.add_type("audio/flac", ".flac")
+
+
+def _signature(relative_path: str) -> str:
+    return hmac.new(_secret, relative_path.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def _percentile(samples, fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def get_preview_metrics() -> Dict[str, Dict]:
+    """
+    Time to first byte of recent previews.
+
+    Returns:
+        {"prefetched": {...}, "cold": {...}}, each with the number of
+        requests and the p50 and p95 in milliseconds (None without samples)
+    """
+    metrics = {}
+    for name, prefetched in (("prefetched", True), ("cold", False)):
+        with _lock:
+            samples = list(_ttfb[prefetched])
+        metrics[name] = {
+            "requests": len(samples),
+            "p50_ms": _percentile(samples, 0.50),
+            "p95_ms": _percentile(samples, 0.95),
+        }
+    return metrics
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header into an inclusive (start, end).
+
+    Returns:
+        None for a missing, malformed or multi-range header (the whole file
+        is sent), or (start, end); start > end means unsatisfiable
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length else (size, size - 1)
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+class _AudioRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "LSBAudio/1.0"
+
+    def log_message(self, format, *args):
+        # Browsers issue many range requests while seeking; keep the console quiet
+        pass
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _resolve(self) -> Optional[Tuple[str, bool]]:
+        """(real path, prefetched) of the requested track, or None if it may not be served."""
+        url = urlsplit(self.path)
+        if not url.path.startswith("/library/"):
+            return None
+        relative = unquote(url.path[len("/library/"):])
+        signature = parse_qs(url.query).get("sig", [""])[0]
+        if not hmac.compare_digest(signature, _signature(relative)):
+            return None
+        with _lock:
+            entry = _registry.get(relative)
+        if entry is not None:
+            return entry["path"], entry["prefetched"]
+        path = _library_path(self.server.library_root, os.path.join(self.server.library_root, relative))
+        return (path, False) if path else None
+
+    def _send_empty(self, status: HTTPStatus, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve(self, send_body: bool):
+        started = time.perf_counter()
+        resolved = self._resolve()
+        if resolved is None:
+            self._send_empty(HTTPStatus.NOT_FOUND)
+            return
+        path, prefetched = resolved
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self._send_empty(HTTPStatus.NOT_FOUND)
+            return
+
+        with f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send_empty(HTTPStatus.NOT_MODIFIED, [("ETag", etag)])
+                return
+
+            byte_range = parse_range(self.headers.get("Range"), size)
+            if_range = self.headers.get("If-Range")
+            if if_range and if_range != etag:
+                # The file changed since the client cached its first part
+                byte_range = None
+            if byte_range is not None and byte_range[0] > byte_range[1]:
+                self._send_empty(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, [("Content-Range", f"bytes */{size}")])
+                return
+
+            start, end = byte_range or (0, size - 1)
+            length = max(end - start + 1, 0)
+            self.send_response(HTTPStatus.PARTIAL_CONTENT if byte_range else HTTPStatus.OK)
+            self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", formatdate(stat.st_mtime, usegmt=True))
+            self.send_header("Cache-Control", "private, max-age=3600")
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.end_headers()
+            if not send_body or not length:
+                return
+            def first_byte_sent():
+                with _lock:
+                    _ttfb[prefetched].append((time.perf_counter() - started) * 1000)
+
+            try:
+                self._send_file(f, start, length, first_byte_sent)
+            except (BrokenPipeError, ConnectionResetError):
+                # The player closes connections when seeking or pausing
+                self.close_connection = True
+
+    def _send_file(self, f, offset: int, length: int, first_byte_sent=None):
+        """Copy length bytes from offset to the socket, in the kernel where possible."""
+        self.wfile.flush()
+        chunk_size = _FIRST_CHUNK_SIZE
+        if hasattr(os, "sendfile"):
+            try:
+                while length > 0:
+                    sent = os.sendfile(self.connection.fileno(), f.fileno(), offset, min(length, chunk_size))
+                    if sent == 0:
+                        break
+                    if first_byte_sent and chunk_size == _FIRST_CHUNK_SIZE:
+                        first_byte_sent()
+                    chunk_size = _CHUNK_SIZE
+                    offset += sent
+                    length -= sent
+                return
+            except OSError as e:
+                if isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                    raise
+                # sendfile not supported for this file or socket: copy below
+        f.seek(offset)
+        while length > 0:
+            chunk = f.read(min(length, chunk_size))
+            if not chunk:
+                break
+            self.wfile.write(chunk)
+            if first_byte_sent and chunk_size == _FIRST_CHUNK_SIZE:
+                first_byte_sent()
+            chunk_size = _CHUNK_SIZE
+            length -= len(chunk)
+
+
+def _library_path(library_root: str, file_path: str) -> Optional[str]:
+    """Real path of an audio file inside the library, or None."""
+    root = os.path.realpath(library_root)
+    path = os.path.realpath(file_path)
+    if not path.startswith(root + os.sep) or os.path.splitext(path)[1].lower() not in AUDIO_EXTENSIONS:
+        return None
+    return path
+
+
+def ensure_audio_server(library_root: Optional[str] = None) -> Optional[str]:
+    """
+    Start the audio server for this process if it is not running yet.
+
+    Returns:
+        The base URL the browser should use, or None when the server is
+        disabled, there is no music library, or it could not be started
+    """
+    global _server, _base_url
+    if not SERVER_ENABLED:
+        return None
+    library_root = library_root or os.getenv("MUSIC_LIBRARY_PATH")
+    if not library_root or not os.path.isdir(library_root):
+        return None
+
+    with _lock:
+        if _server is not None:
+            _server.library_root = os.path.abspath(library_root)
+            return _base_url
+        for port in (SERVER_PORT, 0):
+            try:
+                server = ThreadingHTTPServer((SERVER_HOST, port), _AudioRequestHandler)
+                break
+            except OSError as e:
+                print(f"Audio server could not listen on {SERVER_HOST}:{port}: {e}")
+        else:
+            return None
+        server.daemon_threads = True
+        server.library_root = os.path.abspath(library_root)
+        threading.Thread(target=server.serve_forever, name="audio-server", daemon=True).start()
+
+        host = "localhost" if SERVER_HOST in ("127.0.0.1", "0.0.0.0", "") else SERVER_HOST
+        _server = server
+        _base_url = (PUBLIC_URL or f"http://{host}:{server.server_address[1]}").rstrip("/")
+        return _base_url
+
+
+def _browser_base_url(base_url: str, request_host: Optional[str]) -> Optional[str]:
+    """
+    Base URL for a browser that reached the app at request_host (its Host
+    header), or None when the server cannot be reached from that browser.
+    """
+    if PUBLIC_URL or not request_host:
+        return base_url
+    hostname = urlsplit(f"//{request_host}").hostname
+    if not hostname:
+        return base_url
+    if SERVER_HOST in _WILDCARD_HOSTS:
+        host = f"[{hostname}]" if ":" in hostname else hostname
+        return f"http://{host}:{urlsplit(base_url).port}"
+    if SERVER_HOST in _LOOPBACK_HOSTS and hostname not in _LOOPBACK_HOSTS:
+        # Listening on loopback only: a browser on another machine cannot connect
+        return None
+    return base_url
+
+
+def register_track(file_path: str, prefetched: Optional[bool] = None,
+                   request_host: Optional[str] = None) -> Optional[str]:
+    """
+    Register a library file with the audio server and get its stream URL.
+
+    Args:
+        file_path: Audio file inside MUSIC_LIBRARY_PATH
+        prefetched: Record whether the file was prefetched (kept as is when None)
+        request_host: Host header of the browser's request to the app, used
+            as the URL host (defaults to the server's host)
+
+    Returns:
+        The URL, or None when the file is outside the library or the server
+        is not available or not reachable from the browser
+    """
+    library_root = os.getenv("MUSIC_LIBRARY_PATH")
+    base_url = ensure_audio_server(library_root)
+    if base_url is None:
+        return None
+    base_url = _browser_base_url(base_url, request_host)
+    if base_url is None:
+        return None
+    path = _library_path(library_root, file_path)
+    if path is None:
+        return None
+    relative = os.path.relpath(path, os.path.realpath(library_root)).replace(os.sep, "/")
+    with _lock:
+        entry = _registry.pop(relative, None) or {"path": path, "prefetched": False}
+        if prefetched is not None:
+            entry["prefetched"] = prefetched
+        _registry[relative] = entry
+        while len(_registry) > _REGISTRY_SIZE:
+            _registry.popitem(last=False)
+    return f"{base_url}/library/{quote(relative)}?sig={_signature(relative)}"
+
+
+def audio_stream_url(file_path: str, request_host: Optional[str] = None) -> Optional[str]:
+    """
+    URL streaming a library file through the audio server, or None when the
+    file is outside the library or the server is not available or not
+    reachable from the browser that sent request_host.
+    """
+    return register_track(file_path, request_host=request_host)
+
+
+def stop_audio_server():
+    """Stop the audio server if it is running."""
+    global _server, _base_url
+    with _lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = _base_url = None
+            _registry.clear()
@@ -0,0 +1,22 @@
+"""
+Benchmark suite for the LSB Music App.
+
+Times every public query function in app/db/queries.py, the catalogue
+loader and the exporters against synthetic catalogues of several sizes
+(see app/synthetic_data.py), and reports latency percentiles and
+throughput as JSON. Run it with app/scripts/run_benchmarks.py, and check
+a run against a saved baseline with app/scripts/benchmark_baseline.py.
+The rerun latency of the Streamlit app itself is measured by ui_reruns.py
+(app/scripts/run_ui_benchmarks.py), and the session store under concurrent
+facilitators by load_test.py (app/scripts/run_load_test.py).
+"""
+
+from .runner import get_benchmarks, register_benchmark, run_benchmarks, uncovered_query_functions, write_results
+
+__all__ = [
+    "get_benchmarks",
+    "register_benchmark",
+    "run_benchmarks",
+    "uncovered_query_functions",
+    "write_results",
+]
@@ -0,0 +1,177 @@
+"""
+Named benchmark baselines and regression checks against them.
+
+A baseline is a saved results file (as written by run_benchmarks) kept in
+BASELINE_DIR under a name such as "main" or "before-refactor". A new run is
+compared case by case with a baseline on one latency metric (p50 by
+default). A case counts as a regression only when it is both slower by
+more than the relative tolerance and by more than an absolute floor:
+sub-millisecond queries jitter by tens of percent between runs, and a
+relative threshold alone would flag them all the time.
+
+Any results file with a "results" list of {"name", "scale", <metric>}
+entries can be compared, so other harnesses can reuse the store.
+"""
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Where baselines are saved (BENCHMARK_BASELINE_DIR in .env)
+BASELINE_DIR = Path(
+    os.getenv("BENCHMARK_BASELINE_DIR") or Path(__file__).parent.parent.parent / "data" / "benchmarks" / "baselines"
+)
+
+# Relative slowdown tolerated as noise (BENCHMARK_TOLERANCE in .env; 0.25 = 25 %)
+DEFAULT_TOLERANCE = float(os.getenv("BENCHMARK_TOLERANCE", "0.25"))
+
+# Slowdowns below this many milliseconds are never regressions
+DEFAULT_MIN_DELTA_MS = float(os.getenv("BENCHMARK_MIN_DELTA_MS", "1"))
+
+METRICS = ("p50_ms", "p95_ms", "mean_ms", "min_ms")
+
+# Comparison statuses
+STATUS_OK = "ok"
+STATUS_REGRESSION = "regression"
+STATUS_IMPROVEMENT = "improvement"
+STATUS_NEW = "new"            # Only in the new run
+STATUS_MISSING = "missing"    # Only in the baseline
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def baseline_path(name: str) -> Path:
+    """Path of a named baseline; names are letters, digits, '.', '_' and '-'."""
+    if not _NAME_RE.match(name):
+        raise ValueError(f"Invalid baseline name: {name!r}")
+    return BASELINE_DIR / f"{name}.json"
+
+
+def save_baseline(results: Dict, name: str) -> Path:
+    """Save benchmark results as a named baseline, replacing any previous one."""
+    path = baseline_path(name)
+    os.makedirs(path.parent, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    return path
+
+
+def load_results(path) -> Dict:
+    """Load a results file."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_baseline(name: str) -> Optional[Dict]:
+    """Load a named baseline, or None if there is none by that name."""
+    path = baseline_path(name)
+    return load_results(path) if path.exists() else None
+
+
+def list_baselines() -> List[Dict]:
+    """Saved baselines with when and on which commit they were measured, by name."""
+    baselines = []
+    for path in sorted(BASELINE_DIR.glob("*.json")):
+        try:
+            results = load_results(path)
+        except (OSError, ValueError):
+            continue
+        baselines.append(
+            {
+                "name": path.stem,
+                "created_at": results.get("created_at"),
+                "commit": results.get("commit"),
+                "scales": list(results.get("scales", {})),
+                "cases": len(results.get("results", [])),
+            }
+        )
+    return baselines
+
+
+def environment_differences(baseline: Dict, current: Dict) -> List[str]:
+    """Environment fields (Python, SQLite, machine...) that differ between two runs."""
+    before, after = baseline.get("environment", {}), current.get("environment", {})
+    return [
+        f"{key}: {before.get(key)} -> {after.get(key)}"
+        for key in sorted(set(before) | set(after))
+        if before.get(key) != after.get(key)
+    ]
+
+
+def compare_results(
+    baseline: Dict,
+    current: Dict,
+    tolerance: float = DEFAULT_TOLERANCE,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+    metric: str = "p50_ms",
+) -> List[Dict]:
+    """
+    Compare a run with a baseline, case by case.
+
+    Args:
+        tolerance: Relative change tolerated as noise (0.25 = 25 %)
+        min_delta_ms: Absolute change in milliseconds always tolerated
+        metric: Latency field compared
+
+    Returns:
+        One dict per (case, scale) in either run, in baseline order then new
+        cases: name, scale, baseline and current values of the metric,
+        relative change (None when a side is missing) and status
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {', '.join(METRICS)}")
+    current_by_key = {(r["name"], r["scale"]): r for r in current.get("results", [])}
+    rows, seen = [], set()
+    for before in baseline.get("results", []):
+        key = (before["name"], before["scale"])
+        seen.add(key)
+        after = current_by_key.get(key)
+        row = {"name": key[0], "scale": key[1], "baseline": before.get(metric), "current": None, "change": None}
+        if after is None or after.get(metric) is None or before.get(metric) is None:
+            row["status"] = STATUS_MISSING
+            if after is not None:
+                row["current"] = after.get(metric)
+            rows.append(row)
+            continue
+        row["current"] = after[metric]
+        delta = row["current"] - row["baseline"]
+        row["change"] = delta / row["baseline"] if row["baseline"] else None
+        if abs(delta) <= min_delta_ms or (row["change"] is not None and abs(row["change"]) <= tolerance):
+            row["status"] = STATUS_OK
+        else:
+            row["status"] = STATUS_REGRESSION if delta > 0 else STATUS_IMPROVEMENT
+        rows.append(row)
+    for key, after in current_by_key.items():
+        if key not in seen:
+            rows.append(
+                {"name": key[0], "scale": key[1], "baseline": None, "current": after.get(metric),
+                 "change": None, "status": STATUS_NEW}
+            )
+    return rows
+
+
+def format_comparison(rows: List[Dict], metric: str = "p50_ms", only_changes: bool = False) -> str:
+    """Render a comparison as a text table, regressions marked with '!!'."""
+    markers = {STATUS_REGRESSION: "!!", STATUS_IMPROVEMENT: "++", STATUS_NEW: "new", STATUS_MISSING: "gone"}
+    unit = metric.replace("_ms", "")
+    lines = [f"     {'case':<44} {'scale':<7} {'base ' + unit:>12} {'new ' + unit:>12} {'change':>9}"]
+    for row in rows:
+        if only_changes and row["status"] == STATUS_OK:
+            continue
+        base = f"{row['baseline']:.3f}" if row["baseline"] is not None else "-"
+        new = f"{row['current']:.3f}" if row["current"] is not None else "-"
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+        lines.append(
+            f"{markers.get(row['status'], ''):<5}{row['name']:<44} {row['scale']:<7} {base:>12} {new:>12} {change:>9}"
+        )
+    return "\n".join(lines)
+
+
+def summarise_comparison(rows: List[Dict]) -> Dict[str, int]:
+    """Number of cases per comparison status."""
+    counts = {status: 0 for status in (STATUS_OK, STATUS_REGRESSION, STATUS_IMPROVEMENT, STATUS_NEW, STATUS_MISSING)}
+    for row in rows:
+        counts[row["status"]] += 1
+    return counts
@@ -0,0 +1,530 @@
+"""
+The benchmark cases: every public query function, the catalogue loader and
+the exporters.
+
+Read cases rotate through the sampled exercises, songs and sessions of the
+fixture so they do not hit the same rows every time. Write cases write
+realistic batches (re-inserting 1000 catalogue rows, saving one session);
+cases that consume something (deleting, archiving or restoring a session,
+cancelling a job) get a fresh one from their setup, outside the clock.
+"""
+import os
+
+from app.benchmarks.runner import register_benchmark
+from app.data_export import export_catalogue, export_sessions_data
+from app.data_loader import load_lsb_catalogue
+from app.db import schema
+from app.db.queries import (
+    add_new_exercise,
+    apply_library_scan,
+    archive_sessions,
+    clone_session,
+    count_sessions,
+    create_job,
+    delete_session,
+    fail_interrupted_jobs,
+    get_all_exercise_categories,
+    get_all_exercises,
+    get_all_sessions,
+    get_all_songs,
+    get_audio_metadata_generation,
+    get_audio_metadata_to_read,
+    get_catalogue_generation,
+    get_exercise_phase_by_id,
+    get_exercise_phases_by_ids,
+    get_exercises_by_category,
+    get_exercises_by_cimeb_status,
+    get_exercises_by_phase,
+    get_exercises_by_song_name,
+    get_job,
+    get_library_dirs,
+    get_library_files,
+    get_library_state,
+    get_measured_song_durations,
+    get_music_by_ref,
+    get_music_for_exercise,
+    get_next_exercise_id,
+    get_playable_song_counts,
+    get_recent_jobs,
+    get_session_by_id,
+    get_sessions_by_date_range,
+    get_sessions_by_tags,
+    get_sessions_page,
+    get_song_file_check_state,
+    get_song_file_problems,
+    get_song_file_status_counts,
+    get_songs_by_refs,
+    get_songs_for_exercise,
+    get_songs_for_exercises,
+    get_tag_counts,
+    get_template_sessions,
+    insert_exercise_categories,
+    insert_exercise_music_mappings,
+    insert_exercises,
+    insert_musics,
+    instantiate_template,
+    parse_session_tags,
+    prune_audio_metadata,
+    rebuild_session_tags,
+    request_job_cancel,
+    restore_archived_session,
+    save_session,
+    set_session_template,
+    store_audio_metadata,
+    store_song_file_statuses,
+    update_job,
+)
+from app.db.schema import get_db_connection
+from app.exporter import export_playlist
+from app.library_integrity import PLAYABLE_STATUSES, PROBLEM_STATUSES
+from app.scripts.export_session_to_word import export_session_to_word
+from app.synthetic_data import generate_sessions, write_catalogue_workbook
+
+# Rows per batch in the bulk insert cases
+BATCH_SIZE = 1000
+
+# archive_sessions() age that only catches the sessions aged by _age_session
+_ARCHIVE_DAYS = 100 * 365
+
+
+def _pick(items, run):
+    return items[run % len(items)]
+
+
+def _batch(items, run, size=BATCH_SIZE):
+    start = (run * size) % max(len(items), 1)
+    return items[start:start + size] or items[:size]
+
+
+def _clone(fixture, run, label):
+    """A new session copied from a sampled one, for cases that consume a session."""
+    success, message, session_id = clone_session(_pick(fixture["session_ids"], run), f"Benchmark {label} {run}")
+    if not success:
+        raise RuntimeError(f"Could not clone a session for the {label} benchmark: {message}")
+    return session_id
+
+
+def _age_session(session_id):
+    """Date a session's last update far in the past, so archive_sessions() picks it alone."""
+    conn = get_db_connection()
+    try:
+        conn.execute("UPDATE sessions SET updated_at = '1900-01-01T00:00:00' WHERE id = ?", (session_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _job_ids(fixture):
+    cache = fixture["cache"]
+    if "job_ids" not in cache:
+        cache["job_ids"] = [create_job("benchmark", {"number": number}) for number in range(20)]
+    return cache["job_ids"]
+
+
+# Catalogue
+
+
+@register_benchmark("queries.insert_exercise_categories", "catalogue")
+def _insert_exercise_categories(fixture, run):
+    insert_exercise_categories(fixture["catalogue"]["categories"])
+
+
+@register_benchmark("queries.insert_exercises", "catalogue")
+def _insert_exercises(fixture, run):
+    insert_exercises(_batch(fixture["catalogue"]["exercises"], run, 100))
+
+
+@register_benchmark("queries.insert_musics", "catalogue")
+def _insert_musics(fixture, run):
+    insert_musics(_batch(fixture["catalogue"]["musics"], run))
+
+
+@register_benchmark("queries.insert_exercise_music_mappings", "catalogue")
+def _insert_exercise_music_mappings(fixture, run):
+    insert_exercise_music_mappings(_batch(fixture["catalogue"]["mappings"], run))
+
+
+@register_benchmark("queries.add_new_exercise", "catalogue")
+def _add_new_exercise(fixture, run):
+    add_new_exercise(
+        {"id": f"bench-{run}", "phase": 2.0, "category": fixture["categories"][0], "name": f"BENCHMARK {run}"}
+    )
+
+
+@register_benchmark("queries.get_all_exercise_categories", "catalogue")
+def _get_all_exercise_categories(fixture, run):
+    get_all_exercise_categories()
+
+
+@register_benchmark("queries.get_exercises_by_category", "catalogue")
+def _get_exercises_by_category(fixture, run):
+    get_exercises_by_category(_pick(fixture["categories"], run))
+
+
+@register_benchmark("queries.get_exercises_by_phase", "catalogue")
+def _get_exercises_by_phase(fixture, run):
+    get_exercises_by_phase(_pick(fixture["phases"], run))
+
+
+@register_benchmark("queries.get_all_exercises", "catalogue")
+def _get_all_exercises(fixture, run):
+    get_all_exercises()
+
+
+@register_benchmark("queries.get_exercises_by_cimeb_status", "catalogue")
+def _get_exercises_by_cimeb_status(fixture, run):
+    get_exercises_by_cimeb_status(run % 2 == 0)
+
+
+@register_benchmark("queries.get_exercise_phase_by_id", "catalogue")
+def _get_exercise_phase_by_id(fixture, run):
+    get_exercise_phase_by_id(_pick(fixture["exercise_ids"], run))
+
+
+@register_benchmark("queries.get_exercise_phases_by_ids", "catalogue")
+def _get_exercise_phases_by_ids(fixture, run):
+    get_exercise_phases_by_ids(_batch(fixture["exercise_ids"], run, 30))
+
+
+@register_benchmark("queries.get_next_exercise_id", "catalogue")
+def _get_next_exercise_id(fixture, run):
+    get_next_exercise_id()
+
+
+@register_benchmark("queries.get_music_for_exercise", "catalogue")
+def _get_music_for_exercise(fixture, run):
+    get_music_for_exercise(_pick(fixture["exercise_ids"], run))
+
+
+@register_benchmark("queries.get_songs_for_exercise", "catalogue")
+def _get_songs_for_exercise(fixture, run):
+    get_songs_for_exercise(_pick(fixture["exercise_ids"], run))
+
+
+@register_benchmark("queries.get_songs_for_exercises", "catalogue")
+def _get_songs_for_exercises(fixture, run):
+    get_songs_for_exercises(_batch(fixture["exercise_ids"], run, 30))
+
+
+@register_benchmark("queries.get_music_by_ref", "catalogue")
+def _get_music_by_ref(fixture, run):
+    get_music_by_ref(_pick(fixture["music_refs"], run))
+
+
+@register_benchmark("queries.get_exercises_by_song_name", "catalogue")
+def _get_exercises_by_song_name(fixture, run):
+    get_exercises_by_song_name(_pick(fixture["song_names"], run))
+
+
+@register_benchmark("queries.get_all_songs", "catalogue")
+def _get_all_songs(fixture, run):
+    get_all_songs()
+
+
+@register_benchmark("queries.get_songs_by_refs", "catalogue")
+def _get_songs_by_refs(fixture, run):
+    get_songs_by_refs(_batch(fixture["music_refs"], run, 20))
+
+
+@register_benchmark("queries.get_catalogue_generation", "catalogue")
+def _get_catalogue_generation(fixture, run):
+    get_catalogue_generation()
+
+
+# Sessions
+
+
+@register_benchmark("queries.parse_session_tags", "sessions")
+def _parse_session_tags(fixture, run):
+    parse_session_tags(_pick(fixture["sessions"], run)[0]["tags"])
+
+
+def _new_session(fixture, run):
+    cache = fixture["cache"]
+    if "new_sessions" not in cache:
+        cache["new_sessions"] = generate_sessions(fixture["catalogue"], 50, seed=fixture["seed"] + 1)
+    session_data, session_exercises = _pick(cache["new_sessions"], run)
+    return {"session_data": dict(session_data), "session_exercises": session_exercises}
+
+
+@register_benchmark("queries.save_session", "sessions", setup=_new_session)
+def _save_session(fixture, run, session_data, session_exercises):
+    save_session(session_data, session_exercises)
+
+
+@register_benchmark("queries.get_session_by_id", "sessions")
+def _get_session_by_id(fixture, run):
+    get_session_by_id(_pick(fixture["session_ids"], run))
+
+
+@register_benchmark("queries.get_all_sessions", "sessions")
+def _get_all_sessions(fixture, run):
+    get_all_sessions()
+
+
+@register_benchmark("queries.count_sessions", "sessions")
+def _count_sessions(fixture, run):
+    count_sessions()
+
+
+@register_benchmark("queries.get_sessions_page", "sessions")
+def _get_sessions_page(fixture, run):
+    get_sessions_page(limit=50, offset=(run * 50) % max(fixture["sizes"]["sessions"], 1))
+
+
+@register_benchmark("queries.get_sessions_by_date_range", "sessions")
+def _get_sessions_by_date_range(fixture, run):
+    get_sessions_by_date_range("2023-01-01", "2023-03-31")
+
+
+@register_benchmark("queries.get_sessions_by_tags", "sessions")
+def _get_sessions_by_tags(fixture, run):
+    tags = fixture["tags"]
+    get_sessions_by_tags([_pick(tags, run), _pick(tags, run + 1)], match_all=run % 2 == 1)
+
+
+@register_benchmark("queries.get_tag_counts", "sessions")
+def _get_tag_counts(fixture, run):
+    get_tag_counts()
+
+
+@register_benchmark("queries.rebuild_session_tags", "sessions")
+def _rebuild_session_tags(fixture, run):
+    rebuild_session_tags()
+
+
+@register_benchmark("queries.clone_session", "sessions")
+def _clone_session(fixture, run):
+    clone_session(_pick(fixture["session_ids"], run), f"Benchmark copy {run}")
+
+
+def _template(fixture, run):
+    cache = fixture["cache"]
+    if "template_id" not in cache:
+        cache["template_id"] = _clone(fixture, run, "template")
+        set_session_template(cache["template_id"], True)
+    return {"template_id": cache["template_id"]}
+
+
+@register_benchmark("queries.instantiate_template", "sessions", setup=_template)
+def _instantiate_template(fixture, run, template_id):
+    instantiate_template(template_id, f"Benchmark from template {run}", "2024-06-01")
+
+
+@register_benchmark("queries.get_template_sessions", "sessions", setup=_template)
+def _get_template_sessions(fixture, run, template_id):
+    get_template_sessions()
+
+
+def _flag_target(fixture, run):
+    cache = fixture["cache"]
+    if "flag_target_id" not in cache:
+        cache["flag_target_id"] = _clone(fixture, run, "flag")
+    return {"session_id": cache["flag_target_id"]}
+
+
+@register_benchmark("queries.set_session_template", "sessions", setup=_flag_target)
+def _set_session_template(fixture, run, session_id):
+    # Flag and unflag in turn
+    set_session_template(session_id, run % 2 == 0)
+
+
+def _aged_session(fixture, run):
+    session_id = _clone(fixture, run, "archive")
+    _age_session(session_id)
+    return {"session_id": session_id}
+
+
+@register_benchmark("queries.archive_sessions", "sessions", setup=_aged_session)
+def _archive_sessions(fixture, run, session_id):
+    archive_sessions(older_than_days=_ARCHIVE_DAYS)
+
+
+def _archived_session(fixture, run):
+    session_id = _aged_session(fixture, run)["session_id"]
+    archive_sessions(older_than_days=_ARCHIVE_DAYS)
+    return {"session_id": session_id}
+
+
+@register_benchmark("queries.restore_archived_session", "sessions", setup=_archived_session)
+def _restore_archived_session(fixture, run, session_id):
+    restore_archived_session(session_id)
+
+
+@register_benchmark("queries.delete_session", "sessions", setup=lambda fixture, run: {"session_id": _clone(fixture, run, "delete")})
+def _delete_session(fixture, run, session_id):
+    delete_session(session_id)
+
+
+# Jobs
+
+
+@register_benchmark("queries.create_job", "jobs")
+def _create_job(fixture, run):
+    create_job("benchmark", {"run": run})
+
+
+@register_benchmark("queries.get_job", "jobs")
+def _get_job(fixture, run):
+    get_job(_pick(_job_ids(fixture), run))
+
+
+@register_benchmark("queries.get_recent_jobs", "jobs")
+def _get_recent_jobs(fixture, run):
+    get_recent_jobs(limit=20)
+
+
+@register_benchmark("queries.update_job", "jobs")
+def _update_job(fixture, run):
+    update_job(_pick(_job_ids(fixture), run), progress=(run % 10) / 10, message=f"Step {run}")
+
+
+@register_benchmark("queries.request_job_cancel", "jobs", setup=lambda fixture, run: {"job_id": create_job("benchmark")})
+def _request_job_cancel(fixture, run, job_id):
+    request_job_cancel(job_id)
+
+
+@register_benchmark("queries.fail_interrupted_jobs", "jobs", setup=lambda fixture, run: {"job_id": create_job("benchmark")})
+def _fail_interrupted_jobs(fixture, run, job_id):
+    fail_interrupted_jobs()
+
+
+# Music library index
+
+
+@register_benchmark("queries.get_library_state", "library")
+def _get_library_state(fixture, run):
+    get_library_state()
+
+
+@register_benchmark("queries.get_library_dirs", "library")
+def _get_library_dirs(fixture, run):
+    get_library_dirs()
+
+
+@register_benchmark("queries.get_library_files", "library")
+def _get_library_files(fixture, run):
+    get_library_files()
+
+
+@register_benchmark("queries.apply_library_scan", "library")
+def _apply_library_scan(fixture, run):
+    # An incremental scan that found one changed directory
+    library = fixture["library"]
+    directory = _pick(sorted(library["rescanned"]), run)
+    apply_library_scan(library["root"], library["seen_dirs"], {directory: library["rescanned"][directory]})
+
+
+@register_benchmark("queries.get_song_file_check_state", "library")
+def _get_song_file_check_state(fixture, run):
+    get_song_file_check_state()
+
+
+@register_benchmark("queries.store_song_file_statuses", "library")
+def _store_song_file_statuses(fixture, run):
+    library = fixture["library"]
+    store_song_file_statuses(library["root"], run, get_catalogue_generation(), library["statuses"])
+
+
+@register_benchmark("queries.get_song_file_status_counts", "library")
+def _get_song_file_status_counts(fixture, run):
+    get_song_file_status_counts()
+
+
+@register_benchmark("queries.get_song_file_problems", "library")
+def _get_song_file_problems(fixture, run):
+    get_song_file_problems(PROBLEM_STATUSES)
+
+
+@register_benchmark("queries.get_playable_song_counts", "library")
+def _get_playable_song_counts(fixture, run):
+    get_playable_song_counts(PLAYABLE_STATUSES)
+
+
+@register_benchmark("queries.get_audio_metadata_to_read", "library")
+def _get_audio_metadata_to_read(fixture, run):
+    get_audio_metadata_to_read()
+
+
+@register_benchmark("queries.store_audio_metadata", "library")
+def _store_audio_metadata(fixture, run):
+    store_audio_metadata(_batch(fixture["library"]["audio_metadata"], run))
+
+
+@register_benchmark("queries.prune_audio_metadata", "library")
+def _prune_audio_metadata(fixture, run):
+    prune_audio_metadata()
+
+
+@register_benchmark("queries.get_audio_metadata_generation", "library")
+def _get_audio_metadata_generation(fixture, run):
+    get_audio_metadata_generation()
+
+
+@register_benchmark("queries.get_measured_song_durations", "library")
+def _get_measured_song_durations(fixture, run):
+    get_measured_song_durations()
+
+
+# Catalogue loader
+
+
+def _fresh_database(fixture, run):
+    path = os.path.join(fixture["work_dir"], "loaded.db")
+    if os.path.exists(path):
+        os.remove(path)
+    return {"db_path": path}
+
+
+def _load_into(fixture, db_path, source):
+    schema.DB_PATH = db_path
+    try:
+        if not load_lsb_catalogue(source):
+            raise RuntimeError(f"Loading {source} failed")
+    finally:
+        schema.DB_PATH = fixture["db_path"]
+
+
+@register_benchmark("loader.load_lsb_catalogue[csv]", "loader", setup=_fresh_database, warmup=0)
+def _load_catalogue_csv(fixture, run, db_path):
+    _load_into(fixture, db_path, fixture["csv_dir"])
+
+
+def _fresh_database_and_workbook(fixture, run):
+    cache = fixture["cache"]
+    if "xlsx_path" not in cache:
+        cache["xlsx_path"] = os.path.join(fixture["work_dir"], "catalogue.xlsx")
+        write_catalogue_workbook(fixture["catalogue"], cache["xlsx_path"])
+    return {**_fresh_database(fixture, run), "xlsx_path": cache["xlsx_path"]}
+
+
+# Reading .xlsx with pandas takes minutes at the larger scales
+@register_benchmark("loader.load_lsb_catalogue[xlsx]", "loader", setup=_fresh_database_and_workbook,
+                    scales=("small",), warmup=0)
+def _load_catalogue_xlsx(fixture, run, db_path, xlsx_path):
+    _load_into(fixture, db_path, xlsx_path)
+
+
+# Exporters
+
+
+@register_benchmark("exporters.export_session_to_word", "exporters")
+def _export_session_to_word(fixture, run):
+    session_data, session_exercises = fixture["largest_session"]
+    export_session_to_word(session_data, session_exercises, fixture["export_dir"])
+
+
+@register_benchmark("exporters.export_playlist", "exporters")
+def _export_playlist(fixture, run):
+    session_data, session_exercises = fixture["largest_session"]
+    export_playlist(session_data["name"], session_exercises, fixture["export_dir"], fmt="m3u")
+
+
+@register_benchmark("exporters.export_catalogue[csv]", "exporters", warmup=0)
+def _export_catalogue(fixture, run):
+    export_catalogue(os.path.join(fixture["export_dir"], "catalogue"), "csv")
+
+
+@register_benchmark("exporters.export_sessions_data[csv]", "exporters", warmup=0)
+def _export_sessions_data(fixture, run):
+    export_sessions_data(os.path.join(fixture["export_dir"], "sessions"), "csv")
@@ -0,0 +1,132 @@
+"""
+Synthetic databases the benchmarks run against.
+
+Building a database with save_session for every session takes minutes at
+the large scale, so each (scale, seed) database is built once and kept in
+FIXTURE_DIR. Its file name carries a digest of the sizes, the seed and the
+code that writes it (the generator, the schema and the queries), so a
+change to any of them builds a new one. Every benchmark run works on a copy
+of it in a temporary directory: benchmarks that write leave the cached
+database untouched.
+"""
+import hashlib
+import json
+import os
+import random
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from app.db import schema
+from app.db.queries import parse_session_tags
+from app.synthetic_data import (
+    SCALES,
+    generate_catalogue,
+    generate_library_index,
+    generate_sessions,
+    write_catalogue_database,
+    write_catalogue_workbook,
+    write_library_database,
+    write_sessions_database,
+)
+
+# Where the built databases are kept (BENCHMARK_FIXTURE_DIR in .env)
+FIXTURE_DIR = Path(
+    os.getenv("BENCHMARK_FIXTURE_DIR") or Path(__file__).parent.parent.parent / "data" / "benchmarks" / "fixtures"
+)
+
+# Exercises, songs and sessions sampled as query arguments
+SAMPLE_SIZE = 100
+
+_APP_DIR = Path(__file__).parent.parent
+_FIXTURE_SOURCES = [_APP_DIR / "synthetic_data.py", _APP_DIR / "db" / "schema.py", _APP_DIR / "db" / "queries.py"]
+
+
+def _fixture_key(scale: str, seed: int) -> str:
+    digest = hashlib.sha1(json.dumps([SCALES[scale], seed]).encode("utf-8"))
+    for source in _FIXTURE_SOURCES:
+        digest.update(source.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def fixture_database(scale: str, seed: int = 0, progress: Optional[Callable[[str], None]] = None) -> Path:
+    """
+    Path of the cached database for a scale and seed, building it first if
+    needed: catalogue, saved sessions and a synthetic library index.
+    """
+    path = FIXTURE_DIR / f"{scale}-seed{seed}-{_fixture_key(scale, seed)}.db"
+    if path.exists():
+        return path
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for stale in FIXTURE_DIR.glob(f"{scale}-seed{seed}-*.db"):
+        stale.unlink()
+    sizes = SCALES[scale]
+    building = path.with_suffix(f".tmp{os.getpid()}")
+    previous_db_path = schema.DB_PATH
+    schema.DB_PATH = building
+    try:
+        if progress:
+            progress(f"Building the {scale} fixture database (done once)")
+        catalogue = generate_catalogue(sizes["exercises"], sizes["tracks"], seed=seed)
+        write_catalogue_database(catalogue)
+        write_sessions_database(generate_sessions(catalogue, sizes["sessions"], seed=seed))
+        write_library_database(generate_library_index(catalogue, seed=seed))
+        os.replace(building, path)
+    finally:
+        schema.DB_PATH = previous_db_path
+        if building.exists():
+            building.unlink()
+    return path
+
+
+def prepare_fixture(scale: str, seed: int, work_dir: str, progress: Optional[Callable[[str], None]] = None) -> Dict:
+    """
+    Copy the cached database of a scale into work_dir, point schema.DB_PATH
+    at the copy and collect the arguments the benchmarks use.
+
+    The caller restores schema.DB_PATH afterwards.
+
+    Returns:
+        Dict with the scale, sizes, paths, the generated catalogue, sessions
+        and library index, samples of exercise IDs, music references, song
+        names, session IDs and tags, and a "cache" dict for benchmark setups
+    """
+    sizes = SCALES[scale]
+    cached = fixture_database(scale, seed, progress)
+    db_path = Path(work_dir) / "benchmark.db"
+    shutil.copyfile(cached, db_path)
+    schema.DB_PATH = db_path
+
+    catalogue = generate_catalogue(sizes["exercises"], sizes["tracks"], seed=seed)
+    sessions = generate_sessions(catalogue, sizes["sessions"], seed=seed)
+    csv_dir = os.path.join(work_dir, "catalogue_csv")
+    write_catalogue_workbook(catalogue, csv_dir, "csv")
+    export_dir = os.path.join(work_dir, "exports")
+    os.makedirs(export_dir, exist_ok=True)
+
+    rng = random.Random(f"benchmark-{seed}")
+    musics = rng.sample(catalogue["musics"], min(SAMPLE_SIZE, len(catalogue["musics"])))
+    saved = rng.sample(sessions, min(SAMPLE_SIZE, len(sessions)))
+    tags = sorted({tag for session_data, _ in sessions for tag in parse_session_tags(session_data["tags"])})
+    return {
+        "scale": scale,
+        "seed": seed,
+        "sizes": sizes,
+        "work_dir": work_dir,
+        "db_path": db_path,
+        "csv_dir": csv_dir,
+        "export_dir": export_dir,
+        "catalogue": catalogue,
+        "sessions": sessions,
+        "library": generate_library_index(catalogue, seed=seed),
+        "exercise_ids": [e["id"] for e in rng.sample(catalogue["exercises"], min(SAMPLE_SIZE, len(catalogue["exercises"])))],
+        "music_refs": [m["music_ref"] for m in musics],
+        "song_names": [m["title"].split()[0] for m in musics],
+        "categories": catalogue["categories"],
+        "phases": sorted({e["phase"] for e in catalogue["exercises"]}),
+        "session_ids": [session_data["id"] for session_data, _ in saved],
+        "largest_session": max(sessions, key=lambda s: len(s[1])),
+        "tags": tags,
+        "cache": {},
+    }
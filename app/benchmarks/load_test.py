@@ -0,0 +1,333 @@
+"""
+Multi-user load test of the session store.
+
+Spawns one process per simulated facilitator against a single SQLite file,
+the way several Streamlit servers (or the planned multi-user API) would
+share it. Each facilitator owns a session and, at configurable rates:
+
+- autosaves it after an edit (save_session with the next version)
+- loads a saved session (get_session_by_id)
+- exports a saved session to Word and to a playlist
+
+Actions arrive as a Poisson process per facilitator, so bursts happen as
+they would with real users. The queries swallow sqlite3 errors and report
+them as return values or printed messages, so a failed action is
+recognised the same way the UI recognises it and "database is locked"
+failures are told apart by their message. Locked actions are retried with
+exponential backoff, as a client would; every retry is counted.
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.benchmarks.runner import RESULTS_VERSION, _environment, _git_commit, percentile, summarise_timings
+from app.db import schema
+
+# Marks results files written by this harness
+HARNESS = "load"
+
+# Actions per second of each facilitator (autosave in the app runs every 30 s,
+# so the default save rate stands for about 15 facilitators per process)
+DEFAULT_RATES = {"save": 0.5, "load": 0.5, "export": 0.1}
+
+DEFAULT_WORKERS = 4
+DEFAULT_DURATION = 30
+
+# Retries of an action failing with "database is locked", and the first backoff
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_MS = 50
+
+# Exercises in each facilitator's session
+SESSION_EXERCISES = 20
+
+# Sessions and songs sampled from the database for the facilitators to use
+SAMPLE_SIZE = 200
+
+# Seconds the workers may take to start and create their sessions
+STARTUP_TIMEOUT = 120
+
+
+def _is_locked(message: str) -> bool:
+    """Whether an error is SQLite's busy error ("database is locked", "database table is locked")."""
+    return "is locked" in message
+
+
+def _exercise_tuple(exercise_id, music_ref):
+    return (f"Load test exercise [id {exercise_id}]", music_ref, exercise_id, "")
+
+
+def _sample(db_path: Path) -> Dict[str, List]:
+    """Session IDs, exercise IDs and music references to drive the facilitators with."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            key: [row[0] for row in conn.execute(sql, (SAMPLE_SIZE,))]
+            for key, sql in (
+                ("id", "SELECT id FROM sessions ORDER BY RANDOM() LIMIT ?"),
+                ("exercise_id", "SELECT id FROM exercises ORDER BY RANDOM() LIMIT ?"),
+                ("music_ref", "SELECT music_ref FROM musics ORDER BY RANDOM() LIMIT ?"),
+            )
+        }
+    finally:
+        conn.close()
+
+
+class _Facilitator:
+    """One simulated user: their own session and the actions they take."""
+
+    def __init__(self, worker: int, sample: Dict[str, List], export_dir: str, rng: random.Random):
+        self.worker = worker
+        self.sample = sample
+        self.export_dir = export_dir
+        self.rng = rng
+        self.exercises = [
+            _exercise_tuple(rng.choice(sample["exercise_id"]), rng.choice(sample["music_ref"]))
+            for _ in range(SESSION_EXERCISES)
+        ]
+        self.metadata = {"id": None, "name": f"Load test {worker}", "description": "", "date": "", "tags": "load-test",
+                         "version": 1}
+
+    def save(self) -> Callable[[], Optional[str]]:
+        """Edit the session (swap a song or an exercise), then autosave it."""
+        from app.db.queries import save_session
+
+        index = self.rng.randrange(len(self.exercises))
+        name, music_ref, exercise_id, notes = self.exercises[index]
+        if self.rng.random() < 0.5:
+            music_ref = self.rng.choice(self.sample["music_ref"])
+        else:
+            exercise_id = self.rng.choice(self.sample["exercise_id"])
+            name = _exercise_tuple(exercise_id, music_ref)[0]
+        self.exercises[index] = (name, music_ref, exercise_id, notes)
+
+        def attempt():
+            data = dict(self.metadata, timestamp=datetime.now().isoformat())
+            success, message, session_id = save_session(data, self.exercises)
+            if not success:
+                return message
+            self.metadata["id"] = session_id
+            self.metadata["version"] += 1
+            return None
+        return attempt
+
+    def _load(self):
+        from app.db.queries import get_session_by_id
+
+        candidates = self.sample["id"] + ([self.metadata["id"]] if self.metadata["id"] else [])
+        return get_session_by_id(self.rng.choice(candidates))
+
+    def load(self) -> Callable[[], Optional[str]]:
+        def attempt():
+            session_data, _ = self._load()
+            return None if session_data else "session not loaded"
+        return attempt
+
+    def export(self) -> Callable[[], Optional[str]]:
+        from app.exporter import export_playlist
+        from app.scripts.export_session_to_word import export_session_to_word
+
+        def attempt():
+            session_data, session_exercises = self._load()
+            if not session_data:
+                return "session not loaded"
+            session_data = dict(session_data, name=f"worker{self.worker}")
+            export_session_to_word(session_data, session_exercises, self.export_dir)
+            export_playlist(session_data["name"], session_exercises, self.export_dir)
+            return None
+        return attempt
+
+
+def _run_action(attempt: Callable[[], Optional[str]], retries: int, backoff_ms: float, rng: random.Random) -> Dict:
+    """Run an action, retrying locked failures; its latency includes the retries and backoff."""
+    locked = 0
+    start = time.perf_counter()
+    for retry in range(retries + 1):
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                error = attempt()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        # Queries that swallow the error print it and return a default value
+        if _is_locked(output.getvalue()):
+            error = output.getvalue().strip()
+        if error is None or not _is_locked(error):
+            break
+        locked += 1
+        if retry < retries:
+            time.sleep(backoff_ms * 2 ** retry * rng.uniform(0.5, 1.5) / 1000)
+    return {
+        "latency": time.perf_counter() - start,
+        "ok": error is None,
+        "locked": locked,
+        "retries": min(locked, retries),
+        "error": error,
+    }
+
+
+def _facilitator_process(worker, config, db_path, sample, export_dir, barrier, results):
+    """Worker process: set up a facilitator, wait for the others, then act until the time is up."""
+    os.environ["MUSIC_LIBRARY_PATH"] = ""
+    schema.DB_PATH = Path(db_path)
+    if config["busy_timeout_ms"] is not None:
+        schema.register_connection_hook(
+            lambda conn: conn.execute(f"PRAGMA busy_timeout = {int(config['busy_timeout_ms'])}")
+        )
+    rng = random.Random(f"load-{config['seed']}-{worker}")
+    facilitator = _Facilitator(worker, sample, export_dir, rng)
+    records = []
+    try:
+        # Every facilitator has saved their session before the clock starts
+        setup = _run_action(facilitator.save(), config["retries"], config["backoff_ms"], rng)
+        if not setup["ok"]:
+            raise RuntimeError(f"Worker {worker} could not create its session: {setup['error']}")
+        barrier.wait(STARTUP_TIMEOUT)
+
+        kinds = [kind for kind, rate in config["rates"].items() if rate > 0]
+        weights = [config["rates"][kind] for kind in kinds]
+        start = time.perf_counter()
+        due = start
+        while kinds:
+            due += rng.expovariate(sum(weights))
+            if due - start >= config["duration"]:
+                break
+            time.sleep(max(0.0, due - time.perf_counter()))
+            kind = rng.choices(kinds, weights)[0]
+            record = _run_action(getattr(facilitator, kind)(), config["retries"], config["backoff_ms"], rng)
+            record.update(kind=kind, worker=worker, at=round(due - start, 3))
+            records.append(record)
+        results.put({"worker": worker, "records": records, "error": None})
+    except Exception as e:
+        barrier.abort()
+        results.put({"worker": worker, "records": records, "error": f"{type(e).__name__}: {e}"})
+
+
+def _summarise(records: List[Dict], name: str, scale: str, duration: float) -> Dict:
+    latencies = [record["latency"] for record in records]
+    result = {"name": name, "group": "load", "scale": scale, **summarise_timings(latencies)}
+    result["p99_ms"] = round(percentile(latencies, 0.99) * 1000, 4)
+    # ops_per_sec of a single call does not mean much here: report throughput over the run
+    result["ops_per_sec"] = round(sum(record["ok"] for record in records) / duration, 2)
+    result["failed"] = sum(not record["ok"] for record in records)
+    result["locked_errors"] = sum(record["locked"] for record in records)
+    result["retries"] = sum(record["retries"] for record in records)
+    return result
+
+
+def run_load_test(
+    db_source: Optional[Path] = None,
+    scale: str = "small",
+    seed: int = 0,
+    workers: int = DEFAULT_WORKERS,
+    duration: float = DEFAULT_DURATION,
+    rates: Optional[Dict[str, float]] = None,
+    retries: int = DEFAULT_RETRIES,
+    backoff_ms: float = DEFAULT_BACKOFF_MS,
+    busy_timeout_ms: Optional[int] = None,
+    journal_mode: Optional[str] = None,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict:
+    """
+    Run the facilitators against a copy of a database for `duration` seconds.
+
+    Args:
+        db_source: Database to copy; by default the synthetic fixture of `scale`
+        rates: Actions per second of each facilitator, by kind (see DEFAULT_RATES)
+        retries: Retries of an action failing with "database is locked"
+        backoff_ms: First retry delay, doubled on each retry (with jitter)
+        busy_timeout_ms: PRAGMA busy_timeout of every connection; by default
+            that of get_db_connection() (Python's 5 s)
+        journal_mode: Journal mode to set on the copy first, e.g. "wal"
+
+    Returns:
+        Results dict in the layout of run_benchmarks results: run metadata
+        and configuration, one result per action kind (and "load.all") with
+        latency percentiles including p99, throughput, failed actions,
+        locked errors and retries, the most frequent errors, and the
+        per-second throughput timeline
+    """
+    rates = dict(DEFAULT_RATES if rates is None else rates)
+    config = {
+        "seed": seed,
+        "workers": workers,
+        "duration": duration,
+        "rates": rates,
+        "retries": retries,
+        "backoff_ms": backoff_ms,
+        "busy_timeout_ms": busy_timeout_ms,
+        "journal_mode": journal_mode,
+    }
+    label = Path(db_source).stem if db_source else scale
+    with tempfile.TemporaryDirectory(prefix="lsb-load-test-") as work_dir:
+        if db_source is None:
+            from app.benchmarks.fixtures import fixture_database
+
+            db_source = fixture_database(scale, seed, progress)
+        db_path = Path(work_dir) / "load_test.db"
+        shutil.copyfile(db_source, db_path)
+        if journal_mode:
+            conn = sqlite3.connect(db_path)
+            config["journal_mode"] = conn.execute(f"PRAGMA journal_mode = {journal_mode}").fetchone()[0]
+            conn.close()
+        sample = _sample(db_path)
+
+        # spawn: workers start from a clean interpreter, as separate servers would
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(workers + 1)
+        queue = context.Queue()
+        processes = [
+            context.Process(
+                target=_facilitator_process,
+                args=(worker, config, str(db_path), sample, os.path.join(work_dir, f"exports{worker}"), barrier, queue),
+                daemon=True,
+            )
+            for worker in range(workers)
+        ]
+        if progress:
+            progress(f"starting {workers} facilitators")
+        for process in processes:
+            process.start()
+        try:
+            barrier.wait(STARTUP_TIMEOUT)
+        except Exception:
+            pass
+        if progress:
+            progress(f"{workers} facilitators running for {duration:g} s")
+        outcomes = [queue.get(timeout=STARTUP_TIMEOUT + duration * 10) for _ in processes]
+        for process in processes:
+            process.join()
+
+    errors = [outcome["error"] for outcome in outcomes if outcome["error"]]
+    if errors:
+        raise RuntimeError(errors[0])
+
+    records = [record for outcome in outcomes for record in outcome["records"]]
+    results = []
+    for kind in list(rates) + ["all"]:
+        of_kind = [record for record in records if kind in ("all", record["kind"])]
+        if of_kind:
+            results.append(_summarise(of_kind, f"load.{kind}", label, duration))
+    timeline = Counter(int(record["at"]) for record in records if record["ok"])
+    return {
+        "version": RESULTS_VERSION,
+        "harness": HARNESS,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "environment": _environment(),
+        "seed": seed,
+        "config": config,
+        "scales": {label: {"database": str(db_source)}},
+        "results": results,
+        "errors": Counter(record["error"] for record in records if record["error"]).most_common(10),
+        "timeline": [timeline.get(second, 0) for second in range(int(duration))],
+    }
@@ -0,0 +1,256 @@
+"""
+Registry and runner of the benchmark cases.
+
+A case is a function registered with register_benchmark and called as
+case(fixture, run, **setup(fixture, run)), where fixture is the dict built
+by fixtures.prepare_fixture and run the index of the call. Only the call
+itself is timed: the optional setup prepares what the call consumes (a
+session to delete, a job to cancel) outside the clock. Each case runs once
+untimed to warm caches, then up to `repeat` times or until `max_seconds`
+have passed, and at least MIN_RUNS times.
+"""
+import fnmatch
+import inspect
+import json
+import math
+import os
+import platform
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.db import queries, schema
+
+# Timed runs per case (BENCHMARK_REPEAT in .env)
+DEFAULT_REPEAT = int(os.getenv("BENCHMARK_REPEAT", "30"))
+
+# Time budget per case once MIN_RUNS are done (BENCHMARK_MAX_SECONDS in .env)
+DEFAULT_MAX_SECONDS = float(os.getenv("BENCHMARK_MAX_SECONDS", "5"))
+
+MIN_RUNS = 3
+
+# Version of the results file layout
+RESULTS_VERSION = 1
+
+_cases: Dict[str, "BenchmarkCase"] = {}
+
+
+class BenchmarkCase:
+    """A registered benchmark: what to call, how to set it up and where it runs."""
+
+    def __init__(self, name: str, func: Callable, group: str, setup: Optional[Callable] = None,
+                 scales: Optional[Iterable[str]] = None, warmup: int = 1, covers: Optional[str] = None):
+        self.name = name
+        self.func = func
+        self.group = group
+        self.setup = setup
+        self.scales = tuple(scales) if scales else None
+        self.warmup = warmup
+        # Query function measured, for the coverage check
+        self.covers = covers or (name.split(".", 1)[1] if name.startswith("queries.") else None)
+
+    def runs_at(self, scale: str) -> bool:
+        return self.scales is None or scale in self.scales
+
+
+def register_benchmark(name: str, group: str, setup: Optional[Callable] = None,
+                       scales: Optional[Iterable[str]] = None, warmup: int = 1, covers: Optional[str] = None):
+    """
+    Register a benchmark case.
+
+    Args:
+        name: Unique name; "queries.<function>" marks the query function covered
+        group: Report group (catalogue, sessions, jobs, library, loader, exporters)
+        setup: Called as setup(fixture, run) before each call, untimed; returns
+            the keyword arguments of the call
+        scales: Scales the case runs at (all when None)
+        warmup: Untimed calls before the timed ones
+        covers: Query function measured, when the name does not say it
+    """
+    def decorator(func):
+        _cases[name] = BenchmarkCase(name, func, group, setup, scales, warmup, covers)
+        return func
+    return decorator
+
+
+def get_benchmarks(
+    patterns: Optional[Iterable[str]] = None, names: Optional[Iterable[str]] = None
+) -> List[BenchmarkCase]:
+    """
+    Registered cases, optionally only those matching one of the glob patterns
+    or, when names are given, only those with one of the exact names (case
+    names such as "loader.load_lsb_catalogue[csv]" are not valid patterns).
+    """
+    from app.benchmarks import cases  # noqa: F401  (registers the cases)
+
+    if names is not None:
+        names = set(names)
+        return [case for name, case in _cases.items() if name in names]
+    patterns = list(patterns or [])
+    return [
+        case for name, case in _cases.items()
+        if not patterns or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+    ]
+
+
+def uncovered_query_functions() -> List[str]:
+    """Public functions of app/db/queries.py no registered case measures."""
+    covered = {case.covers for case in get_benchmarks()}
+    return sorted(
+        name for name, func in inspect.getmembers(queries, inspect.isfunction)
+        if func.__module__ == queries.__name__ and not name.startswith("_") and name not in covered
+    )
+
+
+def percentile(samples: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of the samples, or None without samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered), math.ceil(len(ordered) * fraction)) - 1)]
+
+
+def summarise_timings(timings: List[float]) -> Dict:
+    """Run count, percentiles and mean in milliseconds, and calls per second."""
+    total = sum(timings)
+    return {
+        "runs": len(timings),
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 4),
+        "mean_ms": round(total / len(timings) * 1000, 4),
+        "min_ms": round(min(timings) * 1000, 4),
+        "max_ms": round(max(timings) * 1000, 4),
+        "ops_per_sec": round(len(timings) / total, 2) if total else None,
+    }
+
+
+def time_case(case: BenchmarkCase, fixture: Dict, repeat: int, max_seconds: float) -> List[float]:
+    """Call a case (warm-up calls first) and return the timings of the timed calls, in seconds."""
+    run = fixture["cache"].setdefault("runs", {}).get(case.name, 0)
+    timings = []
+    deadline = None
+    for call in range(case.warmup + repeat):
+        kwargs = case.setup(fixture, run) if case.setup else {}
+        start = time.perf_counter()
+        case.func(fixture, run, **kwargs)
+        elapsed = time.perf_counter() - start
+        run += 1
+        if call < case.warmup:
+            continue
+        timings.append(elapsed)
+        if deadline is None:
+            deadline = time.perf_counter() + max_seconds
+        elif len(timings) >= MIN_RUNS and time.perf_counter() > deadline:
+            break
+    fixture["cache"]["runs"][case.name] = run
+    return timings
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, capture_output=True,
+            text=True, timeout=5, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmarks(
+    scales: Iterable[str],
+    seed: int = 0,
+    patterns: Optional[Iterable[str]] = None,
+    names: Optional[Iterable[str]] = None,
+    repeat: int = DEFAULT_REPEAT,
+    max_seconds: float = DEFAULT_MAX_SECONDS,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict:
+    """
+    Run the benchmark cases at each scale.
+
+    The real database and music library are never touched: each scale runs
+    on a copy of its fixture database, with MUSIC_LIBRARY_PATH unset.
+
+    Args:
+        scales: Scale names from synthetic_data.SCALES
+        seed: Seed of the synthetic data
+        patterns: Glob patterns of the case names to run (all when empty)
+        names: Exact case names to run instead of patterns
+        repeat: Maximum timed calls per case
+        max_seconds: Time budget per case once MIN_RUNS calls are done
+        progress: Called with a message before each case
+
+    Returns:
+        Results dict with the run metadata, the sizes of each scale, one
+        result per case and scale, and the query functions without a case
+    """
+    from app.benchmarks.fixtures import prepare_fixture
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "environment": _environment(),
+        "seed": seed,
+        "repeat": repeat,
+        "max_seconds": max_seconds,
+        "scales": {},
+        "results": [],
+        "uncovered": uncovered_query_functions(),
+    }
+    benchmarks = get_benchmarks(patterns, names)
+    previous_db_path = schema.DB_PATH
+    previous_library = os.environ.get("MUSIC_LIBRARY_PATH")
+    # An empty value (not a missing one) keeps load_dotenv from setting it again
+    os.environ["MUSIC_LIBRARY_PATH"] = ""
+    try:
+        for scale in scales:
+            with tempfile.TemporaryDirectory(prefix=f"lsb-bench-{scale}-") as work_dir:
+                start = time.perf_counter()
+                fixture = prepare_fixture(scale, seed, work_dir, progress)
+                results["scales"][scale] = {
+                    "sizes": fixture["sizes"],
+                    "setup_seconds": round(time.perf_counter() - start, 2),
+                }
+                for case in benchmarks:
+                    if not case.runs_at(scale):
+                        continue
+                    if progress:
+                        progress(f"[{scale}] {case.name}")
+                    timings = time_case(case, fixture, repeat, max_seconds)
+                    results["results"].append(
+                        {"name": case.name, "group": case.group, "scale": scale, **summarise_timings(timings)}
+                    )
+                schema.DB_PATH = previous_db_path
+    finally:
+        schema.DB_PATH = previous_db_path
+        if previous_library is None:
+            os.environ.pop("MUSIC_LIBRARY_PATH", None)
+        else:
+            os.environ["MUSIC_LIBRARY_PATH"] = previous_library
+    return results
+
+
+def write_results(results: Dict, output: str) -> str:
+    """Write benchmark results as JSON, creating the directory; returns the path."""
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    return output
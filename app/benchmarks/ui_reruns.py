@@ -0,0 +1,213 @@
+"""
+Rerun latency of the Streamlit app, measured headlessly with AppTest.
+
+Every widget interaction reruns app/main.py from the top, so the latency a
+user feels is the time of that rerun. This harness drives main.py through
+streamlit.testing.v1.AppTest with a scripted session-building interaction
+(adding exercises, picking songs, reordering, typing in the song filter,
+saving and loading a session) against a synthetic fixture database, and
+records for every interaction:
+
+- wall time, including any st.rerun() the interaction triggers
+- SQL statements executed and connections opened, counted by the SQL
+  tracer (app/db/tracing.py; executemany counts every row), and the
+  queries it flags as N+1 suspects
+- peak Python memory allocated during the interaction (tracemalloc)
+
+tracemalloc slows allocation-heavy code down by a different factor than
+the rest, so memory is measured in a second pass over the same script on a
+fresh copy of the database, and the wall times come from the first pass
+(which include the small overhead of the tracer).
+Background jobs and the autosave timer are not triggered by the script.
+"""
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.benchmarks.runner import RESULTS_VERSION, _environment, _git_commit, summarise_timings
+from app.db import schema
+from app.db.tracing import trace_queries
+
+# Marks results files written by this harness (run_benchmarks results have none)
+HARNESS = "ui"
+
+MAIN_SCRIPT = Path(__file__).parent.parent / "main.py"
+
+# Seconds AppTest waits for one script run (large catalogues render slowly)
+RUN_TIMEOUT = 600
+
+# Exercises added, songs picked and moves made by the interaction script
+EXERCISES_ADDED = 30
+SONGS_PICKED = 10
+MOVES = (("down", 0), ("down", 5), ("up", 20), ("up", 12), ("down", 3), ("up", 29))
+
+
+def _check(at, label: str):
+    if at.exception:
+        raise RuntimeError(f"The app raised an exception during '{label}': {at.exception[0].message}")
+
+
+def build_session_script(at, fixture: Dict, step: Callable[[str, str, Callable], None]):
+    """
+    The interaction script: a facilitator building, saving and reloading a
+    session. step(kind, label, action) performs and measures each
+    interaction; the script only decides what to click.
+    """
+    step("initial_load", "open the app", at.run)
+
+    for number in range(EXERCISES_ADDED):
+        # The "Add" buttons of the exercise selector, keyed by exercise id
+        buttons = [b for b in at.button if b.key and b.key.startswith("add_") and b.key[4:].isdigit()]
+        button = buttons[(number * 7) % len(buttons)]
+        step("add_exercise", f"add {button.key[4:]}", button.click().run)
+
+    picked = 0
+    for index in range(len(at.session_state.session_exercises)):
+        select = at.selectbox(key=f"song_select_{index}")
+        # The first two options are "No song" and "Custom music selection"
+        if picked == SONGS_PICKED or len(select.options) < 3:
+            continue
+        option = select.options[2 + picked % (len(select.options) - 2)]
+        step("pick_song", f"pick a song for #{index + 1}", select.set_value(option).run)
+        picked += 1
+
+    for direction, index in MOVES:
+        index = min(index, len(at.session_state.session_exercises) - 1)
+        if direction == "up" and index == 0:
+            index = 1
+        step("reorder", f"move #{index + 1} {direction}", at.button(key=f"{direction}_{index}").click().run)
+
+    word = fixture["song_names"][0].lower()
+    for typed in (word[:3], word, ""):
+        step("song_filter", f"song filter '{typed}'", at.text_input(key="song_filter").set_value(typed).run)
+
+    step("edit_metadata", "name the session", at.text_input(key="session_name_input").set_value("UI benchmark").run)
+    step("save", "save the session", at.button(key="save_session_button").click().run)
+
+    select = at.selectbox(key="session_select")
+    target = next(option for option in select.options if not option.startswith("UI benchmark"))
+    step("select_session", "select a saved session", select.set_value(target).run)
+    step("load", "load it", at.button(key="load_session_button").click().run)
+
+
+def _run_pass(fixture: Dict, db_copy: Path, measure_memory: bool, progress: Optional[Callable[[str], None]]):
+    from streamlit.testing.v1 import AppTest
+
+    shutil.copyfile(fixture["db_path"], db_copy)
+    schema.DB_PATH = db_copy
+    records = []
+    at = AppTest.from_file(str(MAIN_SCRIPT), default_timeout=RUN_TIMEOUT)
+
+    def step(kind, label, action):
+        if progress:
+            progress(f"[{fixture['scale']}{' memory' if measure_memory else ''}] {label}")
+        if measure_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        # AppTest runs the script in its own thread
+        with trace_queries(label, all_threads=True) as trace:
+            start = time.perf_counter()
+            action()
+            elapsed = time.perf_counter() - start
+        _check(at, label)
+        if measure_memory:
+            peak_kib = round((tracemalloc.get_traced_memory()[1] - baseline) / 1024, 1)
+            records.append({"kind": kind, "label": label, "peak_kib": peak_kib})
+            return
+        records.append({
+            "kind": kind,
+            "label": label,
+            "wall_ms": round(elapsed * 1000, 3),
+            "connections": trace.connections,
+            "sql_statements": trace.count,
+            "n_plus_one": [stats["fingerprint"] for stats in trace.n_plus_one_suspects()],
+        })
+
+    if measure_memory:
+        tracemalloc.start()
+    try:
+        build_session_script(at, fixture, step)
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
+        schema.DB_PATH = fixture["db_path"]
+    return records
+
+
+def _summarise(records: List[Dict], scale: str) -> List[Dict]:
+    """One result per interaction kind, in the layout of run_benchmarks results."""
+    results = []
+    for kind in dict.fromkeys(record["kind"] for record in records):
+        of_kind = [record for record in records if record["kind"] == kind]
+        result = {"name": f"ui.{kind}", "group": "ui", "scale": scale,
+                  **summarise_timings([record["wall_ms"] / 1000 for record in of_kind])}
+        result["sql_statements_mean"] = round(sum(r["sql_statements"] for r in of_kind) / len(of_kind), 1)
+        result["sql_statements_max"] = max(r["sql_statements"] for r in of_kind)
+        result["connections_mean"] = round(sum(r["connections"] for r in of_kind) / len(of_kind), 1)
+        result["n_plus_one"] = sorted({key for r in of_kind for key in r["n_plus_one"]})
+        if "peak_kib" in of_kind[0]:
+            result["peak_kib_max"] = max(r["peak_kib"] for r in of_kind)
+        results.append(result)
+    return results
+
+
+def run_ui_benchmarks(
+    scales,
+    seed: int = 0,
+    measure_memory: bool = True,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict:
+    """
+    Run the interaction script against the fixture database of each scale.
+
+    The real database and music library are never touched.
+
+    Returns:
+        Results dict like run_benchmarks returns: run metadata, one result
+        per interaction kind and scale (wall time percentiles, mean and
+        maximum SQL statements, mean connections, the N+1 suspects and, with
+        measure_memory, the maximum peak memory), and under "reruns" every
+        interaction
+    """
+    from app.benchmarks.fixtures import prepare_fixture
+
+    results = {
+        "version": RESULTS_VERSION,
+        "harness": HARNESS,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "environment": _environment(),
+        "seed": seed,
+        "scales": {},
+        "results": [],
+        "reruns": [],
+    }
+    previous_db_path = schema.DB_PATH
+    previous_library = os.environ.get("MUSIC_LIBRARY_PATH")
+    # An empty value (not a missing one) keeps load_dotenv from setting it again
+    os.environ["MUSIC_LIBRARY_PATH"] = ""
+    try:
+        for scale in scales:
+            with tempfile.TemporaryDirectory(prefix=f"lsb-ui-bench-{scale}-") as work_dir:
+                fixture = prepare_fixture(scale, seed, work_dir, progress)
+                results["scales"][scale] = {"sizes": fixture["sizes"]}
+                records = _run_pass(fixture, Path(work_dir) / "timing.db", False, progress)
+                if measure_memory:
+                    memory = _run_pass(fixture, Path(work_dir) / "memory.db", True, progress)
+                    for record, measured in zip(records, memory):
+                        if (record["kind"], record["label"]) == (measured["kind"], measured["label"]):
+                            record["peak_kib"] = measured["peak_kib"]
+                results["results"].extend(_summarise(records, scale))
+                results["reruns"].extend({"scale": scale, **record} for record in records)
+    finally:
+        schema.DB_PATH = previous_db_path
+        if previous_library is None:
+            os.environ.pop("MUSIC_LIBRARY_PATH", None)
+        else:
+            os.environ["MUSIC_LIBRARY_PATH"] = previous_library
+    return results
@@ -0,0 +1,204 @@
+"""
+Bulk export of several sessions (M3U playlists and Word documents) into one ZIP archive.
+
+Each session is exported in a worker process through the export cache and
+the resulting files are streamed into the archive from disk as soon as they
+are ready. Sessions that have not changed since a previous export are served
+from the cache instead of being exported again.
+"""
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.db import schema
+from app.db.queries import (
+    get_session_by_id,
+    get_sessions_by_tags,
+    get_sessions_by_date_range,
+)
+
+EXPORT_FORMATS = ("m3u", "docx")
+
+
+def select_sessions(
+    session_ids: Optional[Iterable[str]] = None,
+    tags: Optional[Iterable[str]] = None,
+    match_all: bool = False,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> List[str]:
+    """
+    Pick the sessions to export by explicit IDs, tags and/or date range.
+
+    Criteria are combined: explicit IDs are always included, tags and the date
+    range narrow each other down when both are given.
+
+    Returns:
+        List of session IDs, without duplicates
+    """
+    selected = list(dict.fromkeys(session_ids or []))
+
+    tagged = None
+    if tags:
+        tagged = [s["id"] for s in get_sessions_by_tags(tags, match_all=match_all)]
+    dated = None
+    if date_from or date_to:
+        dated = [s["id"] for s in get_sessions_by_date_range(date_from, date_to)]
+
+    if tagged is not None and dated is not None:
+        dated_ids = set(dated)
+        matches = [session_id for session_id in tagged if session_id in dated_ids]
+    else:
+        matches = tagged if tagged is not None else dated or []
+
+    for session_id in matches:
+        if session_id not in selected:
+            selected.append(session_id)
+    return selected
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w\- ]+", "_", name or "").strip() or "Session"
+
+
+def _archive_folder(session_data: Dict) -> str:
+    date = session_data.get("date") or "undated"
+    return f"{date}_{_safe_name(session_data['name'])}_{session_data['id'][:8]}"
+
+
+def export_session_files(session_id: str, formats: List[str], db_path: str) -> Dict:
+    """
+    Export one session through the export cache (runs in a worker process).
+
+    Returns:
+        Dict with the session ID, its archive folder name, an optional error
+        and a list of {file, arcname, seconds, skipped} records; "file" is the
+        cached artifact and "skipped" tells whether it was already cached
+    """
+    # Worker processes may not inherit a DB_PATH overridden at runtime
+    schema.DB_PATH = db_path
+    # Imported here: the exporters pull in python-docx and the UI helpers
+    from app.exporter import playlist_artifact
+    from app.scripts.export_session_to_word import word_artifact
+
+    session_data, session_exercises = get_session_by_id(session_id)
+    if not session_data:
+        return {"session_id": session_id, "error": "Session not found", "files": []}
+
+    name = _safe_name(session_data["name"])
+    metadata = dict(session_data, name=name)
+    result = {
+        "session_id": session_id,
+        "folder": _archive_folder(session_data),
+        "error": None,
+        "files": [],
+    }
+    builders = {
+        "m3u": (playlist_artifact, f"{name}.m3u"),
+        "docx": (word_artifact, f"{name}_music_list.docx"),
+    }
+
+    try:
+        for fmt in formats:
+            build_artifact, arcname = builders[fmt]
+            start = time.perf_counter()
+            artifact, cache_hit = build_artifact(metadata, session_exercises)
+            if artifact:
+                result["files"].append(
+                    {
+                        "file": artifact,
+                        "arcname": arcname,
+                        "seconds": time.perf_counter() - start,
+                        "skipped": cache_hit,
+                    }
+                )
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def _write_session_files(archive: zipfile.ZipFile, result: Dict, report: Dict):
+    """Add one worker result's files to the archive and the report."""
+    if result["error"]:
+        report["errors"].append(
+            {"session_id": result["session_id"], "error": result["error"]}
+        )
+    for record in result["files"]:
+        try:
+            # ZipFile.write streams the file from disk in chunks
+            archive.write(
+                record["file"],
+                arcname=f"{result['folder']}/{record['arcname']}",
+            )
+        except FileNotFoundError:
+            # Evicted from the cache by a concurrent export
+            report["errors"].append(
+                {"session_id": result["session_id"], "error": f"Missing file {record['file']}"}
+            )
+            continue
+        report["files"].append(dict(record, session_id=result["session_id"]))
+
+
+def export_sessions(
+    session_ids: Iterable[str],
+    zip_path: str,
+    formats: Iterable[str] = EXPORT_FORMATS,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Dict:
+    """
+    Export several sessions in a process pool and stream the files into one ZIP.
+
+    Args:
+        session_ids: Sessions to export
+        zip_path: Path of the ZIP archive to write
+        formats: Any of "m3u" and "docx"
+        workers: Number of worker processes (defaults to the CPU count)
+        progress: Called with the number of sessions done after each one;
+            an exception raised there stops the export and removes the ZIP
+
+    Returns:
+        Dict with the archive path, per-file records (session_id, file,
+        seconds, skipped), per-session errors and the total time
+    """
+    started = time.perf_counter()
+    formats = [f for f in formats if f in EXPORT_FORMATS]
+    os.makedirs(os.path.dirname(os.path.abspath(zip_path)), exist_ok=True)
+
+    report = {"zip_path": zip_path, "files": [], "errors": [], "seconds": 0.0}
+    session_ids = list(dict.fromkeys(session_ids))
+
+    try:
+        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            # spawn: forking a server with live threads and open SQLite
+            # connections can deadlock or corrupt the children
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                futures = [
+                    pool.submit(
+                        export_session_files, session_id, formats, str(schema.DB_PATH)
+                    )
+                    for session_id in session_ids
+                ]
+                try:
+                    # Write each session's files as soon as its worker finishes
+                    for done, future in enumerate(as_completed(futures), 1):
+                        _write_session_files(archive, future.result(), report)
+                        if progress:
+                            progress(done)
+                except BaseException:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+    except BaseException:
+        # Do not leave a truncated archive behind
+        if os.path.exists(zip_path):
+            os.remove(zip_path)
+        raise
+
+    report["seconds"] = time.perf_counter() - started
+    return report
@@ -0,0 +1,248 @@
+"""
+Bulk export of the catalogue and of saved sessions to CSV or XLSX.
+
+Rows are streamed from SQLite with fetchmany and written one at a time, to
+CSV files or to an openpyxl write-only workbook, so memory use stays flat
+however large the tables are. The catalogue export uses the sheet names and
+column headers of the LSB Excel file, so it can be loaded back with
+data_loader.load_lsb_catalogue (an .xlsx file or a directory of CSV files).
+"""
+import csv
+import json
+import os
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from app.db.schema import get_db_connection
+
+# Rows fetched from SQLite per round trip
+FETCH_SIZE = 1000
+
+# (sheet name, query, column headers), in the layout read by load_lsb_catalogue
+CATALOGUE_SHEETS = [
+    (
+        "Musics",
+        """
+        SELECT music_ref, collection_cd, filename, title, artist, duration, v, c, a, s, t, bpm
+        FROM musics ORDER BY music_ref
+        """,
+        ["MusicRef", "Music 'CD' (Genre tag)", "Music filename", "Music Title (Movement Name tag)",
+         "Music Artist (Artist tag)", "Time", "V", "C", "A", "S", "T", "BPM"],
+    ),
+    (
+        "Exercises-to-Musics",
+        """
+        SELECT exercise_id, music_ref, recommendation, specific_comment
+        FROM exercise_music_mapping ORDER BY exercise_id, music_ref
+        """,
+        ["IBFex", "MusicRef", "Recommendation", "Exercise-Music specific comment"],
+    ),
+    (
+        "Exercises",
+        """
+        SELECT id, phase, category, name, short_name, aka, phase_reviewer, cimeb
+        FROM exercises ORDER BY id
+        """,
+        ["IBFex", "Phase", "IBFexCATEGORY", "IBFexNAME", "IBFexSHORT FORM NAME", "AKA",
+         "Phase_reviewer", "Cimeb"],
+    ),
+    (
+        "Exercise-Category",
+        "SELECT category_name FROM exercise_categories ORDER BY category_name",
+        ["IBFexCATEGORY"],
+    ),
+]
+
+SESSION_HEADERS = ["Session ID", "Name", "Description", "Date", "Tags", "Created", "Updated",
+                   "Version", "Template", "Archived"]
+SESSION_EXERCISE_HEADERS = ["Session ID", "Session Name", "#", "IBFex", "IBFexNAME", "Notes",
+                            "MusicRef", "Music Title", "Music Artist", "Time", "BPM"]
+
+
+def iter_query(sql: str, params: Sequence = ()) -> Iterator[tuple]:
+    """Yield the rows of a query as tuples, fetching FETCH_SIZE rows at a time."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield tuple(row)
+    finally:
+        conn.close()
+
+
+class CsvSheetWriter:
+    """Writes each sheet as <directory>/<sheet name>.csv."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write_sheet(self, name: str, headers: List[str], rows: Iterable[Sequence]) -> int:
+        count = 0
+        with open(os.path.join(self.directory, f"{name}.csv"), "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            for count, row in enumerate(rows, 1):
+                writer.writerow(row)
+        return count
+
+    def close(self):
+        pass
+
+
+class XlsxSheetWriter:
+    """Writes sheets into one workbook in openpyxl write-only (streaming) mode."""
+
+    def __init__(self, path: str):
+        # Imported here: openpyxl is only needed for XLSX output
+        from openpyxl import Workbook
+
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+
+    def write_sheet(self, name: str, headers: List[str], rows: Iterable[Sequence]) -> int:
+        sheet = self.workbook.create_sheet(title=name)
+        sheet.append(headers)
+        count = 0
+        for count, row in enumerate(rows, 1):
+            sheet.append(list(row))
+        return count
+
+    def close(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.workbook.save(self.path)
+
+
+def open_sheet_writer(output: str, fmt: Optional[str] = None):
+    """
+    Open a sheet writer for an output path.
+
+    Args:
+        output: .xlsx file, or directory for CSV files
+        fmt: "xlsx" or "csv"; guessed from the output extension when omitted
+    """
+    if fmt is None:
+        fmt = "xlsx" if output.lower().endswith(".xlsx") else "csv"
+    if fmt == "xlsx":
+        return XlsxSheetWriter(output)
+    if fmt == "csv":
+        return CsvSheetWriter(output)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_catalogue(output: str, fmt: Optional[str] = None) -> Dict[str, int]:
+    """
+    Export the four catalogue tables in the LSB Excel layout.
+
+    Returns:
+        Dict of sheet name to number of rows written
+    """
+    writer = open_sheet_writer(output, fmt)
+    counts = {}
+    for name, sql, headers in CATALOGUE_SHEETS:
+        counts[name] = writer.write_sheet(name, headers, iter_query(sql))
+    writer.close()
+    return counts
+
+
+def _session_rows(include_archived: bool) -> Iterator[tuple]:
+    yield from (
+        row + (0,)
+        for row in iter_query(
+            """
+            SELECT id, name, description, date, tags, created_at, updated_at, version, is_template
+            FROM sessions ORDER BY date, name
+            """
+        )
+    )
+    if include_archived:
+        for (payload,) in iter_query("SELECT payload FROM archived_sessions ORDER BY date, name"):
+            session = json.loads(zlib.decompress(payload))["session"]
+            yield tuple(
+                session.get(field)
+                for field in ("id", "name", "description", "date", "tags", "created_at",
+                              "updated_at", "version", "is_template")
+            ) + (1,)
+
+
+def _archived_exercise_rows() -> Iterator[tuple]:
+    """Rows of archived sessions, resolving names and songs one batch at a time."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        lookup = conn.cursor()
+        cursor.execute("SELECT payload FROM archived_sessions ORDER BY date, name")
+        while True:
+            batch = cursor.fetchmany(FETCH_SIZE)
+            if not batch:
+                break
+            payloads = [json.loads(zlib.decompress(row["payload"])) for row in batch]
+            exercise_ids = sorted({ex["exercise_id"] for p in payloads for ex in p["exercises"] if ex["exercise_id"]})
+            music_refs = sorted({ex["music_ref"] for p in payloads for ex in p["exercises"] if ex["music_ref"]})
+            names, songs = {}, {}
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(exercise_ids), 500):
+                chunk = exercise_ids[start:start + 500]
+                lookup.execute(
+                    f"SELECT id, name FROM exercises WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+                )
+                names.update((r["id"], r["name"]) for r in lookup.fetchall())
+            for start in range(0, len(music_refs), 500):
+                chunk = music_refs[start:start + 500]
+                lookup.execute(
+                    f"""
+                    SELECT music_ref, title, artist, duration, bpm FROM musics
+                    WHERE music_ref IN ({', '.join('?' for _ in chunk)})
+                    """,
+                    chunk,
+                )
+                songs.update((r["music_ref"], tuple(r)[1:]) for r in lookup.fetchall())
+            for payload in payloads:
+                session = payload["session"]
+                for ex in payload["exercises"]:
+                    yield (
+                        session["id"], session["name"], ex["sequence_number"], ex["exercise_id"],
+                        names.get(ex["exercise_id"]), ex["notes"], ex["music_ref"],
+                    ) + songs.get(ex["music_ref"], (None, None, None, None))
+    finally:
+        conn.close()
+
+
+def _session_exercise_rows(include_archived: bool) -> Iterator[tuple]:
+    yield from iter_query(
+        """
+        SELECT s.id, s.name, se.sequence_number, se.exercise_id, e.name, se.notes,
+               se.music_ref, m.title, m.artist, m.duration, m.bpm
+        FROM sessions s
+        JOIN session_exercises se ON se.session_id = s.id
+        LEFT JOIN exercises e ON e.id = se.exercise_id
+        LEFT JOIN musics m ON m.music_ref = se.music_ref
+        ORDER BY s.date, s.name, s.id, se.sequence_number
+        """
+    )
+    if include_archived:
+        yield from _archived_exercise_rows()
+
+
+def export_sessions_data(output: str, fmt: Optional[str] = None, include_archived: bool = True) -> Dict[str, int]:
+    """
+    Export saved sessions (one row each) and their exercises with the
+    selected songs (one row per session exercise).
+
+    Returns:
+        Dict of sheet name to number of rows written
+    """
+    writer = open_sheet_writer(output, fmt)
+    counts = {
+        "Sessions": writer.write_sheet("Sessions", SESSION_HEADERS, _session_rows(include_archived)),
+        "Session-Exercises": writer.write_sheet(
+            "Session-Exercises", SESSION_EXERCISE_HEADERS, _session_exercise_rows(include_archived)
+        ),
+    }
+    writer.close()
+    return counts
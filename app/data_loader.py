@@ -14,12 +14,30 @@ from app.db.queries import (
 )
 
 
-def load_lsb_catalogue(excel_path):
+# Columns read as text from CSV files, so IDs like "07" or times keep their form
+CSV_TEXT_COLUMNS = {"IBFex": str, "MusicRef": str, "IBFexCATEGORY": str, "Time": str}
+
+
+def _sheet_reader(source_path):
+    """Return a function reading a catalogue sheet by name into a DataFrame."""
+    source = Path(source_path)
+    if source.is_dir():
+        return lambda sheet_name: pd.read_csv(
+            source / f"{sheet_name}.csv", dtype=CSV_TEXT_COLUMNS
+        )
+    excel_file = pd.ExcelFile(source)
+    return lambda sheet_name: pd.read_excel(excel_file, sheet_name=sheet_name)
+
+
+def load_lsb_catalogue(excel_path, progress=None):
     """
     Load LSB catalogue data from Excel file into the SQLite database.
 
     Args:
-        excel_path (str): Path to the LSB Excel file
+        excel_path (str): Path to the LSB Excel file, or to a directory of
+            CSV files named after its sheets (as written by data_export)
+        progress (callable, optional): Called as progress(fraction, message)
+            before each sheet is loaded
 
     Returns:
         bool: True if successful, False otherwise
@@ -29,16 +47,20 @@ def load_lsb_catalogue(excel_path):
         if not init_db():
             return False
 
-        # Load the Excel file
-        excel_file = pd.ExcelFile(excel_path)
+        # Load the Excel file (or the directory of CSV files)
+        read_sheet = _sheet_reader(excel_path)
 
         # Load Exercise Categories
-        categories_df = pd.read_excel(excel_file, sheet_name="Exercise-Category")
+        if progress:
+            progress(0.0, "Loading exercise categories")
+        categories_df = read_sheet("Exercise-Category")
         categories = categories_df["IBFexCATEGORY"].tolist()
         insert_exercise_categories(categories)
 
         # Load Exercises
-        exercises_df = pd.read_excel(excel_file, sheet_name="Exercises")
+        if progress:
+            progress(0.2, "Loading exercises")
+        exercises_df = read_sheet("Exercises")
         exercises = []
         for _, row in exercises_df.iterrows():
             try:
@@ -66,13 +88,18 @@ def load_lsb_catalogue(excel_path):
                         else None
                     ),
                 }
+                # Exported catalogues carry the Cimeb flag; the LSB file does not
+                if "Cimeb" in row and not pd.isna(row["Cimeb"]):
+                    exercise["cimeb"] = int(row["Cimeb"])
                 exercises.append(exercise)
             except Exception as e:
                 print(f"Warning: Error processing exercise {row['IBFex']}: {e}")
         insert_exercises(exercises)
 
         # Load Musics
-        musics_df = pd.read_excel(excel_file, sheet_name="Musics")
+        if progress:
+            progress(0.4, "Loading musics")
+        musics_df = read_sheet("Musics")
         musics = []
         for _, row in musics_df.iterrows():
             try:
@@ -132,7 +159,9 @@ def load_lsb_catalogue(excel_path):
         insert_musics(musics)
 
         # Load Exercise-to-Music mappings
-        mappings_df = pd.read_excel(excel_file, sheet_name="Exercises-to-Musics")
+        if progress:
+            progress(0.7, "Loading exercise-music mappings")
+        mappings_df = read_sheet("Exercises-to-Musics")
         mappings = []
         for _, row in mappings_df.iterrows():
             try:
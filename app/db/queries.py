@@ -2,9 +2,12 @@
 Database query functions for the LSB Music App.
 """
 
+import json
+import re
 import sqlite3
 import uuid
-from datetime import datetime
+import zlib
+from datetime import datetime, timedelta
 from .schema import get_db_connection
 
 
@@ -261,6 +264,50 @@ def get_songs_for_exercise(exercise_id):
         conn.close()
 
 
+def get_songs_for_exercises(exercise_ids):
+    """
+    Get the songs of several exercises at once, as get_songs_for_exercise does
+    for one.
+
+    Args:
+        exercise_ids: Iterable of exercise IDs (duplicates and None are ignored)
+
+    Returns:
+        Dict of exercise ID -> list of song rows, ordered as in
+        get_songs_for_exercise; exercises without songs are left out
+    """
+    ids = sorted({exercise_id for exercise_id in exercise_ids if exercise_id is not None})
+    if not ids:
+        return {}
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        songs = {}
+        # Stay well below SQLite's limit on bound parameters per statement
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(
+                f"""
+                SELECT
+                    em.exercise_id,
+                    m.music_ref, m.title, m.artist, m.bpm, m.duration, m.filename,
+                    m.collection_cd, m.v, m.s, m.c, m.a, m.t, em.recommendation, em.specific_comment
+                FROM musics m
+                JOIN exercise_music_mapping em ON m.music_ref = em.music_ref
+                WHERE em.exercise_id IN ({placeholders})
+                ORDER BY em.exercise_id, em.recommendation DESC, m.title
+                """,
+                chunk,
+            )
+            for row in cursor.fetchall():
+                songs.setdefault(row["exercise_id"], []).append(row)
+        return songs
+    finally:
+        conn.close()
+
+
 def get_exercises_by_song_name(song_name):
     """
     Get exercises that are associated with songs matching the given name or vivencia.
@@ -313,9 +360,98 @@ def get_all_songs():
         conn.close()
 
 
+def get_songs_by_refs(music_refs):
+    """
+    Get the songs with the given music references.
+
+    Args:
+        music_refs: Iterable of music_ref values (duplicates and None are ignored)
+
+    Returns:
+        List of song rows, in no particular order
+    """
+    refs = sorted({ref for ref in music_refs if ref})
+    if not refs:
+        return []
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        songs = []
+        # Stay well below SQLite's limit on bound parameters per statement
+        for start in range(0, len(refs), 500):
+            chunk = refs[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(
+                f"""
+                SELECT music_ref, title, artist, bpm, duration, filename, collection_cd, v, s, c, a, t
+                FROM musics
+                WHERE music_ref IN ({placeholders})
+                """,
+                chunk,
+            )
+            songs.extend(cursor.fetchall())
+        return songs
+    finally:
+        conn.close()
+
+
+def get_catalogue_generation():
+    """
+    Get the catalogue generation counter.
+
+    The counter is bumped by triggers on every change to the catalogue
+    tables, so anything derived from the catalogue can be keyed by it.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT generation FROM catalogue_state WHERE id = 1")
+        row = cursor.fetchone()
+        return row["generation"] if row else 0
+    except sqlite3.Error as e:
+        print(f"Error retrieving catalogue generation: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
 # Session management functions
 
 
+def parse_session_tags(tags_text):
+    """
+    Split a free-text tags field into normalised tags.
+
+    Tags may be separated by commas and/or whitespace and may carry a leading
+    '#'. Tags are lower-cased and de-duplicated, preserving first-seen order.
+
+    Args:
+        tags_text: The raw tags string (e.g. "#warmup #Joy, trance")
+
+    Returns:
+        List of normalised tags (e.g. ["warmup", "joy", "trance"])
+    """
+    if not tags_text:
+        return []
+
+    tags = []
+    for token in re.split(r"[,\s]+", tags_text):
+        tag = token.strip().lstrip("#").lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def _replace_session_tags(cursor, session_id, tags_text):
+    """Rewrite the session_tags rows of a session from its tags string."""
+    cursor.execute("DELETE FROM session_tags WHERE session_id = ?", (session_id,))
+    cursor.executemany(
+        "INSERT INTO session_tags (session_id, tag) VALUES (?, ?)",
+        [(session_id, tag) for tag in parse_session_tags(tags_text)],
+    )
+
+
 def save_session(session_data, session_exercises):
     """
     Save or update a session with its exercises.
@@ -391,6 +527,9 @@ def save_session(session_data, session_exercises):
                     1,
                 ),
             )
+
+            # Saving a session loaded from the archive moves it back to the hot tier
+            cursor.execute("DELETE FROM archived_sessions WHERE id = ?", (session_id,))
         else:
             session_id = session_data["id"]
 
@@ -442,6 +581,9 @@ def save_session(session_data, session_exercises):
                 (session_id, i + 1, exercise_id, music_ref, notes),
             )
 
+        # Keep the normalised tag index in step with sessions.tags
+        _replace_session_tags(cursor, session_id, session_data.get("tags", ""))
+
         conn.commit()
         return True, "Session saved successfully", session_id
 
@@ -471,7 +613,8 @@ def get_session_by_id(session_id):
         session_data = cursor.fetchone()
 
         if not session_data:
-            return None, []
+            # Fall back to the cold tier so archived sessions stay loadable
+            return _get_archived_session(cursor, session_id)
 
         # Get session exercises
         cursor.execute(
@@ -487,28 +630,16 @@ def get_session_by_id(session_id):
         exercises = cursor.fetchall()
 
         # Format exercises as expected by the UI
-        session_exercises = []
-        for ex in exercises:
-            exercise_name = (
-                f"{ex['name']} [id {ex['exercise_original_id']}]"
-                if ex["name"]
-                else "Unknown Exercise"
-            )
-            # Create tuple with four elements: exercise name, music ref, exercise ID, and notes
-            # Check if the notes column exists and has a value
-            # try:
-            #     notes = ex["notes"] if ex["notes"] is not None else ""
-            # except (IndexError, KeyError):
-            #     notes = ""
-
-            session_exercises.append(
-                (
-                    exercise_name,
-                    ex["music_ref"],
-                    ex["exercise_id"],  # Store the exercise ID for song retrieval
-                    ex["notes"] if ex["notes"] is not None else "",  # Include notes
-                )
+        session_exercises = [
+            _format_session_exercise(
+                ex["name"],
+                ex["exercise_original_id"],
+                ex["music_ref"],
+                ex["exercise_id"],
+                ex["notes"],
             )
+            for ex in exercises
+        ]
 
         return dict(session_data), session_exercises
 
@@ -519,6 +650,53 @@ def get_session_by_id(session_id):
         conn.close()
 
 
+def _format_session_exercise(name, exercise_original_id, music_ref, exercise_id, notes):
+    """Build the (exercise name, music ref, exercise ID, notes) tuple used by the UI."""
+    exercise_name = (
+        f"{name} [id {exercise_original_id}]" if name else "Unknown Exercise"
+    )
+    return (
+        exercise_name,
+        music_ref,
+        exercise_id,  # Store the exercise ID for song retrieval
+        notes if notes is not None else "",
+    )
+
+
+def _get_archived_session(cursor, session_id):
+    """Decompress an archived session into the (session_data, session_exercises) shape."""
+    cursor.execute("SELECT payload FROM archived_sessions WHERE id = ?", (session_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None, []
+
+    payload = json.loads(zlib.decompress(row["payload"]))
+    exercises = payload["exercises"]
+
+    # Resolve exercise names in one query, as the hot path does with its join
+    exercise_ids = sorted({ex["exercise_id"] for ex in exercises if ex["exercise_id"]})
+    names = {}
+    if exercise_ids:
+        placeholders = ", ".join("?" for _ in exercise_ids)
+        cursor.execute(
+            f"SELECT id, name FROM exercises WHERE id IN ({placeholders})",
+            exercise_ids,
+        )
+        names = {r["id"]: r["name"] for r in cursor.fetchall()}
+
+    session_exercises = [
+        _format_session_exercise(
+            names.get(ex["exercise_id"]),
+            ex["exercise_id"],
+            ex["music_ref"],
+            ex["exercise_id"],
+            ex["notes"],
+        )
+        for ex in exercises
+    ]
+    return payload["session"], session_exercises
+
+
 def get_all_sessions():
     """
     Get a list of all saved sessions.
@@ -532,7 +710,7 @@ def get_all_sessions():
     try:
         cursor.execute(
             """
-            SELECT id, name, date, updated_at, 
+            SELECT id, name, date, updated_at, is_template,
                    (SELECT COUNT(*) FROM session_exercises WHERE session_id = sessions.id) as exercise_count
             FROM sessions
             ORDER BY updated_at DESC
@@ -546,15 +724,21 @@ def get_all_sessions():
         conn.close()
 
 
-def delete_session(session_id):
+def clone_session(session_id, new_name, new_date=None, as_template=False):
     """
-    Delete a session and its exercises.
+    Copy a session and its exercises server-side in a single transaction.
+
+    The rows are copied with INSERT ... SELECT, so the cost on the Python
+    side does not depend on how many exercises the session has.
 
     Args:
-        session_id: The UUID of the session to delete
+        session_id: The UUID of the session to copy
+        new_name: Name of the new session
+        new_date: Date of the new session (YYYY-MM-DD); keeps the source date if None
+        as_template: Whether the new session is flagged as a template
 
     Returns:
-        Boolean success
+        Tuple of (success, message, new_session_id)
     """
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -562,32 +746,1168 @@ def delete_session(session_id):
     try:
         conn.execute("BEGIN TRANSACTION")
 
-        # Delete session exercises first (could use cascade, but being explicit)
+        new_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+
         cursor.execute(
-            "DELETE FROM session_exercises WHERE session_id = ?", (session_id,)
+            """
+            INSERT INTO sessions
+            (id, name, description, date, tags, created_at, updated_at, version, is_template)
+            SELECT ?, ?, description, COALESCE(?, date), tags, ?, ?, 1, ?
+            FROM sessions
+            WHERE id = ?
+            """,
+            (new_id, new_name, new_date, now, now, 1 if as_template else 0, session_id),
         )
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return False, "Session not found", None
 
-        # Delete the session
-        cursor.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        cursor.execute(
+            """
+            INSERT INTO session_exercises
+            (session_id, sequence_number, exercise_id, music_ref, notes)
+            SELECT ?, sequence_number, exercise_id, music_ref, notes
+            FROM session_exercises
+            WHERE session_id = ?
+            ORDER BY sequence_number
+            """,
+            (new_id, session_id),
+        )
+        cursor.execute(
+            """
+            INSERT INTO session_tags (session_id, tag)
+            SELECT ?, tag FROM session_tags WHERE session_id = ?
+            """,
+            (new_id, session_id),
+        )
 
         conn.commit()
-        return True
+        return True, "Session cloned successfully", new_id
+
     except sqlite3.Error as e:
         conn.rollback()
-        print(f"Error deleting session: {e}")
+        return False, f"Error cloning session: {e}", None
+    finally:
+        conn.close()
+
+
+def instantiate_template(template_id, new_name, new_date=None):
+    """
+    Create a new (non-template) session from a template session.
+
+    Args:
+        template_id: The UUID of the template session
+        new_name: Name of the new session
+        new_date: Date of the new session (YYYY-MM-DD)
+
+    Returns:
+        Tuple of (success, message, new_session_id)
+    """
+    return clone_session(template_id, new_name, new_date, as_template=False)
+
+
+def set_session_template(session_id, is_template=True):
+    """
+    Flag or unflag a session as a template.
+
+    Args:
+        session_id: The UUID of the session
+        is_template: Whether the session should be a template
+
+    Returns:
+        Boolean success
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "UPDATE sessions SET is_template = ? WHERE id = ?",
+            (1 if is_template else 0, session_id),
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error updating template flag: {e}")
         return False
     finally:
         conn.close()
 
 
-def get_exercise_phase_by_id(exercise_id):
-    """Get the phase of an exercise by its ID."""
+def get_template_sessions():
+    """
+    Get all sessions flagged as templates.
+
+    Returns:
+        List of session metadata dicts, ordered by name
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
+
     try:
-        cursor.execute("SELECT phase FROM exercises WHERE id = ?", (exercise_id,))
-        row = cursor.fetchone()
-        return row["phase"] if row else None
+        cursor.execute(
+            """
+            SELECT id, name, date, updated_at,
+                   (SELECT COUNT(*) FROM session_exercises WHERE session_id = sessions.id) as exercise_count
+            FROM sessions
+            WHERE is_template = 1
+            ORDER BY name
+            """
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error retrieving templates: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_sessions_by_tags(tags, match_all=False):
+    """
+    Get sessions carrying the given tags using the session_tags index.
+
+    Args:
+        tags: Iterable of tags (with or without a leading '#')
+        match_all: If True, only return sessions that carry every tag;
+            otherwise return sessions that carry any of them
+
+    Returns:
+        List of session metadata dicts, most recently updated first
+    """
+    wanted = parse_session_tags(" ".join(tags))
+    if not wanted:
+        return []
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        placeholders = ", ".join("?" for _ in wanted)
+        having = "HAVING COUNT(DISTINCT st.tag) = ?" if match_all else ""
+        params = list(wanted) + ([len(wanted)] if match_all else [])
+        cursor.execute(
+            f"""
+            WITH tagged AS (
+                SELECT st.session_id
+                FROM session_tags st
+                WHERE st.tag IN ({placeholders})
+                GROUP BY st.session_id
+                {having}
+            )
+            SELECT id, name, date, updated_at, 0 as archived,
+                   (SELECT COUNT(*) FROM session_exercises WHERE session_id = sessions.id) as exercise_count
+            FROM sessions
+            WHERE id IN (SELECT session_id FROM tagged)
+            UNION ALL
+            SELECT id, name, date, updated_at, 1 as archived, exercise_count
+            FROM archived_sessions
+            WHERE id IN (SELECT session_id FROM tagged)
+            ORDER BY updated_at DESC
+            """,
+            params,
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error retrieving sessions by tags: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_tag_counts():
+    """
+    Get how many sessions carry each tag, for tag facets.
+
+    Returns:
+        List of dicts with 'tag' and 'session_count', most used first
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """
+            SELECT tag, COUNT(*) as session_count
+            FROM session_tags
+            GROUP BY tag
+            ORDER BY session_count DESC, tag
+            """
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error retrieving tag counts: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def rebuild_session_tags():
+    """
+    Backfill the session_tags table from the tags column of every session,
+    hot or archived.
+
+    Returns:
+        Number of tag rows written, or None on error
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        cursor.execute("DELETE FROM session_tags")
+        cursor.execute(
+            "SELECT id, tags FROM sessions UNION ALL SELECT id, tags FROM archived_sessions"
+        )
+        rows = [
+            (row["id"], tag)
+            for row in cursor.fetchall()
+            for tag in parse_session_tags(row["tags"])
+        ]
+        cursor.executemany(
+            "INSERT INTO session_tags (session_id, tag) VALUES (?, ?)", rows
+        )
+        conn.commit()
+        return len(rows)
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error rebuilding session tags: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_sessions_page(limit=50, offset=0, include_archived=True):
+    """
+    Get one page of saved sessions across the hot and archived tiers.
+
+    Args:
+        limit: Maximum number of sessions to return
+        offset: Number of sessions to skip
+        include_archived: Whether archived sessions are included
+
+    Returns:
+        List of session metadata dicts (with an 'archived' flag), most recently updated first
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        archived_sql = (
+            """
+            UNION ALL
+            SELECT id, name, date, updated_at, 0 as is_template, 1 as archived, exercise_count
+            FROM archived_sessions
+            """
+            if include_archived
+            else ""
+        )
+        cursor.execute(
+            f"""
+            SELECT id, name, date, updated_at, is_template, 0 as archived,
+                   (SELECT COUNT(*) FROM session_exercises WHERE session_id = sessions.id) as exercise_count
+            FROM sessions
+            {archived_sql}
+            ORDER BY updated_at DESC
+            LIMIT ? OFFSET ?
+            """,
+            (limit, offset),
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error retrieving sessions page: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_sessions_by_date_range(date_from=None, date_to=None, include_archived=True):
+    """
+    Get sessions whose date falls within an inclusive range.
+
+    Args:
+        date_from: First date (YYYY-MM-DD), or None for no lower bound
+        date_to: Last date (YYYY-MM-DD), or None for no upper bound
+        include_archived: Whether archived sessions are included
+
+    Returns:
+        List of session metadata dicts, ordered by date
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        where = "date >= COALESCE(?, date) AND date <= COALESCE(?, date) AND date != ''"
+        archived_sql = (
+            f"""
+            UNION ALL
+            SELECT id, name, date, updated_at, 1 as archived
+            FROM archived_sessions
+            WHERE {where}
+            """
+            if include_archived
+            else ""
+        )
+        params = [date_from, date_to] * (2 if include_archived else 1)
+        cursor.execute(
+            f"""
+            SELECT id, name, date, updated_at, 0 as archived
+            FROM sessions
+            WHERE {where}
+            {archived_sql}
+            ORDER BY date, name
+            """,
+            params,
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error retrieving sessions by date: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def count_sessions(include_archived=True):
+    """Count saved sessions, optionally including archived ones."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT COUNT(*) FROM sessions")
+        total = cursor.fetchone()[0]
+        if include_archived:
+            cursor.execute("SELECT COUNT(*) FROM archived_sessions")
+            total += cursor.fetchone()[0]
+        return total
+    except sqlite3.Error as e:
+        print(f"Error counting sessions: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def archive_sessions(older_than_days=365):
+    """
+    Move sessions not updated for a given number of days into the archive tier.
+
+    Each archived session is stored as one zlib-compressed JSON blob and its
+    rows are removed from the sessions and session_exercises tables. Tags stay
+    in session_tags so tag searches still find archived sessions. Templates
+    are never archived.
+
+    Args:
+        older_than_days: Minimum age, in days since the last update
+
+    Returns:
+        Number of sessions archived, or None on error
+    """
+    cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+    archived_at = datetime.now().isoformat()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        conn.execute("BEGIN TRANSACTION")
+
+        cursor.execute(
+            """
+            SELECT * FROM sessions
+            WHERE updated_at < ? AND COALESCE(is_template, 0) = 0
+            """,
+            (cutoff,),
+        )
+        sessions = [dict(row) for row in cursor.fetchall()]
+
+        for session in sessions:
+            cursor.execute(
+                """
+                SELECT sequence_number, exercise_id, music_ref, notes
+                FROM session_exercises
+                WHERE session_id = ?
+                ORDER BY sequence_number
+                """,
+                (session["id"],),
+            )
+            exercises = [dict(row) for row in cursor.fetchall()]
+            payload = zlib.compress(
+                json.dumps(
+                    {"session": session, "exercises": exercises},
+                    separators=(",", ":"),
+                ).encode("utf-8"),
+                9,
+            )
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO archived_sessions
+                (id, name, date, tags, updated_at, archived_at, exercise_count, payload)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    session["id"],
+                    session["name"],
+                    session["date"],
+                    session["tags"],
+                    session["updated_at"],
+                    archived_at,
+                    len(exercises),
+                    payload,
+                ),
+            )
+            cursor.execute(
+                "DELETE FROM session_exercises WHERE session_id = ?", (session["id"],)
+            )
+            cursor.execute("DELETE FROM sessions WHERE id = ?", (session["id"],))
+
+        conn.commit()
+        return len(sessions)
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error archiving sessions: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def restore_archived_session(session_id):
+    """
+    Move an archived session back into the sessions and session_exercises tables.
+
+    Args:
+        session_id: The UUID of the archived session
+
+    Returns:
+        Boolean success
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        conn.execute("BEGIN TRANSACTION")
+
+        cursor.execute(
+            "SELECT payload FROM archived_sessions WHERE id = ?", (session_id,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            conn.rollback()
+            return False
+
+        payload = json.loads(zlib.decompress(row["payload"]))
+        session = payload["session"]
+        columns = list(session.keys())
+        cursor.execute(
+            f"""
+            INSERT INTO sessions ({", ".join(columns)})
+            VALUES ({", ".join("?" for _ in columns)})
+            """,
+            [session[c] for c in columns],
+        )
+        cursor.executemany(
+            """
+            INSERT INTO session_exercises
+            (session_id, sequence_number, exercise_id, music_ref, notes)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    session_id,
+                    ex["sequence_number"],
+                    ex["exercise_id"],
+                    ex["music_ref"],
+                    ex["notes"],
+                )
+                for ex in payload["exercises"]
+            ],
+        )
+        cursor.execute("DELETE FROM archived_sessions WHERE id = ?", (session_id,))
+
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error restoring archived session: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def delete_session(session_id):
+    """
+    Delete a session and its exercises.
+
+    Args:
+        session_id: The UUID of the session to delete
+
+    Returns:
+        Boolean success
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        conn.execute("BEGIN TRANSACTION")
+
+        # Delete session exercises first (could use cascade, but being explicit)
+        cursor.execute(
+            "DELETE FROM session_exercises WHERE session_id = ?", (session_id,)
+        )
+
+        cursor.execute("DELETE FROM session_tags WHERE session_id = ?", (session_id,))
+
+        # Delete the session (from whichever tier holds it)
+        cursor.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        cursor.execute("DELETE FROM archived_sessions WHERE id = ?", (session_id,))
+
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error deleting session: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+# Background job functions
+
+
+def create_job(kind, params=None, owner=None):
+    """
+    Record a new queued job.
+
+    Args:
+        kind: Handler name
+        params: JSON-serialisable handler arguments
+        owner: Process that will run the job (see jobs.job_owner)
+
+    Returns:
+        The job ID, or None on error
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        job_id = str(uuid.uuid4())
+        cursor.execute(
+            """
+            INSERT INTO jobs (id, kind, params, status, created_at, owner)
+            VALUES (?, ?, ?, 'queued', ?, ?)
+            """,
+            (job_id, kind, json.dumps(params or {}, default=str), datetime.now().isoformat(), owner),
+        )
+        conn.commit()
+        return job_id
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error creating job: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def _format_job(row):
+    job = {k: row[k] for k in row.keys()}
+    job["params"] = json.loads(job["params"]) if job["params"] else {}
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+
+def get_job(job_id):
+    """Get a job by ID as a dict (params and result decoded), or None."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        return _format_job(row) if row else None
+    except sqlite3.Error as e:
+        print(f"Error retrieving job: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def get_recent_jobs(limit=20, kinds=None):
+    """Get the most recently created jobs, newest first."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        query = "SELECT * FROM jobs"
+        params = []
+        if kinds:
+            query += f" WHERE kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        cursor.execute(query, params)
+        return [_format_job(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error retrieving jobs: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def update_job(job_id, **fields):
+    """
+    Update job columns (status, progress, message, result, error, timestamps).
+
+    The result is JSON-encoded. Returns the job's cancel_requested flag so
+    running handlers learn about cancellation on every progress update.
+    """
+    allowed = {"status", "progress", "message", "result", "error", "started_at", "finished_at"}
+    updates = {k: v for k, v in fields.items() if k in allowed}
+    if "result" in updates:
+        updates["result"] = json.dumps(updates["result"], default=str)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        if updates:
+            assignments = ", ".join(f"{column} = ?" for column in updates)
+            cursor.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                list(updates.values()) + [job_id],
+            )
+            conn.commit()
+        cursor.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        return bool(row and row["cancel_requested"])
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error updating job: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def request_job_cancel(job_id):
+    """
+    Cancel a job: queued jobs are cancelled at once, running jobs are flagged
+    and stop at their next progress update.
+
+    Returns:
+        The job status after the request, or None if the job is not found
+        or already finished
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        cursor.execute(
+            """
+            UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ?
+            WHERE id = ? AND status = 'queued'
+            """,
+            (datetime.now().isoformat(), job_id),
+        )
+        cursor.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'",
+            (job_id,),
+        )
+        cursor.execute("SELECT status FROM jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        conn.commit()
+        if not row or row["status"] not in ("cancelled", "running"):
+            return None
+        return row["status"]
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error cancelling job: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def fail_interrupted_jobs(owner_alive=None):
+    """
+    Mark queued/running jobs whose process has stopped as failed.
+
+    Args:
+        owner_alive: Called with a job's owner; jobs whose owner is alive
+            are left alone. Without it (or without an owner) a job counts
+            as interrupted.
+
+    Returns:
+        Number of jobs marked
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT id, owner FROM jobs WHERE status IN ('queued', 'running')")
+        job_ids = [
+            row["id"] for row in cursor.fetchall()
+            if not (owner_alive and row["owner"] and owner_alive(row["owner"]))
+        ]
+        failed = 0
+        for start in range(0, len(job_ids), 500):
+            chunk = job_ids[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(
+                f"""
+                UPDATE jobs SET status = 'failed', error = 'Interrupted: the app process running it stopped',
+                    finished_at = ?
+                WHERE id IN ({placeholders}) AND status IN ('queued', 'running')
+                """,
+                [datetime.now().isoformat(), *chunk],
+            )
+            failed += cursor.rowcount
+        conn.commit()
+        return failed
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error failing interrupted jobs: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+# Music library index functions
+
+
+def get_library_state():
+    """Get the library index state (root, scanned_at, generation) as a dict."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT root, scanned_at, generation FROM library_state WHERE id = 1")
+        row = cursor.fetchone()
+        return dict(row) if row else {"root": None, "scanned_at": None, "generation": 0}
+    except sqlite3.Error as e:
+        print(f"Error retrieving library state: {e}")
+        return {"root": None, "scanned_at": None, "generation": 0}
+    finally:
+        conn.close()
+
+
+def get_library_dirs():
+    """Get the indexed library directories as {directory: (parent, mtime_ns)}."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT directory, parent, mtime_ns FROM library_dirs")
+        return {row["directory"]: (row["parent"], row["mtime_ns"]) for row in cursor.fetchall()}
+    except sqlite3.Error as e:
+        print(f"Error retrieving library directories: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+def get_library_files():
+    """Get all indexed library files, root-level files first."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """
+            SELECT path, directory, name_key, stem_key, ext, size, mtime_ns
+            FROM library_files
+            ORDER BY directory != '', path
+            """
+        )
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        print(f"Error retrieving library files: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def apply_library_scan(root, seen_dirs, rescanned, full=False):
+    """
+    Store the result of a library scan.
+
+    Args:
+        root: Library root the scan ran on
+        seen_dirs: {directory: (parent, mtime_ns)} of every directory found
+        rescanned: {directory: [file dicts]} for the directories that were
+            listed again; their previous files are replaced
+        full: Whether the scan started from an empty index (drops all rows)
+
+    Returns:
+        The new index generation, or None on error
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        removed = []
+        if full:
+            cursor.execute("DELETE FROM library_files")
+            cursor.execute("DELETE FROM library_dirs")
+        else:
+            # Directories that disappeared take their files with them
+            cursor.execute("SELECT directory FROM library_dirs")
+            removed = [row["directory"] for row in cursor.fetchall() if row["directory"] not in seen_dirs]
+            cursor.executemany("DELETE FROM library_dirs WHERE directory = ?", [(d,) for d in removed])
+            cursor.executemany("DELETE FROM library_files WHERE directory = ?", [(d,) for d in removed])
+
+        cursor.executemany(
+            "DELETE FROM library_files WHERE directory = ?", [(d,) for d in rescanned]
+        )
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO library_files
+            (path, directory, name_key, stem_key, ext, size, mtime_ns)
+            VALUES (:path, :directory, :name_key, :stem_key, :ext, :size, :mtime_ns)
+            """,
+            [f for files in rescanned.values() for f in files],
+        )
+        cursor.executemany(
+            "INSERT OR REPLACE INTO library_dirs (directory, parent, mtime_ns) VALUES (?, ?, ?)",
+            [(d, parent, mtime_ns) for d, (parent, mtime_ns) in seen_dirs.items()],
+        )
+
+        changed = full or bool(rescanned) or bool(removed)
+        cursor.execute(
+            f"""
+            UPDATE library_state
+            SET root = ?, scanned_at = ?, generation = generation + {1 if changed else 0}
+            WHERE id = 1
+            """,
+            (root, datetime.now().isoformat()),
+        )
+        cursor.execute("SELECT generation FROM library_state WHERE id = 1")
+        generation = cursor.fetchone()["generation"]
+        conn.commit()
+        return generation
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error storing library scan: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+# Catalogue file check functions
+
+
+def get_song_file_check_state():
+    """Get the root and generations the stored song file statuses were computed for."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """
+            SELECT root, library_generation, catalogue_generation, checked_at
+            FROM song_file_check_state WHERE id = 1
+            """
+        )
+        row = cursor.fetchone()
+        if row:
+            return dict(row)
+    except sqlite3.Error as e:
+        print(f"Error retrieving song file check state: {e}")
+    finally:
+        conn.close()
+    return {"root": None, "library_generation": None, "catalogue_generation": None, "checked_at": None}
+
+
+def store_song_file_statuses(root, library_generation, catalogue_generation, statuses):
+    """
+    Replace the stored song file statuses with the result of a check.
+
+    Args:
+        root: Library root checked
+        library_generation: Library index generation checked against
+        catalogue_generation: Catalogue generation checked
+        statuses: Iterable of (music_ref, status, path) tuples
+
+    Returns:
+        True on success, False on error
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        cursor.execute("DELETE FROM song_file_status")
+        cursor.executemany(
+            "INSERT INTO song_file_status (music_ref, status, path) VALUES (?, ?, ?)", statuses
+        )
+        cursor.execute(
+            """
+            UPDATE song_file_check_state
+            SET root = ?, library_generation = ?, catalogue_generation = ?, checked_at = ?
+            WHERE id = 1
+            """,
+            (root, library_generation, catalogue_generation, datetime.now().isoformat()),
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error storing song file statuses: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def get_song_file_status_counts():
+    """Get the number of catalogue songs per file status as {status: count}."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT status, COUNT(*) AS count FROM song_file_status GROUP BY status")
+        return {row["status"]: row["count"] for row in cursor.fetchall()}
+    except sqlite3.Error as e:
+        print(f"Error counting song file statuses: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+def get_song_file_problems(statuses):
+    """
+    Get the catalogue songs whose file status is one of the given statuses.
+
+    Returns:
+        Rows with music_ref, status, path, filename, title and artist,
+        ordered by status and title
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            f"""
+            SELECT s.music_ref, s.status, s.path, m.filename, m.title, m.artist
+            FROM song_file_status s
+            JOIN musics m ON m.music_ref = s.music_ref
+            WHERE s.status IN ({', '.join('?' for _ in statuses)})
+            ORDER BY s.status, m.title
+            """,
+            list(statuses),
+        )
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        print(f"Error retrieving song file problems: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_playable_song_counts(playable_statuses):
+    """
+    Get, per exercise, how many of its recommended songs have a playable file.
+
+    Answered from the stored song file statuses, without touching the
+    filesystem; empty until the catalogue files have been checked once.
+
+    Returns:
+        Dict of exercise_id to (playable songs, songs)
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT 1 FROM song_file_status LIMIT 1")
+        if cursor.fetchone() is None:
+            return {}
+        cursor.execute(
+            f"""
+            SELECT emm.exercise_id,
+                   SUM(s.status IN ({', '.join('?' for _ in playable_statuses)})) AS playable,
+                   COUNT(*) AS total
+            FROM exercise_music_mapping emm
+            LEFT JOIN song_file_status s ON s.music_ref = emm.music_ref
+            GROUP BY emm.exercise_id
+            """,
+            list(playable_statuses),
+        )
+        return {row["exercise_id"]: (row["playable"] or 0, row["total"]) for row in cursor.fetchall()}
+    except sqlite3.Error as e:
+        print(f"Error counting playable songs: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+# Audio metadata functions
+
+
+def get_audio_metadata_to_read(force=False):
+    """
+    Get the library files whose audio metadata is missing or stale, i.e.
+    was read when the file had another size or modification time.
+
+    Args:
+        force: Return every library file
+
+    Returns:
+        List of (path, size, mtime_ns) tuples
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            f"""
+            SELECT lf.path, lf.size, lf.mtime_ns
+            FROM library_files lf
+            LEFT JOIN audio_metadata am ON am.path = lf.path
+            {"" if force else "WHERE am.path IS NULL OR am.size IS NOT lf.size OR am.mtime_ns IS NOT lf.mtime_ns"}
+            """
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error retrieving stale audio metadata: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def store_audio_metadata(rows):
+    """
+    Store audio metadata rows of (path, size, mtime_ns, format, duration,
+    bitrate, sample_rate, channels, error).
+    """
+    if not rows:
+        return True
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO audio_metadata
+            (path, size, mtime_ns, format, duration, bitrate, sample_rate, channels, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        cursor.execute("UPDATE audio_metadata_state SET generation = generation + 1 WHERE id = 1")
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error storing audio metadata: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def prune_audio_metadata():
+    """Delete the audio metadata of files no longer in the library index."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("DELETE FROM audio_metadata WHERE path NOT IN (SELECT path FROM library_files)")
+        pruned = cursor.rowcount
+        if pruned:
+            cursor.execute("UPDATE audio_metadata_state SET generation = generation + 1 WHERE id = 1")
+        conn.commit()
+        return pruned
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Error pruning audio metadata: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def get_audio_metadata_generation():
+    """
+    Get the audio metadata generation counter, bumped whenever audio
+    metadata is stored or pruned.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT generation FROM audio_metadata_state WHERE id = 1")
+        row = cursor.fetchone()
+        return row["generation"] if row else 0
+    except sqlite3.Error as e:
+        print(f"Error retrieving audio metadata generation: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def get_measured_song_durations():
+    """
+    Get the catalogue songs whose matched file has an up-to-date measured
+    duration.
+
+    Returns:
+        Rows with music_ref, title, artist, duration (catalogue text), path
+        and measured_duration (seconds)
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """
+            SELECT m.music_ref, m.title, m.artist, m.duration, s.path, am.duration AS measured_duration
+            FROM song_file_status s
+            JOIN musics m ON m.music_ref = s.music_ref
+            JOIN library_files lf ON lf.path = s.path
+            JOIN audio_metadata am
+              ON am.path = lf.path AND am.size = lf.size AND am.mtime_ns = lf.mtime_ns
+            WHERE am.duration IS NOT NULL
+            ORDER BY m.title
+            """
+        )
+        return cursor.fetchall()
+    except sqlite3.Error as e:
+        print(f"Error retrieving measured song durations: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def get_exercise_phase_by_id(exercise_id):
+    """Get the phase of an exercise by its ID."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT phase FROM exercises WHERE id = ?", (exercise_id,))
+        row = cursor.fetchone()
+        return row["phase"] if row else None
+    finally:
+        conn.close()
+
+
+def get_exercise_phases_by_ids(exercise_ids):
+    """
+    Get the phases of several exercises at once.
+
+    Args:
+        exercise_ids: Iterable of exercise IDs (duplicates and None are ignored)
+
+    Returns:
+        Dict of exercise ID -> phase; unknown exercises are left out
+    """
+    ids = sorted({exercise_id for exercise_id in exercise_ids if exercise_id is not None})
+    if not ids:
+        return {}
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        phases = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(f"SELECT id, phase FROM exercises WHERE id IN ({placeholders})", chunk)
+            phases.update((row["id"], row["phase"]) for row in cursor.fetchall())
+        return phases
     finally:
         conn.close()
 
@@ -0,0 +1,314 @@
+"""
+Per-query latency histograms and query plans for the LSB Music App.
+
+While collection is on (SQL_STATS in .env, or started from the debug page),
+every statement run through get_db_connection() in this process is timed
+into a latency histogram of its fingerprint (see tracing.py): one sample
+per execution, from the execute to the last row fetched. Histograms use
+HDR-style log-linear buckets, so their memory does not grow with the number
+of executions and percentiles stay within a few percent at any latency.
+
+The EXPLAIN QUERY PLAN of each fingerprint is captured once, the first time
+the statistics are read, from an example of the statement with its values.
+A query whose plan scans a table of LARGE_TABLE_ROWS rows or more is flagged:
+it slows down as the catalogue or the session history grows.
+
+The statistics are shown on the debug page (app/pages/_debug.py, at /debug,
+served only with DEBUG_PAGE in .env) and can be dumped as JSON with
+dump_query_stats().
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.db import schema
+from app.db.tracing import add_statement_sink, recent_traces, remove_statement_sink
+
+# Collect query statistics from the start (SQL_STATS in .env)
+SQL_STATS = os.getenv("SQL_STATS", "").lower() in ("1", "true", "yes")
+
+# Rows from which a scanned table counts as large (SQL_LARGE_TABLE_ROWS in .env)
+LARGE_TABLE_ROWS = int(os.getenv("SQL_LARGE_TABLE_ROWS", "1000"))
+
+# Where dump_query_stats() writes by default (QUERY_STATS_PATH in .env)
+QUERY_STATS_PATH = Path(
+    os.getenv("QUERY_STATS_PATH") or Path(__file__).parent.parent.parent / "data" / "query_stats.json"
+)
+
+# Linear buckets per power of two: values are recorded within 1/16 (6 %)
+SUB_BUCKETS = 16
+
+# Fingerprints tracked; statements beyond are counted under OTHER_QUERIES
+MAX_FINGERPRINTS = 500
+OTHER_QUERIES = "(other queries)"
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "REPLACE", "UPDATE", "DELETE")
+_SCAN_RE = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+_TABLE_RE = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_NOT_ALIASES = {
+    "WHERE", "ON", "USING", "LEFT", "RIGHT", "INNER", "OUTER", "CROSS", "JOIN", "NATURAL", "GROUP", "ORDER",
+    "LIMIT", "HAVING", "UNION", "EXCEPT", "INTERSECT", "SET", "VALUES", "SELECT", "DEFAULT", "WINDOW",
+}
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with HDR-style log-linear buckets: every power of two
+    of microseconds is split into SUB_BUCKETS equal buckets, from 1 µs up.
+    """
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @staticmethod
+    def bucket(seconds: float) -> int:
+        """Index of the bucket of a latency; bucket 0 holds everything under 1 µs."""
+        micros = seconds * 1_000_000
+        if micros < 1:
+            return 0
+        mantissa, exponent = math.frexp(micros)    # micros = mantissa * 2 ** exponent, 0.5 <= mantissa < 1
+        return (exponent - 1) * SUB_BUCKETS + int((mantissa * 2 - 1) * SUB_BUCKETS) + 1
+
+    @staticmethod
+    def bucket_bounds(index: int) -> Tuple[float, float]:
+        """Lower and upper latency of a bucket, in seconds."""
+        if index == 0:
+            return 0.0, 1e-6
+        exponent, sub_bucket = divmod(index - 1, SUB_BUCKETS)
+        low = 2 ** exponent * (1 + sub_bucket / SUB_BUCKETS)
+        return low / 1_000_000, (low + 2 ** exponent / SUB_BUCKETS) / 1_000_000
+
+    def record(self, seconds: float):
+        index = self.bucket(seconds)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the nearest-rank percentile (capped at the maximum)."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * fraction))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        """Count, total, mean, min, max and p50/p90/p99/p99.9 in ms, and the non-empty buckets."""
+        def ms(seconds):
+            return round(seconds * 1000, 4) if seconds is not None else None
+
+        return {
+            "count": self.count,
+            "total_ms": ms(self.total),
+            "mean_ms": ms(self.total / self.count) if self.count else None,
+            "min_ms": ms(self.min),
+            "max_ms": ms(self.max),
+            "p50_ms": ms(self.percentile(0.50)),
+            "p90_ms": ms(self.percentile(0.90)),
+            "p99_ms": ms(self.percentile(0.99)),
+            "p999_ms": ms(self.percentile(0.999)),
+            "buckets": [
+                [ms(self.bucket_bounds(index)[0]), ms(self.bucket_bounds(index)[1]), self.counts[index]]
+                for index in sorted(self.counts)
+            ],
+        }
+
+
+class _QueryStats:
+    """What is known of one fingerprint."""
+
+    def __init__(self, fingerprint: str, example: str):
+        self.fingerprint = fingerprint
+        self.example = example
+        self.statements = 0
+        self.histogram = LatencyHistogram()
+        self.plan: Optional[List[str]] = None
+        self.scans: List[Dict] = []
+
+
+class _QueryStatsCollector:
+    """Statement sink (see tracing.add_statement_sink) keeping a _QueryStats per fingerprint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries: Dict[str, _QueryStats] = {}
+        self.started_at: Optional[str] = None
+
+    def _entry(self, key: str, example: str) -> _QueryStats:
+        entry = self.queries.get(key)
+        if entry is None:
+            if len(self.queries) >= MAX_FINGERPRINTS:
+                key = example = OTHER_QUERIES
+                entry = self.queries.get(key)
+            if entry is None:
+                entry = self.queries[key] = _QueryStats(key, example)
+        return entry
+
+    def on_connection(self):
+        pass
+
+    def on_statement(self, key: str, sql: str):
+        with self.lock:
+            self._entry(key, sql).statements += 1
+
+    def on_time(self, key: str, seconds: float):
+        with self.lock:
+            self._entry(key, key).histogram.record(seconds)
+
+
+_collector = _QueryStatsCollector()
+_collecting = False
+_collecting_lock = threading.Lock()
+
+
+def query_stats_enabled() -> bool:
+    """Whether statistics are being collected."""
+    return _collecting
+
+
+def start_query_stats():
+    """Start collecting statistics (no-op if already collecting)."""
+    global _collecting
+    with _collecting_lock:
+        if not _collecting:
+            add_statement_sink(_collector)
+            _collecting = True
+            _collector.started_at = _collector.started_at or datetime.now().isoformat(timespec="seconds")
+
+
+def stop_query_stats():
+    """Stop collecting; the statistics so far are kept."""
+    global _collecting
+    with _collecting_lock:
+        if _collecting:
+            remove_statement_sink(_collector)
+            _collecting = False
+
+
+def reset_query_stats():
+    """Forget the statistics and plans collected so far."""
+    with _collector.lock:
+        _collector.queries.clear()
+        _collector.started_at = datetime.now().isoformat(timespec="seconds") if _collecting else None
+
+
+def _table_names(sql: str) -> Dict[str, str]:
+    """Tables of a statement by the name or alias its query plan uses for them."""
+    names = {}
+    for table, alias in _TABLE_RE.findall(sql):
+        names[table] = table
+        if alias and alias.upper() not in _NOT_ALIASES:
+            names[alias] = table
+    return names
+
+
+def _explain(conn: sqlite3.Connection, entry: _QueryStats):
+    """Capture the plan of a fingerprint and the tables it scans."""
+    plan, scans = [], []
+    if entry.example.lstrip().upper().startswith(_EXPLAINABLE):
+        try:
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {entry.example}")]
+        except sqlite3.Error as e:
+            plan = [f"(no plan: {e})"]
+        names = _table_names(entry.example)
+        for detail in plan:
+            match = _SCAN_RE.match(detail)
+            if match and match.group(1) in names:
+                scans.append({"table": names[match.group(1)], "index": match.group(2)})
+    entry.plan, entry.scans = plan, scans
+
+
+def _table_rows(conn: sqlite3.Connection, tables) -> Dict[str, int]:
+    """Row counts of the given tables that exist."""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return {
+        table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        for table in sorted(set(tables) & existing)
+    }
+
+
+def get_query_stats(explain: bool = True) -> List[Dict]:
+    """
+    Statistics of every fingerprint seen, slowest in total first.
+
+    Args:
+        explain: Capture the plans not captured yet and flag the large scans
+
+    Returns:
+        List of dicts: fingerprint, example, statements, the latency
+        histogram summary (see LatencyHistogram.summary), plan (detail lines,
+        None before capture), scans [{table, index, rows}] and flagged
+    """
+    with _collector.lock:
+        entries = list(_collector.queries.values())
+    table_rows = {}
+    if explain:
+        try:
+            # A plain connection: the plans are not statements of the app
+            conn = sqlite3.connect(schema.DB_PATH)
+            try:
+                for entry in entries:
+                    if entry.plan is None and entry.fingerprint != OTHER_QUERIES:
+                        _explain(conn, entry)
+                # Only the scanned tables are counted
+                table_rows = _table_rows(conn, {scan["table"] for entry in entries for scan in entry.scans})
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error capturing query plans: {e}")
+
+    stats = []
+    for entry in entries:
+        with _collector.lock:
+            histogram = entry.histogram.summary()
+        scans = [dict(scan, rows=table_rows.get(scan["table"])) for scan in entry.scans]
+        stats.append(
+            {
+                "fingerprint": entry.fingerprint,
+                "example": entry.example,
+                "statements": entry.statements,
+                **histogram,
+                "plan": entry.plan,
+                "scans": scans,
+                "flagged": any((scan["rows"] or 0) >= LARGE_TABLE_ROWS for scan in scans),
+            }
+        )
+    return sorted(stats, key=lambda query: -(query["total_ms"] or 0))
+
+
+def dump_query_stats(path=None, explain: bool = True) -> Dict:
+    """
+    The statistics as a JSON-serialisable dict, with the recent traced units
+    of work (see tracing.recent_traces); also written to path if given.
+    """
+    dump = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "collecting": _collecting,
+        "collecting_since": _collector.started_at,
+        "database": str(schema.DB_PATH),
+        "large_table_rows": LARGE_TABLE_ROWS,
+        "queries": get_query_stats(explain=explain),
+        "recent_traces": recent_traces(),
+    }
+    if path:
+        os.makedirs(Path(path).parent, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dump, f, indent=2)
+            f.write("\n")
+    return dump
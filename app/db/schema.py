@@ -8,8 +8,14 @@ from pathlib import Path
 import uuid
 from datetime import datetime
 
-# Database path
-DB_PATH = Path(__file__).parent.parent.parent / "data" / "lsb_catalogue.db"
+# Database path (LSB_DB_PATH in .env, e.g. to run against a synthetic catalogue)
+DB_PATH = Path(os.getenv("LSB_DB_PATH") or Path(__file__).parent.parent.parent / "data" / "lsb_catalogue.db")
+
+# Functions called with every new connection (see register_connection_hook)
+_connection_hooks = []
+
+# Class of the connections get_db_connection() opens (see set_connection_factory)
+_connection_factory = sqlite3.Connection
 
 # SQL statements for creating tables
 CREATE_TABLES_SQL = """
@@ -68,7 +74,8 @@ CREATE TABLE IF NOT EXISTS sessions (
     tags TEXT,                           -- Comma-separated tags (#tag format)
     created_at TEXT NOT NULL,            -- Creation timestamp
     updated_at TEXT NOT NULL,            -- Last update timestamp
-    version INTEGER DEFAULT 1            -- Version for conflict detection
+    version INTEGER DEFAULT 1,           -- Version for conflict detection
+    is_template INTEGER DEFAULT 0        -- Whether the session is a reusable template (1) or not (0)
 );
 
 -- Session exercises for storing the exercises in a session with their order
@@ -83,7 +90,148 @@ CREATE TABLE IF NOT EXISTS session_exercises (
     FOREIGN KEY (exercise_id) REFERENCES exercises(id),
     FOREIGN KEY (music_ref) REFERENCES musics(music_ref)
 );
+
+CREATE INDEX IF NOT EXISTS idx_session_exercises_session ON session_exercises(session_id, sequence_number);
+
+-- Session tags, normalised from sessions.tags for indexed tag lookups
+CREATE TABLE IF NOT EXISTS session_tags (
+    session_id TEXT NOT NULL,            -- UUID of the tagged session
+    tag TEXT NOT NULL,                   -- Lower-cased tag without the leading '#'
+    PRIMARY KEY (session_id, tag),
+    FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_session_tags_tag ON session_tags(tag, session_id);
+
+-- Archived sessions: cold storage for old sessions, one compressed JSON blob each
+CREATE TABLE IF NOT EXISTS archived_sessions (
+    id TEXT PRIMARY KEY,                 -- UUID of the archived session
+    name TEXT NOT NULL,                  -- Name of the session
+    date TEXT,                           -- Date of the session (YYYY-MM-DD)
+    tags TEXT,                           -- Comma-separated tags (#tag format)
+    updated_at TEXT NOT NULL,            -- Last update timestamp before archiving
+    archived_at TEXT NOT NULL,           -- Archiving timestamp
+    exercise_count INTEGER DEFAULT 0,    -- Number of exercises in the session
+    payload BLOB NOT NULL                -- zlib-compressed JSON of the session and its exercises
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at);
+CREATE INDEX IF NOT EXISTS idx_archived_sessions_updated_at ON archived_sessions(updated_at);
+
+-- Catalogue generation: bumped by triggers whenever catalogue data changes
+CREATE TABLE IF NOT EXISTS catalogue_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1), -- Single row
+    generation INTEGER NOT NULL DEFAULT 0  -- Incremented on every catalogue change
+);
+
+INSERT OR IGNORE INTO catalogue_state (id, generation) VALUES (1, 0);
+
+-- Background jobs (exports, catalogue reloads, library scans)
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,                 -- UUID of the job
+    kind TEXT NOT NULL,                  -- Handler name, e.g. "export_word"
+    params TEXT,                         -- JSON-encoded handler arguments
+    status TEXT NOT NULL DEFAULT 'queued', -- queued, running, done, failed or cancelled
+    progress REAL DEFAULT 0,             -- Completed fraction (0-1)
+    message TEXT,                        -- Latest progress message
+    result TEXT,                         -- JSON-encoded handler result
+    error TEXT,                          -- Error message of a failed job
+    cancel_requested INTEGER DEFAULT 0,  -- Set to 1 to ask a running job to stop
+    created_at TEXT NOT NULL,            -- Enqueue timestamp
+    started_at TEXT,                     -- Start timestamp
+    finished_at TEXT,                    -- End timestamp (done, failed or cancelled)
+    owner TEXT                           -- Process that runs the job: "host:pid:token"
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+
+-- Music library index: audio files found under MUSIC_LIBRARY_PATH
+CREATE TABLE IF NOT EXISTS library_files (
+    path TEXT PRIMARY KEY,               -- Path relative to the library root
+    directory TEXT NOT NULL,             -- Parent directory relative to the root ('' for the root)
+    name_key TEXT NOT NULL,              -- Normalised file name (lower case, spaces as '_')
+    stem_key TEXT NOT NULL,              -- Normalised file name without extension
+    ext TEXT NOT NULL,                   -- Lower-cased extension, e.g. '.mp3'
+    size INTEGER,                        -- File size in bytes
+    mtime_ns INTEGER                     -- File modification time (ns)
+);
+
+CREATE INDEX IF NOT EXISTS idx_library_files_directory ON library_files(directory);
+
+-- Directories of the music library, with the mtime seen at the last scan
+CREATE TABLE IF NOT EXISTS library_dirs (
+    directory TEXT PRIMARY KEY,          -- Path relative to the library root ('' for the root)
+    parent TEXT,                         -- Parent directory (NULL for the root)
+    mtime_ns INTEGER NOT NULL            -- Directory modification time at the last scan (ns)
+);
+
+-- Music library index state (single row)
+CREATE TABLE IF NOT EXISTS library_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1), -- Single row
+    root TEXT,                           -- Library root the index was built for
+    scanned_at TEXT,                     -- Last scan timestamp
+    generation INTEGER NOT NULL DEFAULT 0 -- Incremented whenever the index changes
+);
+
+INSERT OR IGNORE INTO library_state (id, generation) VALUES (1, 0);
+
+-- Catalogue file check: how each catalogue song resolves in the music library
+CREATE TABLE IF NOT EXISTS song_file_status (
+    music_ref TEXT PRIMARY KEY,          -- Song checked (MusicRef)
+    status TEXT NOT NULL,                -- ok, fallback, wrong_extension, empty or missing
+    path TEXT,                           -- Matched file relative to the library root
+    FOREIGN KEY (music_ref) REFERENCES musics(music_ref)
+);
+
+CREATE INDEX IF NOT EXISTS idx_song_file_status_status ON song_file_status(status);
+
+-- Catalogue file check state (single row): the inputs of the stored results
+CREATE TABLE IF NOT EXISTS song_file_check_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1), -- Single row
+    root TEXT,                           -- Library root checked
+    library_generation INTEGER,          -- library_state.generation checked against
+    catalogue_generation INTEGER,        -- catalogue_state.generation checked
+    checked_at TEXT                      -- Check timestamp
+);
+
+INSERT OR IGNORE INTO song_file_check_state (id) VALUES (1);
+
+-- Audio properties read from the headers of the library files
+CREATE TABLE IF NOT EXISTS audio_metadata (
+    path TEXT PRIMARY KEY,               -- Path relative to the library root (library_files.path)
+    size INTEGER,                        -- File size when read; a different size means stale
+    mtime_ns INTEGER,                    -- File modification time when read (ns)
+    format TEXT,                         -- mp3, mp4, wav or flac
+    duration REAL,                       -- Duration in seconds
+    bitrate INTEGER,                     -- Average bitrate in bit/s
+    sample_rate INTEGER,                 -- Sample rate in Hz
+    channels INTEGER,                    -- Number of channels
+    error TEXT                           -- Why the header could not be read, if it could not
+);
+
+-- Audio metadata state (single row): anything derived from audio_metadata can be keyed by it
+CREATE TABLE IF NOT EXISTS audio_metadata_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1), -- Single row
+    generation INTEGER NOT NULL DEFAULT 0  -- Incremented whenever audio_metadata changes
+);
+
+INSERT OR IGNORE INTO audio_metadata_state (id, generation) VALUES (1, 0);
+"""
+
+# Tables whose changes invalidate anything derived from the catalogue
+CATALOGUE_TABLES = ["exercise_categories", "exercises", "musics", "exercise_music_mapping"]
+
+CATALOGUE_TRIGGERS_SQL = "\n".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_generation
+AFTER {event} ON {table}
+BEGIN
+    UPDATE catalogue_state SET generation = generation + 1 WHERE id = 1;
+END;
 """
+    for table in CATALOGUE_TABLES
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
 
 
 def init_db():
@@ -97,6 +245,7 @@ def init_db():
 
         # Create tables
         cursor.executescript(CREATE_TABLES_SQL)
+        cursor.executescript(CATALOGUE_TRIGGERS_SQL)
 
         conn.commit()
         print(f"Database initialized at {DB_PATH}")
@@ -113,12 +262,38 @@ def init_db():
             conn.close()
 
 
+def register_connection_hook(hook):
+    """
+    Call hook(conn) with every connection get_db_connection() opens, e.g.
+    to count or trace the statements it runs.
+    """
+    if hook not in _connection_hooks:
+        _connection_hooks.append(hook)
+
+
+def unregister_connection_hook(hook):
+    """Stop calling a hook registered with register_connection_hook()."""
+    if hook in _connection_hooks:
+        _connection_hooks.remove(hook)
+
+
+def set_connection_factory(factory=None):
+    """
+    Open the connections of get_db_connection() as instances of factory, a
+    sqlite3.Connection subclass, or as plain connections with None.
+    """
+    global _connection_factory
+    _connection_factory = factory or sqlite3.Connection
+
+
 def get_db_connection():
     """Get a connection to the database."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, factory=_connection_factory)
     conn.row_factory = (
         sqlite3.Row
     )  # This enables column access by name: row['column_name']
+    for hook in list(_connection_hooks):
+        hook(conn)
     return conn
 
 
@@ -0,0 +1,395 @@
+"""
+SQL statement tracing for the LSB Music App.
+
+While a trace is active, every connection opened by get_db_connection()
+reports each statement it runs (through sqlite3's trace callback, so the
+implicit BEGIN/COMMIT and every row of an executemany count) and the time
+spent executing it and fetching its rows (through TracedConnection and
+TracedCursor). Statements are grouped by fingerprint: the SQL with literals
+and parameters replaced by "?", so "WHERE id = 12" and "WHERE id = 13" are
+one query.
+
+A trace covers one unit of work: a Streamlit rerun, a background job or a
+decorated call, in the thread that runs it. A SELECT repeated
+N_PLUS_ONE_THRESHOLD times or more within one unit is flagged as an N+1
+suspect: a query per item that one query for all items could replace.
+
+- trace_queries() traces a block of code and yields the QueryTrace.
+- trace_unit_of_work() and traced() trace reruns and jobs when SQL_TRACE is
+  set, print a summary and keep the last RECENT_TRACES summaries.
+- assert_max_queries() fails a check when a block runs more statements than
+  its budget (see app/scripts/check_query_budgets.py).
+"""
+import contextvars
+import functools
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.db import schema
+
+# Trace every Streamlit rerun and background job (SQL_TRACE in .env)
+SQL_TRACE = os.getenv("SQL_TRACE", "").lower() in ("1", "true", "yes")
+
+# Executions of one SELECT within a unit of work that make it an N+1 suspect
+# (SQL_N_PLUS_ONE_THRESHOLD in .env)
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+# Summaries of traced units of work kept for inspection
+RECENT_TRACES = 50
+
+_STRING_RE = re.compile(r"[xX]?'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w.])")
+_PARAMETER_RE = re.compile(r"(?:[:@$][A-Za-z_]\w*|\?\d*|\bNULL\b)", re.IGNORECASE)
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_SPACE_RE = re.compile(r"\s+")
+
+# Traces receiving the statements of the current thread, innermost last
+_active_traces = contextvars.ContextVar("active_sql_traces", default=())
+# Traces and other sinks receiving the statements of every thread
+_global_sinks = []
+_install_lock = threading.Lock()
+_install_count = 0
+_recent_traces = deque(maxlen=RECENT_TRACES)
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """
+    Normalise a statement: comments dropped, literals, NULLs and parameters
+    replaced by "?", lists of them by "(?, ...)", whitespace collapsed.
+    """
+    sql = _COMMENT_RE.sub(" ", sql)
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _PARAMETER_RE.sub("?", sql)
+    sql = _LIST_RE.sub("(?, ...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip().rstrip(";").strip()
+
+
+class QueryTrace:
+    """Statements run during one unit of work, grouped by fingerprint."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.wall_seconds = None
+        self.connections = 0
+        self.statements = []    # Fingerprints in execution order
+        self._stats = {}        # Fingerprint -> [count, seconds, example SQL]
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        """Number of statements run."""
+        return len(self.statements)
+
+    @property
+    def sql_seconds(self) -> float:
+        """Time spent executing statements and fetching their rows."""
+        return sum(stats[1] for stats in self._stats.values())
+
+    def on_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def on_statement(self, key: str, sql: str):
+        with self._lock:
+            self.statements.append(key)
+            stats = self._stats.setdefault(key, [0, 0.0, sql])
+            stats[0] += 1
+
+    def on_time(self, key: str, seconds: float):
+        with self._lock:
+            self._stats.setdefault(key, [0, 0.0, key])[1] += seconds
+
+    def fingerprints(self) -> List[Dict]:
+        """Per fingerprint: executions, time and one example, most executed first."""
+        with self._lock:
+            items = list(self._stats.items())
+        return sorted(
+            (
+                {"fingerprint": key, "count": count, "total_ms": round(seconds * 1000, 3), "example": example}
+                for key, (count, seconds, example) in items
+                if count
+            ),
+            key=lambda stats: (-stats["count"], -stats["total_ms"]),
+        )
+
+    def n_plus_one_suspects(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Dict]:
+        """SELECT fingerprints executed at least threshold times."""
+        return [
+            stats
+            for stats in self.fingerprints()
+            if stats["count"] >= threshold and stats["fingerprint"].upper().startswith(("SELECT", "WITH"))
+        ]
+
+    def summary(self) -> Dict:
+        """JSON-serialisable summary of the trace."""
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "wall_ms": round(self.wall_seconds * 1000, 3) if self.wall_seconds is not None else None,
+            "statements": self.count,
+            "connections": self.connections,
+            "sql_ms": round(self.sql_seconds * 1000, 3),
+            "fingerprints": self.fingerprints(),
+            "n_plus_one": [stats["fingerprint"] for stats in self.n_plus_one_suspects()],
+        }
+
+    def format(self, limit: int = 10) -> str:
+        """Text report: totals, then the most executed fingerprints."""
+        lines = [
+            f"{self.label}: {self.count} statements on {self.connections} connections, "
+            f"{self.sql_seconds * 1000:.1f} ms in SQL"
+        ]
+        suspects = {stats["fingerprint"] for stats in self.n_plus_one_suspects()}
+        for stats in self.fingerprints()[:limit]:
+            marker = "N+1" if stats["fingerprint"] in suspects else ""
+            lines.append(f"  {marker:<4}{stats['count']:>5} x {stats['total_ms']:>9.1f} ms  {stats['fingerprint'][:100]}")
+        return "\n".join(lines)
+
+
+def _targets():
+    return _active_traces.get() + tuple(_global_sinks)
+
+
+def _on_statement(sql: str):
+    targets = _targets()
+    if targets:
+        key = fingerprint(sql)
+        for trace in targets:
+            trace.on_statement(key, sql)
+
+
+def _record_time(sql: Optional[str], seconds: float):
+    targets = _targets()
+    if targets and sql:
+        key = fingerprint(sql)
+        for trace in targets:
+            trace.on_time(key, seconds)
+
+
+def _on_connection(conn):
+    for trace in _targets():
+        trace.on_connection()
+    conn.set_trace_callback(_on_statement)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """
+    Cursor timing each execution of a statement, including the fetching of
+    its rows: the time is reported once the rows are exhausted, the cursor
+    runs another statement or is closed.
+    """
+
+    _sql = None
+    _seconds = 0.0
+
+    def _flush(self):
+        if self._sql is not None:
+            _record_time(self._sql, self._seconds)
+            self._sql = None
+
+    def _execute(self, sql, method, *args):
+        self._flush()
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._sql = sql
+            self._seconds = time.perf_counter() - start
+
+    def _fetch(self, method, *args, exhausted=lambda rows: True):
+        start = time.perf_counter()
+        done = True
+        try:
+            rows = method(*args)
+            done = exhausted(rows)
+            return rows
+        finally:
+            self._seconds += time.perf_counter() - start
+            if done:
+                self._flush()
+
+    def execute(self, sql, parameters=(), /):
+        return self._execute(sql, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self._execute(sql, super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script, /):
+        return self._execute(sql_script, super().executescript, sql_script)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone, exhausted=lambda row: row is None)
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        return self._fetch(super().fetchmany, size, exhausted=lambda rows: len(rows) < size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __next__(self):
+        # StopIteration leaves _fetch with done still True
+        return self._fetch(super().__next__, exhausted=lambda row: False)
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors (including those of execute()) are TracedCursors."""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script, /):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            _record_time("COMMIT", time.perf_counter() - start)
+
+    def rollback(self):
+        start = time.perf_counter()
+        try:
+            super().rollback()
+        finally:
+            _record_time("ROLLBACK", time.perf_counter() - start)
+
+
+def _install():
+    """Trace new connections while at least one trace is active."""
+    global _install_count
+    with _install_lock:
+        if _install_count == 0:
+            schema.register_connection_hook(_on_connection)
+            schema.set_connection_factory(TracedConnection)
+        _install_count += 1
+
+
+def _uninstall():
+    global _install_count
+    with _install_lock:
+        _install_count -= 1
+        if _install_count == 0:
+            schema.unregister_connection_hook(_on_connection)
+            schema.set_connection_factory(None)
+
+
+def add_statement_sink(sink):
+    """
+    Send the statements of every thread to sink, an object with the
+    on_connection(), on_statement(fingerprint, sql) and on_time(fingerprint,
+    seconds) methods of QueryTrace, until remove_statement_sink().
+    """
+    _install()
+    _global_sinks.append(sink)
+
+
+def remove_statement_sink(sink):
+    """Stop sending statements to a sink added with add_statement_sink()."""
+    _global_sinks.remove(sink)
+    _uninstall()
+
+
+@contextmanager
+def trace_queries(label: str = "trace", all_threads: bool = False):
+    """
+    Trace the statements run in the block and yield the QueryTrace.
+
+    Args:
+        label: Name of the unit of work
+        all_threads: Also trace statements run by other threads (e.g. the
+            script thread of a Streamlit AppTest); by default only those of
+            the current thread
+    """
+    trace = QueryTrace(label)
+    if all_threads:
+        add_statement_sink(trace)
+    else:
+        _install()
+        token = _active_traces.set(_active_traces.get() + (trace,))
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.wall_seconds = time.perf_counter() - start
+        if all_threads:
+            remove_statement_sink(trace)
+        else:
+            _active_traces.reset(token)
+            _uninstall()
+
+
+@contextmanager
+def trace_unit_of_work(label: str):
+    """
+    With SQL_TRACE set, trace the block as one unit of work: print a
+    summary (and any N+1 suspects) and keep it in recent_traces(). Yields
+    the QueryTrace, or None when tracing is off.
+    """
+    if not SQL_TRACE:
+        yield None
+        return
+    try:
+        with trace_queries(label) as trace:
+            yield trace
+    finally:
+        # Also when st.rerun() or st.stop() ends the rerun with an exception
+        summary = trace.summary()
+        _recent_traces.append(summary)
+        print(f"SQL trace {label}: {trace.count} statements, {summary['sql_ms']:.1f} ms in SQL, "
+              f"{summary['wall_ms']:.1f} ms in total")
+        for suspect in trace.n_plus_one_suspects():
+            print(f"  N+1 suspect, {suspect['count']} x: {suspect['fingerprint'][:200]}")
+
+
+def traced(label: Optional[str] = None):
+    """Decorator tracing each call of a function as a unit of work (see trace_unit_of_work)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_unit_of_work(label or func.__qualname__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def recent_traces() -> List[Dict]:
+    """Summaries of the last traced units of work, oldest first."""
+    return list(_recent_traces)
+
+
+@contextmanager
+def assert_max_queries(limit: int, label: str = "block", all_threads: bool = False):
+    """
+    Raise AssertionError if the block runs more than limit statements; the
+    message lists the most executed fingerprints. Yields the QueryTrace.
+    """
+    with trace_queries(label, all_threads=all_threads) as trace:
+        yield trace
+    if trace.count > limit:
+        raise AssertionError(f"Expected at most {limit} SQL statements, got {trace.format()}")
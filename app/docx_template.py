@@ -0,0 +1,218 @@
+"""
+Template-based generation of the session Word document (.docx).
+
+The document layout (landscape page, styled table, headings) lives in a
+prebuilt .docx template containing {{placeholders}}. The template is loaded
+once per process and its document.xml is split around the prototype table
+row and metadata paragraph; an export then only escapes the session values,
+repeats the prototype fragments and streams the XML straight into the output
+zip, instead of building every cell through python-docx.
+"""
+import os
+import re
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+TEMPLATE_DIR = Path(__file__).parent.parent / "data" / "templates"
+DEFAULT_TEMPLATE_PATH = TEMPLATE_DIR / "session_template.docx"
+
+DOCUMENT_PART = "word/document.xml"
+
+# Table columns: (header, width in cm); rows use the {{c0}}..{{c4}} placeholders
+TABLE_COLUMNS = [("#", 0.7), ("Exercise", 6.0), ("Music", 9.0), ("Duration", 2.5), ("Notes", 5.0)]
+
+_PLACEHOLDER_RE = re.compile(r"\{\{(\w+)\}\}")
+# Any <w:t> holding a placeholder must keep leading/trailing spaces of the value
+_PLACEHOLDER_TEXT_RE = re.compile(r"<w:t(?: [^>]*)?>((?:(?!</w:t>).)*?\{\{\w+\}\}(?:(?!</w:t>).)*?)</w:t>")
+# Characters that are not allowed in XML 1.0 documents
+_INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# Loaded templates, keyed by path: (mtime_ns, {"parts": [(ZipInfo, bytes)], "head": ..., ...})
+_templates: Dict[str, Tuple[int, Dict]] = {}
+
+
+def build_session_template(path=DEFAULT_TEMPLATE_PATH) -> str:
+    """
+    Build the default session template with python-docx.
+
+    The result can be restyled in Word as long as the placeholders are kept:
+    {{session_name}}, one table row with {{c0}}..{{c4}}, one paragraph with
+    {{meta}} (repeated per metadata field) and {{exported_on}}.
+
+    Returns:
+        Path of the written template
+    """
+    # Imported here: python-docx is only needed to (re)build the template
+    from docx import Document
+    from docx.enum.section import WD_ORIENT
+    from docx.shared import Cm
+
+    doc = Document()
+    # Set page orientation to landscape
+    section = doc.sections[0]
+    section.orientation = WD_ORIENT.LANDSCAPE
+    section.page_width, section.page_height = section.page_height, section.page_width
+
+    doc.add_heading("Session: {{session_name}}", 0)
+    doc.add_heading("Exercise - Music List", level=1)
+
+    table = doc.add_table(rows=2, cols=len(TABLE_COLUMNS))
+    table.autofit = False  # Disable autofit so manual widths are respected
+    table.style = "Table Grid"
+    for idx, (header, width) in enumerate(TABLE_COLUMNS):
+        table.columns[idx].width = Cm(width)
+        # Word reads the widths from the cells, not only from the grid
+        for row in table.rows:
+            row.cells[idx].width = Cm(width)
+        table.rows[0].cells[idx].text = header
+        table.rows[1].cells[idx].text = f"{{{{c{idx}}}}}"
+
+    doc.add_heading("Session Metadata", level=1)
+    doc.add_paragraph("{{meta}}")
+    doc.add_paragraph("Exported on {{exported_on}}")
+
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    doc.save(str(path))
+    return str(path)
+
+
+def template_version(path=None) -> str:
+    """Identify the template in use (path and modification time), for export cache keys."""
+    path = str(path or os.getenv("DOCX_TEMPLATE_PATH") or DEFAULT_TEMPLATE_PATH)
+    try:
+        return f"{path}:{os.stat(path).st_mtime_ns}"
+    except FileNotFoundError:
+        return path
+
+
+def _compile(fragment: str) -> List[str]:
+    """Split an XML fragment into alternating literal text and placeholder names."""
+    return _PLACEHOLDER_RE.split(fragment)
+
+
+def _render(compiled: List[str], values: Dict[str, str]) -> str:
+    parts = compiled[:]
+    for i in range(1, len(parts), 2):
+        parts[i] = values.get(parts[i], "")
+    return "".join(parts)
+
+
+def _enclosing(xml: str, marker: str, open_re: str, close_tag: str):
+    """Return (start, end) of the innermost element matching open_re around marker."""
+    position = xml.index(marker)
+    starts = [m.start() for m in re.finditer(open_re, xml[:position])]
+    if not starts:
+        raise ValueError(f"Template placeholder {marker} is not inside {close_tag}")
+    end = xml.index(close_tag, position) + len(close_tag)
+    return starts[-1], end
+
+
+def load_template(path=None) -> Dict:
+    """
+    Load (and cache) a session template, building the default one if missing.
+    The cached template is reloaded when the file's modification time changes,
+    as template_version() does for the export cache keys.
+
+    Args:
+        path: Template path; defaults to DOCX_TEMPLATE_PATH from .env, then
+            data/templates/session_template.docx
+
+    Returns:
+        Dict with the zip parts and the compiled document.xml fragments
+    """
+    path = str(path or os.getenv("DOCX_TEMPLATE_PATH") or DEFAULT_TEMPLATE_PATH)
+    if not os.path.exists(path):
+        if path != str(DEFAULT_TEMPLATE_PATH):
+            raise FileNotFoundError(f"Word template not found: {path}")
+        build_session_template(path)
+
+    mtime_ns = os.stat(path).st_mtime_ns
+    cached = _templates.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    with zipfile.ZipFile(path) as source:
+        parts = [(info, source.read(info.filename)) for info in source.infolist()]
+
+    xml = next(data for info, data in parts if info.filename == DOCUMENT_PART).decode("utf-8")
+    xml = _PLACEHOLDER_TEXT_RE.sub(lambda m: f'<w:t xml:space="preserve">{m.group(1)}</w:t>', xml)
+
+    row_start, row_end = _enclosing(xml, "{{c0}}", r"<w:tr[ >]", "</w:tr>")
+    meta_start, meta_end = _enclosing(xml, "{{meta}}", r"<w:p[ >]", "</w:p>")
+    if meta_start < row_end:
+        raise ValueError("Template {{meta}} paragraph must follow the exercise table")
+
+    template = {
+        "parts": parts,
+        "head": _compile(xml[:row_start]),
+        "row": _compile(xml[row_start:row_end]),
+        "middle": _compile(xml[row_end:meta_start]),
+        "meta": _compile(xml[meta_start:meta_end]),
+        "tail": _compile(xml[meta_end:]),
+    }
+    _templates[path] = (mtime_ns, template)
+    return template
+
+
+def xml_text(value) -> str:
+    """Escape a value for a <w:t> element; newlines become line breaks."""
+    if value is None:
+        return ""
+    text = escape(_INVALID_XML_RE.sub("", str(value)))
+    if "\n" in text:
+        text = text.replace("\r\n", "\n").replace(
+            "\n", '</w:t><w:br/><w:t xml:space="preserve">'
+        )
+    return text
+
+
+def render_session_docx(
+    filepath: str,
+    session_name: str,
+    rows: Iterable[Iterable],
+    metadata: Dict,
+    template_path=None,
+    exported_on: Optional[str] = None,
+) -> str:
+    """
+    Write a session document from the template.
+
+    Args:
+        filepath: Output .docx path
+        session_name: Title of the document
+        rows: Table rows, each with one value per column
+        metadata: Metadata fields, listed as "key: value" paragraphs
+        template_path: Optional template override (see load_template)
+        exported_on: Export timestamp text (defaults to now)
+
+    Returns:
+        Path of the written document
+    """
+    template = load_template(template_path)
+    if exported_on is None:
+        exported_on = datetime.now().strftime("%Y-%m-%d %H:%M")
+
+    row_template = template["row"]
+    meta_template = template["meta"]
+    values = {"session_name": xml_text(session_name), "exported_on": xml_text(exported_on)}
+
+    with zipfile.ZipFile(filepath, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for info, data in template["parts"]:
+            if info.filename != DOCUMENT_PART:
+                archive.writestr(info, data)
+                continue
+            # Stream document.xml into the zip instead of building it in memory
+            with archive.open(DOCUMENT_PART, "w") as document:
+                document.write(_render(template["head"], values).encode("utf-8"))
+                for row in rows:
+                    cells = {f"c{idx}": xml_text(value) for idx, value in enumerate(row)}
+                    document.write(_render(row_template, cells).encode("utf-8"))
+                document.write(_render(template["middle"], values).encode("utf-8"))
+                for key, value in metadata.items():
+                    meta = {"meta": xml_text(f"{key}: {value}")}
+                    document.write(_render(meta_template, meta).encode("utf-8"))
+                document.write(_render(template["tail"], values).encode("utf-8"))
+    return filepath
@@ -0,0 +1,152 @@
+"""
+Content-addressed cache for session exports (M3U playlists and Word documents).
+
+Artifacts are stored under a key derived from the session (metadata and
+content), the catalogue generation and the export format/options, so an
+export is only rebuilt when something that affects it has changed. The cache
+is bounded in size and evicts the least recently used artifacts first.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from app.db.queries import get_catalogue_generation
+
+CACHE_DIR = Path(__file__).parent.parent / "data" / "export_cache"
+
+# Size bound of the cache, in bytes (EXPORT_CACHE_MAX_MB in .env)
+DEFAULT_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+def export_cache_key(session_metadata, session_exercises, fmt: str, options: Optional[Dict] = None) -> str:
+    """
+    Derive the cache key of an export.
+
+    Args:
+        session_metadata: Session metadata dict (or sqlite3.Row); every field
+            is part of the key, as the Word export lists them all
+        session_exercises: Session exercise tuples
+        fmt: Export format, e.g. "m3u" or "docx"
+        options: Any other input that changes the output (paths, flags)
+
+    Returns:
+        Hex digest identifying the export
+    """
+    metadata = {field: session_metadata[field] for field in session_metadata.keys()}
+    payload = {
+        "session": metadata,
+        # The exercises are part of the key so unsaved edits never hit a stale artifact
+        "exercises": [list(exercise_tuple) for exercise_tuple in session_exercises],
+        "catalogue_generation": get_catalogue_generation(),
+        "format": fmt,
+        "options": options or {},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _cache_path(key: str, suffix: str, cache_dir: Path) -> Path:
+    return cache_dir / f"{key}{suffix}"
+
+
+def get_cached_export(key: str, suffix: str, cache_dir: Path = CACHE_DIR) -> Optional[str]:
+    """Return the cached artifact for a key, marking it as recently used, or None."""
+    path = _cache_path(key, suffix, cache_dir)
+    try:
+        # The modification time doubles as the LRU timestamp
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return str(path)
+
+
+def store_export(key: str, suffix: str, source_path: str, cache_dir: Path = CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+    """Copy a freshly built artifact into the cache and enforce the size bound."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(key, suffix, cache_dir)
+    # Copy to a temporary name first so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".part")
+    os.close(fd)
+    shutil.copyfile(source_path, tmp_path)
+    os.replace(tmp_path, path)
+    evict_exports(max_bytes, cache_dir=cache_dir, keep=path)
+    return str(path)
+
+
+def evict_exports(max_bytes: int = DEFAULT_MAX_BYTES, cache_dir: Path = CACHE_DIR,
+                  keep: Optional[Path] = None) -> int:
+    """
+    Delete least recently used artifacts until the cache fits in max_bytes.
+
+    Returns:
+        Number of bytes freed
+    """
+    try:
+        entries = [
+            (entry.stat().st_mtime, entry.stat().st_size, Path(entry.path))
+            for entry in os.scandir(cache_dir)
+            if entry.is_file() and not entry.name.endswith(".part")
+        ]
+    except FileNotFoundError:
+        return 0
+
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        if keep is not None and path == keep:
+            continue
+        try:
+            path.unlink()
+            freed += size
+        except FileNotFoundError:
+            pass
+    return freed
+
+
+def cached_export(
+    session_metadata,
+    session_exercises,
+    fmt: str,
+    build: Callable[[str], Optional[str]],
+    options: Optional[Dict] = None,
+    cache_dir: Path = CACHE_DIR,
+) -> Tuple[Optional[str], bool]:
+    """
+    Return the cached artifact for an export, building it on a miss.
+
+    Args:
+        session_metadata: Session metadata dict
+        session_exercises: Session exercise tuples
+        fmt: Export format; also used as the file suffix
+        build: Called with a temporary directory; writes the artifact there
+            and returns its path (or None when there is nothing to export)
+        options: Extra inputs that change the output
+
+    Returns:
+        Tuple of (artifact path or None, whether it came from the cache)
+    """
+    key = export_cache_key(session_metadata, session_exercises, fmt, options)
+    suffix = f".{fmt}"
+    cached = get_cached_export(key, suffix, cache_dir)
+    if cached:
+        return cached, True
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        built = build(tmp_dir)
+        if not built:
+            return None, False
+        return store_export(key, suffix, built, cache_dir), False
+
+
+def deliver_export(artifact_path: str, export_dir: str, filename: str) -> str:
+    """Copy a cached artifact to the export folder under its user-facing name."""
+    os.makedirs(export_dir, exist_ok=True)
+    destination = os.path.join(export_dir, filename)
+    shutil.copyfile(artifact_path, destination)
+    return destination
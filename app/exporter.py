@@ -1,34 +1,106 @@
 import os
 from dotenv import load_dotenv
 from app.ui.components import get_song_file_path
-from app.db.queries import get_all_songs
+from app.music_resolver import resolve_session_songs
+from app.db.queries import get_library_state
+from app.export_cache import cached_export, deliver_export
+from app.playlists import (
+    PLAYLIST_WRITER_VERSION,
+    count_playlist_entries,
+    duration_to_seconds,
+    playlist_extension,
+    write_playlist,
+)
 
-def export_playlist(session_name, session_exercises, export_path=None):
+def session_playlist_entries(session_exercises):
     """
-    Generate an M3U playlist for the given session and save it to export_path.
+    Get the playlist entries of a session's songs, in session order.
+
+    Each entry is a dict with the audio file path and the catalogue title,
+    artist and duration in seconds. Only .mp3 and .m4a files are included;
+    a song used twice appears twice.
     """
-    load_dotenv()
-    if export_path is None:
-        export_path = os.getenv("EXPORT_PATH", os.getcwd())
-    if not os.path.exists(export_path):
-        os.makedirs(export_path)
-    all_songs = get_all_songs()
-    song_paths = []
+    songs_by_ref = resolve_session_songs(session_exercises)
+    entries = []
     for exercise_tuple in session_exercises:
         if len(exercise_tuple) >= 2:
             music_ref = exercise_tuple[1]
             if music_ref:
-                song_details = next((s for s in all_songs if s["music_ref"] == music_ref), None)
+                song_details = songs_by_ref.get(music_ref)
                 if song_details:
                     file_path = get_song_file_path(song_details)
                     if file_path and os.path.splitext(file_path)[1].lower() in [".mp3", ".m4a"]:
-                        song_paths.append(file_path)
-    if not song_paths:
+                        entries.append(
+                            {
+                                "path": file_path,
+                                "title": song_details["title"],
+                                "artist": song_details["artist"],
+                                "seconds": duration_to_seconds(song_details["duration"]),
+                            }
+                        )
+    return entries
+
+
+def session_song_paths(session_exercises):
+    """Get the audio file paths of a session's songs, in session order."""
+    return [entry["path"] for entry in session_playlist_entries(session_exercises)]
+
+
+def export_playlist(session_name, session_exercises, export_path=None, fmt="m3u"):
+    """
+    Generate a playlist for the given session and save it to export_path.
+
+    Args:
+        fmt: Playlist format: "m3u" (extended M3U), "xspf" or "pls"
+    """
+    load_dotenv()
+    if export_path is None:
+        export_path = os.getenv("EXPORT_PATH", os.getcwd())
+    if not os.path.exists(export_path):
+        os.makedirs(export_path)
+    entries = session_playlist_entries(session_exercises)
+    if not entries:
         return None, 0
-    playlist_filename = f"{session_name}.m3u"
+    playlist_filename = f"{session_name}{playlist_extension(fmt)}"
     playlist_path = os.path.join(export_path, playlist_filename)
-    with open(playlist_path, "w", encoding="utf-8") as f:
-        f.write("#EXTM3U\n")
-        for path in song_paths:
-            f.write(f"{path}\n")
-    return playlist_path, len(song_paths)
+    write_playlist(entries, playlist_path, fmt, title=session_name)
+    return playlist_path, len(entries)
+
+
+def playlist_artifact(session_metadata, session_exercises, fmt="m3u"):
+    """
+    Return the cached playlist for a session, building it on a cache miss.
+
+    Returns:
+        Tuple of (artifact path or None, whether it came from the cache)
+    """
+    load_dotenv()
+    session_name = session_metadata.get("name") or "Session"
+    return cached_export(
+        session_metadata,
+        session_exercises,
+        fmt,
+        lambda tmp_dir: export_playlist(session_name, session_exercises, export_path=tmp_dir, fmt=fmt)[0],
+        # Playlist entries are absolute paths under the music library
+        options={
+            "music_library_path": os.getenv("MUSIC_LIBRARY_PATH"),
+            "writer_version": PLAYLIST_WRITER_VERSION,
+            # Resolved paths change when files are added to or removed from the library
+            "library_generation": get_library_state()["generation"],
+        },
+    )
+
+
+def export_playlist_cached(session_metadata, session_exercises, export_path=None, fmt="m3u"):
+    """
+    Like export_playlist, but reuses the cached playlist when nothing changed.
+    """
+    load_dotenv()
+    if export_path is None:
+        export_path = os.getenv("EXPORT_PATH", os.getcwd())
+    artifact, _ = playlist_artifact(session_metadata, session_exercises, fmt)
+    if not artifact:
+        return None, 0
+    session_name = session_metadata.get("name") or "Session"
+    playlist_path = deliver_export(artifact, export_path, f"{session_name}{playlist_extension(fmt)}")
+    return playlist_path, count_playlist_entries(playlist_path)
@@ -0,0 +1,268 @@
+"""
+Background jobs for the LSB Music App.
+
+Slow work (exports, catalogue reloads, library scans) runs in a thread pool
+owned by the app process instead of the Streamlit script thread. Jobs are
+recorded in the jobs table, so the UI only enqueues a job and then polls its
+status and progress; a job can be cancelled while queued or at its next
+progress update while running.
+
+Each job records the process that runs it. Several processes can share the
+database (Streamlit servers, CLI scripts, load test workers), so a process
+starting its pool only fails the unfinished jobs of processes that are gone.
+"""
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from app.db.schema import init_db
+from app.db.tracing import trace_unit_of_work
+from app.db.queries import (
+    create_job,
+    get_job,
+    update_job,
+    request_job_cancel,
+    fail_interrupted_jobs,
+)
+
+# Number of jobs running at the same time (JOB_WORKERS in .env)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+_handlers: Dict[str, Callable] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Tells this process from an earlier one that had the same pid
+_owner_token = uuid.uuid4().hex[:8]
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled."""
+
+
+class JobContext:
+    """Passed to handlers to report progress and notice cancellation."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+
+    def progress(self, fraction: float, message: Optional[str] = None):
+        """Record progress (0-1); raises JobCancelled if the job was cancelled."""
+        fields = {"progress": max(0.0, min(1.0, fraction))}
+        if message is not None:
+            fields["message"] = message
+        if update_job(self.job_id, **fields):
+            raise JobCancelled()
+
+
+def register_job_handler(kind: str):
+    """
+    Register a handler for a job kind.
+
+    The handler is called as handler(context, **params) and returns a
+    JSON-serialisable result.
+    """
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def job_owner() -> str:
+    """Owner recorded on the jobs of this process: "host:pid:token"."""
+    return f"{socket.gethostname()}:{os.getpid()}:{_owner_token}"
+
+
+def _owner_alive(owner: str) -> bool:
+    """Whether the process that owns a job may still be running it."""
+    try:
+        host, pid, _ = owner.rsplit(":", 2)
+        pid = int(pid)
+    except ValueError:
+        return False
+    if host != socket.gethostname() or os.name == "nt":
+        # No way to tell from here (os.kill would terminate on Windows)
+        return True
+    if pid == os.getpid():
+        return owner == job_owner()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Make sure the jobs table exists, and fail jobs whose process
+            # stopped before finishing them: nothing will pick them up again
+            init_db()
+            fail_interrupted_jobs(_owner_alive)
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="lsb-job")
+        return _executor
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _run_job(job_id: str):
+    job = get_job(job_id)
+    if not job or job["status"] != "queued":
+        # Cancelled before a worker picked it up
+        return
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+        update_job(job_id, status="failed", error=f"Unknown job kind: {job['kind']}", finished_at=_now())
+        return
+
+    update_job(job_id, status="running", started_at=_now())
+    try:
+        with trace_unit_of_work(f"job {job['kind']}"):
+            result = handler(JobContext(job_id), **job["params"])
+    except JobCancelled:
+        update_job(job_id, status="cancelled", message="Cancelled", finished_at=_now())
+    except Exception as e:
+        job = get_job(job_id)
+        if job and job["cancel_requested"]:
+            # The handler swallowed JobCancelled and failed as a consequence
+            update_job(job_id, status="cancelled", message="Cancelled", finished_at=_now())
+        else:
+            update_job(job_id, status="failed", error=str(e), finished_at=_now())
+    else:
+        update_job(job_id, status="done", progress=1.0, result=result, finished_at=_now())
+
+
+def enqueue_job(kind: str, **params) -> Optional[str]:
+    """
+    Queue a job for a registered handler.
+
+    Args:
+        kind: Handler name
+        **params: JSON-serialisable handler arguments
+
+    Returns:
+        The job ID, or None if the job could not be recorded
+    """
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    executor = _get_executor()
+    job_id = create_job(kind, params, owner=job_owner())
+    if job_id:
+        executor.submit(_run_job, job_id)
+    return job_id
+
+
+def poll_job(job_id: str) -> Optional[Dict]:
+    """Get the current state of a job (see queries.get_job)."""
+    return get_job(job_id)
+
+
+def cancel_job(job_id: str) -> Optional[str]:
+    """Cancel a job; returns "cancelled", "running" (stopping) or None."""
+    return request_job_cancel(job_id)
+
+
+# Job handlers
+
+
+@register_job_handler("export_playlist")
+def _export_playlist_job(context, session_metadata, session_exercises, export_path=None, fmt="m3u"):
+    from app.exporter import export_playlist_cached
+
+    context.progress(0.1, "Exporting playlist")
+    path, song_count = export_playlist_cached(session_metadata, session_exercises, export_path, fmt)
+    return {"path": path, "song_count": song_count}
+
+
+@register_job_handler("export_word")
+def _export_word_job(context, session_metadata, session_exercises, export_path=None):
+    from app.scripts.export_session_to_word import export_session_to_word_cached
+
+    context.progress(0.1, "Exporting Word document")
+    return {"path": export_session_to_word_cached(session_metadata, session_exercises, export_path)}
+
+
+@register_job_handler("export_bundle")
+def _export_bundle_job(context, session_name, session_exercises, export_path=None):
+    from app.media_bundle import export_bundle
+
+    def on_file_done(done, total):
+        context.progress(done / total, f"Synced {done}/{total} audio files")
+
+    report = export_bundle(session_name, session_exercises, export_path, progress=on_file_done)
+    return {
+        "path": report["bundle_dir"],
+        "playlist_path": report["playlist_path"],
+        "files": len(report["files"]),
+        "missing": report["missing"],
+        "bytes_copied": report["bytes_copied"],
+        "bytes_linked": report["bytes_linked"],
+        "bytes_skipped": report["bytes_skipped"],
+        "throughput": report["throughput"],
+    }
+
+
+@register_job_handler("bulk_export")
+def _bulk_export_job(context, session_ids, zip_path, formats=None):
+    from app.bulk_export import EXPORT_FORMATS, export_sessions
+
+    total = len(session_ids)
+
+    def on_session_done(done):
+        context.progress(done / total if total else 1.0, f"Exported {done}/{total} sessions")
+
+    report = export_sessions(
+        session_ids, zip_path, formats=formats or EXPORT_FORMATS, progress=on_session_done
+    )
+    return {
+        "path": zip_path,
+        "files": len(report["files"]),
+        "errors": report["errors"],
+        "seconds": report["seconds"],
+    }
+
+
+@register_job_handler("reload_catalogue")
+def _reload_catalogue_job(context, excel_path):
+    from app.data_loader import load_lsb_catalogue
+
+    if not load_lsb_catalogue(excel_path, progress=context.progress):
+        raise RuntimeError(f"Failed to load the catalogue from {excel_path}")
+    return {"path": excel_path}
+
+
+@register_job_handler("library_scan")
+def _library_scan_job(context, full=False):
+    from app.library_integrity import check_catalogue_files
+
+    report = check_catalogue_files(full=full, progress=context.progress)
+    if report is None:
+        raise RuntimeError("MUSIC_LIBRARY_PATH is not set or does not exist")
+    return {
+        "songs": report["songs"],
+        "found": report["playable"],
+        "counts": report["counts"],
+        "directories_listed": report["scan"]["listed"],
+        "seconds": report["seconds"],
+    }
+
+
+@register_job_handler("audio_metadata_scan")
+def _audio_metadata_scan_job(context, full=False, force=False):
+    from app.audio_metadata import get_duration_discrepancies, scan_audio_metadata
+
+    report = scan_audio_metadata(full=full, force=force, progress=context.progress)
+    if report is None:
+        raise RuntimeError("MUSIC_LIBRARY_PATH is not set or does not exist")
+    report["discrepancies"] = len(get_duration_discrepancies())
+    return report
@@ -0,0 +1,367 @@
+"""
+Index of the audio files under MUSIC_LIBRARY_PATH.
+
+The library is walked once with os.scandir in a thread pool and every audio
+file is recorded in the library_files table under a normalised name. Later
+refreshes only stat each known directory and list again the ones whose
+modification time changed, so files added, removed or renamed are picked up
+without walking the whole library. Song files are then resolved with
+in-memory lookups (the catalogue filename, then the fallback patterns of
+music_files/README.md), without touching the filesystem.
+
+Lookups never scan: they answer from the index as it is, or from the
+filesystem before the first scan. In the Streamlit app, which calls
+enable_background_refresh(), a missing index or one older than
+REFRESH_SECONDS also queues a "library_scan" background job (see jobs.py);
+scripts and worker processes only read the stored index.
+
+Changing the contents of an existing file does not change its directory's
+modification time; run a full scan to pick up such changes.
+"""
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.db.schema import init_db
+from app.db.queries import (
+    apply_library_scan,
+    get_library_dirs,
+    get_library_files,
+    get_library_state,
+)
+
+# Audio formats, in order of preference when a song exists in several
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".wav", ".flac", ".ogg")
+
+# Parallel directory listings during a scan (LIBRARY_SCAN_WORKERS in .env)
+SCAN_WORKERS = int(os.getenv("LIBRARY_SCAN_WORKERS", "8"))
+
+# Seconds between incremental refreshes triggered by lookups (LIBRARY_REFRESH_SECONDS in .env)
+REFRESH_SECONDS = int(os.getenv("LIBRARY_REFRESH_SECONDS", "300"))
+
+# Seconds between checks for an index rebuilt by another process
+_GENERATION_CHECK_SECONDS = 5
+
+_lock = threading.RLock()
+_cached_index = None
+_last_generation_check = 0.0
+# Whether lookups queue refreshes (only the app turns this on)
+_background_refresh = False
+# Job ID and monotonic start time of the last refresh queued by a lookup
+_refresh_job_id = None
+_refresh_queued_at = None
+
+
+def normalise_name(name: str) -> str:
+    """Normalise a file or song name for matching: case-folded, spaces and underscores as '_'."""
+    name = unicodedata.normalize("NFKC", name or "").casefold()
+    return re.sub(r"[\s_]+", "_", name).strip("_")
+
+
+def _split_name(file_name: str) -> Tuple[str, str]:
+    stem, ext = os.path.splitext(file_name)
+    return normalise_name(stem), ext.lower()
+
+
+def _list_directory(root: str, directory: str, known: Optional[Tuple], known_children: List[str]):
+    """
+    Visit one library directory.
+
+    Returns:
+        None if the directory is gone, else (mtime_ns, files or None when
+        unchanged since the last scan, subdirectory names)
+    """
+    path = os.path.join(root, directory)
+    try:
+        # Stat before listing: a change during the listing shows up next time
+        mtime_ns = os.stat(path).st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if known is not None and known[1] == mtime_ns:
+        return mtime_ns, None, known_children
+
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                        continue
+                    stem_key, ext = _split_name(entry.name)
+                    if ext not in AUDIO_EXTENSIONS or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append(
+                    {
+                        "path": os.path.join(directory, entry.name) if directory else entry.name,
+                        "directory": directory,
+                        "name_key": f"{stem_key}{ext}",
+                        "stem_key": stem_key,
+                        "ext": ext,
+                        "size": stat.st_size,
+                        "mtime_ns": stat.st_mtime_ns,
+                    }
+                )
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return None
+    return mtime_ns, files, subdirs
+
+
+def refresh_library_index(
+    root: Optional[str] = None,
+    full: bool = False,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, str], None]] = None,
+) -> Optional[Dict]:
+    """
+    Bring the library index up to date with the filesystem.
+
+    Args:
+        root: Library root (defaults to MUSIC_LIBRARY_PATH)
+        full: List every directory again instead of only the changed ones
+        workers: Number of parallel directory listings
+        progress: Called as progress(directories_visited, directory) while walking
+
+    Returns:
+        Dict with the directories visited and listed, the files found in the
+        listed directories, the index generation and the elapsed seconds;
+        None when there is no library to index
+    """
+    root = root or os.getenv("MUSIC_LIBRARY_PATH")
+    if not root or not os.path.isdir(root):
+        return None
+    root = os.path.abspath(root)
+    started = time.perf_counter()
+
+    state = get_library_state()
+    if state["root"] is None:
+        # First scan: make sure the index tables exist
+        init_db()
+    full = full or state["root"] != root
+    known_dirs = {} if full else get_library_dirs()
+    children: Dict[str, List[str]] = {}
+    for directory, (parent, _) in known_dirs.items():
+        if parent is not None:
+            children.setdefault(parent, []).append(os.path.basename(directory))
+
+    seen_dirs: Dict[str, Tuple[Optional[str], int]] = {}
+    rescanned: Dict[str, List[Dict]] = {}
+    with ThreadPoolExecutor(max_workers=workers or SCAN_WORKERS) as pool:
+        def visit(directory, parent):
+            future = pool.submit(
+                _list_directory, root, directory, known_dirs.get(directory), children.get(directory, [])
+            )
+            pending[future] = (directory, parent)
+
+        pending = {}
+        visit("", None)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                directory, parent = pending.pop(future)
+                result = future.result()
+                if result is None:
+                    continue
+                mtime_ns, files, subdirs = result
+                seen_dirs[directory] = (parent, mtime_ns)
+                if files is not None:
+                    rescanned[directory] = files
+                for name in subdirs:
+                    visit(os.path.join(directory, name) if directory else name, directory)
+                if progress:
+                    progress(len(seen_dirs), directory)
+
+    generation = apply_library_scan(root, seen_dirs, rescanned, full=full)
+    _forget_cached_index()
+    return {
+        "root": root,
+        "full": full,
+        "directories": len(seen_dirs),
+        "listed": len(rescanned),
+        "files_listed": sum(len(files) for files in rescanned.values()),
+        "generation": generation,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+class LibraryIndex:
+    """In-memory lookup tables over the indexed library files."""
+
+    def __init__(self, root: str, generation: int, scanned_at: Optional[str], rows):
+        self.root = root
+        self.generation = generation
+        self.scanned_at = scanned_at
+        # Absolute path -> size in bytes
+        self.paths: Dict[str, int] = {}
+        self.by_name: Dict[str, str] = {}
+        # stem key -> {ext: path}; "dir key/stem key" -> {ext: path}
+        self.by_stem: Dict[str, Dict[str, str]] = {}
+        self.by_dir_stem: Dict[str, Dict[str, str]] = {}
+        # Rows come root-level first, so those win on duplicate names
+        for row in rows:
+            path = os.path.join(root, row["path"])
+            self.paths[path] = row["size"]
+            self.by_name.setdefault(row["name_key"], path)
+            self.by_stem.setdefault(row["stem_key"], {}).setdefault(row["ext"], path)
+            if row["directory"]:
+                dir_key = normalise_name(os.path.basename(row["directory"]))
+                self.by_dir_stem.setdefault(f"{dir_key}/{row['stem_key']}", {}).setdefault(row["ext"], path)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @staticmethod
+    def _pick(by_ext: Optional[Dict[str, str]], preferred_ext: str = "") -> Optional[str]:
+        if not by_ext:
+            return None
+        if preferred_ext in by_ext:
+            return by_ext[preferred_ext]
+        for ext in AUDIO_EXTENSIONS:
+            if ext in by_ext:
+                return by_ext[ext]
+        return None
+
+    def resolve_match(
+        self, filename: Optional[str], artist: Optional[str], title: Optional[str]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Find a song's file and say how it was matched.
+
+        Returns:
+            (path, match) where match is "exact" for the catalogue filename,
+            "fallback" for another extension or an Artist/Title pattern, and
+            (None, None) when nothing matches
+        """
+        preferred_ext = ""
+        if filename:
+            path = self.by_name.get(normalise_name(filename))
+            if path:
+                return path, "exact"
+            stem_key, preferred_ext = _split_name(filename)
+            path = self._pick(self.by_stem.get(stem_key), preferred_ext)
+            if path:
+                return path, "fallback"
+        if artist and title:
+            artist_key, title_key = normalise_name(artist), normalise_name(title)
+            path = (
+                self._pick(self.by_stem.get(f"{artist_key}_{title_key}"), preferred_ext)
+                or self._pick(self.by_dir_stem.get(f"{artist_key}/{title_key}"), preferred_ext)
+                or self._pick(self.by_stem.get(f"{title_key}_{artist_key}"), preferred_ext)
+            )
+            if path:
+                return path, "fallback"
+        return None, None
+
+    def resolve(self, filename: Optional[str], artist: Optional[str], title: Optional[str]) -> Optional[str]:
+        """
+        Find a song's file: the catalogue filename (any audio extension),
+        then Artist_Title.ext, Artist/Title.ext and Title_Artist.ext.
+        """
+        return self.resolve_match(filename, artist, title)[0]
+
+    def file_size(self, path: str) -> Optional[int]:
+        """Size of an indexed file as seen at the last scan, or None."""
+        return self.paths.get(path)
+
+    def contains(self, path: str) -> bool:
+        return path in self.paths
+
+
+def _forget_cached_index():
+    global _cached_index
+    with _lock:
+        _cached_index = None
+
+
+def _is_stale(scanned_at: Optional[str]) -> bool:
+    if not scanned_at:
+        return True
+    return (datetime.now() - datetime.fromisoformat(scanned_at)).total_seconds() > REFRESH_SECONDS
+
+
+def enable_background_refresh():
+    """Let lookups in this process queue library_scan jobs for a missing or stale index."""
+    global _background_refresh
+    _background_refresh = True
+
+
+def _queue_refresh():
+    """
+    Queue a library_scan job, unless one queued by this process is still
+    active or was queued less than REFRESH_SECONDS ago (so a failing scan
+    is not retried on every lookup). Called with _lock held.
+    """
+    global _refresh_job_id, _refresh_queued_at
+    # Imported here: the job handlers import this module
+    from app.jobs import FINISHED_STATUSES, enqueue_job, poll_job
+
+    if _refresh_job_id is not None:
+        job = poll_job(_refresh_job_id)
+        if job and job["status"] not in FINISHED_STATUSES:
+            return
+    if _refresh_queued_at is not None and time.monotonic() - _refresh_queued_at < REFRESH_SECONDS:
+        return
+    _refresh_queued_at = time.monotonic()
+    _refresh_job_id = enqueue_job("library_scan")
+
+
+def get_library_index(root: Optional[str] = None) -> Optional[LibraryIndex]:
+    """
+    Get the in-memory library index. With enable_background_refresh(), a
+    missing index, or one older than REFRESH_SECONDS, is refreshed by a
+    background library_scan job while the index as it is keeps being served.
+
+    Returns:
+        The index, or None when MUSIC_LIBRARY_PATH is not set or missing or
+        the library has not been indexed yet (the first scan is running)
+    """
+    global _cached_index, _last_generation_check
+    root = root or os.getenv("MUSIC_LIBRARY_PATH")
+    if not root or not os.path.isdir(root):
+        return None
+    root = os.path.abspath(root)
+
+    with _lock:
+        index = _cached_index
+        now = time.monotonic()
+        if index is not None and index.root == root and now - _last_generation_check < _GENERATION_CHECK_SECONDS:
+            return index
+
+        _last_generation_check = now
+        state = get_library_state()
+        if _background_refresh and (state["root"] != root or _is_stale(state["scanned_at"])):
+            # First use, or an index older than REFRESH_SECONDS
+            _queue_refresh()
+        if state["root"] != root:
+            return None
+        if index is not None and index.root == root and index.generation == state["generation"]:
+            return index
+
+        _cached_index = LibraryIndex(root, state["generation"], state["scanned_at"], get_library_files())
+        return _cached_index
+
+
+def resolve_song_file(song_details) -> Optional[str]:
+    """Find the audio file of a catalogue song through the library index, or None."""
+    index = get_library_index()
+    if index is None or not song_details:
+        return None
+    return index.resolve(song_details["filename"], song_details["artist"], song_details["title"])
+
+
+def library_file_exists(path: Optional[str]) -> bool:
+    """Whether a file exists, answered from the index for paths inside the library."""
+    if not path:
+        return False
+    index = get_library_index()
+    if index is not None and os.path.abspath(path).startswith(index.root + os.sep):
+        return index.contains(os.path.abspath(path))
+    return os.path.exists(path)
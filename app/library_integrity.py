@@ -0,0 +1,143 @@
+"""
+Catalogue-to-library integrity check: which catalogue songs have a usable
+audio file under MUSIC_LIBRARY_PATH.
+
+The check first refreshes the library index (directories are stat'ed in a
+thread pool and only the ones whose modification time changed are listed
+again), then matches every musics row against the in-memory index. Results
+are stored in the song_file_status table together with the library and
+catalogue generations they were computed for, so a check with nothing
+changed is answered from the table, and the exercise selector can show
+playable song counts without any filesystem access.
+"""
+import os
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from app.db.queries import (
+    get_all_songs,
+    get_catalogue_generation,
+    get_playable_song_counts,
+    get_song_file_check_state,
+    get_song_file_problems,
+    get_song_file_status_counts,
+    store_song_file_statuses,
+)
+from app.library_index import get_library_index, refresh_library_index
+
+# Extensions the playlist export accepts
+PLAYABLE_EXTENSIONS = (".mp3", ".m4a")
+
+# Song file statuses, from best to worst
+STATUS_OK = "ok"                            # Catalogue filename found as-is
+STATUS_FALLBACK = "fallback"                # Found under another name or extension
+STATUS_WRONG_EXTENSION = "wrong_extension"  # Found, but not .mp3/.m4a: left out of playlists
+STATUS_EMPTY = "empty"                      # Found, but the file is empty
+STATUS_MISSING = "missing"                  # No file found
+
+PLAYABLE_STATUSES = (STATUS_OK, STATUS_FALLBACK)
+PROBLEM_STATUSES = (STATUS_FALLBACK, STATUS_WRONG_EXTENSION, STATUS_EMPTY, STATUS_MISSING)
+
+STATUS_LABELS = {
+    STATUS_OK: "OK",
+    STATUS_FALLBACK: "Found under another name",
+    STATUS_WRONG_EXTENSION: "Not .mp3/.m4a",
+    STATUS_EMPTY: "Empty file",
+    STATUS_MISSING: "Missing",
+}
+
+
+def classify_song(index, song) -> tuple:
+    """
+    Check one catalogue song against the library index.
+
+    Returns:
+        (status, path relative to the library root or None)
+    """
+    path, match = index.resolve_match(song["filename"], song["artist"], song["title"])
+    if path is None:
+        return STATUS_MISSING, None
+    relative = os.path.relpath(path, index.root)
+    if os.path.splitext(path)[1].lower() not in PLAYABLE_EXTENSIONS:
+        return STATUS_WRONG_EXTENSION, relative
+    if not index.file_size(path):
+        return STATUS_EMPTY, relative
+    return (STATUS_OK if match == "exact" else STATUS_FALLBACK), relative
+
+
+def check_catalogue_files(
+    root: Optional[str] = None,
+    full: bool = False,
+    force: bool = False,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> Optional[Dict]:
+    """
+    Check every catalogue song against the music library.
+
+    Args:
+        root: Library root (defaults to MUSIC_LIBRARY_PATH)
+        full: List every library directory again instead of the changed ones
+        force: Match the songs again even if neither the library nor the
+            catalogue changed since the stored check
+        workers: Number of parallel directory listings
+        progress: Called as progress(fraction, message)
+
+    Returns:
+        Dict with the library root, the number of songs, the count per
+        status, whether the stored results were reused, the library scan
+        report and the elapsed seconds; None when there is no library
+    """
+    started = time.perf_counter()
+
+    def on_directory(visited, directory):
+        if progress and visited % 50 == 0:
+            progress(0.0, f"Scanned {visited} folders")
+
+    scan = refresh_library_index(root=root, full=full, workers=workers, progress=on_directory)
+    if scan is None:
+        return None
+    index = get_library_index(scan["root"])
+    if index is None:
+        return None
+
+    catalogue_generation = get_catalogue_generation()
+    state = get_song_file_check_state()
+    reused = (
+        not force
+        and state["root"] == index.root
+        and state["library_generation"] == index.generation
+        and state["catalogue_generation"] == catalogue_generation
+    )
+    if reused:
+        counts = get_song_file_status_counts()
+    else:
+        if progress:
+            progress(0.5, "Matching songs to files")
+        statuses = [(song["music_ref"], *classify_song(index, song)) for song in get_all_songs()]
+        store_song_file_statuses(index.root, index.generation, catalogue_generation, statuses)
+        counts = dict(Counter(status for _, status, _ in statuses))
+
+    return {
+        "root": index.root,
+        "songs": sum(counts.values()),
+        "counts": counts,
+        "playable": sum(counts.get(status, 0) for status in PLAYABLE_STATUSES),
+        "reused": reused,
+        "scan": scan,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def get_catalogue_file_problems(statuses=PROBLEM_STATUSES) -> List[Dict]:
+    """Songs of the last check with one of the given statuses, as dicts."""
+    return [dict(row) for row in get_song_file_problems(statuses)]
+
+
+def get_exercise_playable_counts() -> Dict[str, tuple]:
+    """
+    Playable songs per exercise from the last check, as
+    {exercise_id: (playable, total)}; empty before the first check.
+    """
+    return get_playable_song_counts(PLAYABLE_STATUSES)
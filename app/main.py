@@ -11,8 +11,11 @@ project_root = str(Path(__file__).parent.parent)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+from app.db.query_stats import SQL_STATS, start_query_stats
+from app.db.tracing import trace_unit_of_work
+from app.library_index import enable_background_refresh
 from app.ui import initialize_session_state
-from app.ui import exercise_selector, exercise_list, add_exercise
+from app.ui import exercise_selector, exercise_list, add_exercise, job_status, library_health
 from app.sessions import (
     render_session_metadata_ui,
     render_session_list_ui,
@@ -37,6 +40,10 @@ def main():
     st.title("LSB Music App")
     st.subheader("Build and Manage Biodanza Sessions")
 
+    # Background job progress, filled in at the end of the run so it picks
+    # up jobs started by any button below, whatever the session holds
+    job_panel = st.container()
+
     # Sidebar for filtering and controls
     with st.sidebar:
         st.header("Exercise Filters")
@@ -91,6 +98,12 @@ def main():
         st.markdown("---")
         add_exercise.render_exercise_management_sidebar()
 
+        # Catalogue reload and library scan (background jobs)
+        st.markdown("---")
+        job_status.render_maintenance_controls()
+        library_health.render_library_health_panel()
+        library_health.render_preview_metrics()
+
     # Define a helper function for rendering session components
     def render_session_components():
         # Session list first
@@ -301,6 +314,16 @@ def main():
         if render_session_list_ui():
             st.rerun()
 
+    with job_panel:
+        job_status.render_job_status()
+
 
 if __name__ == "__main__":
-    main()
+    # Lookups queue a library_scan job when the library index is missing or stale
+    enable_background_refresh()
+    # Collects per-query latency histograms when SQL_STATS is set (see /debug)
+    if SQL_STATS:
+        start_query_stats()
+    # Traces the SQL of each rerun when SQL_TRACE is set
+    with trace_unit_of_work("rerun"):
+        main()
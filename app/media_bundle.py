@@ -0,0 +1,205 @@
+"""
+Session media bundle export: the session playlist plus its audio files.
+
+The bundle is a folder holding a music/ directory with copies of the tracks
+used in the session and a playlist (extended M3U by default) referring to
+them by relative path, so it can be taken to a venue on a USB stick. Tracks
+are copied in a thread pool; a hardlink is made instead when the bundle is on
+the same filesystem as the music library, and files whose size and
+modification time already match are skipped, so re-exporting an unchanged
+session copies nothing.
+"""
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.exporter import session_playlist_entries
+from app.playlists import playlist_extension, write_playlist
+
+# Number of parallel copies (BUNDLE_WORKERS in .env)
+BUNDLE_WORKERS = int(os.getenv("BUNDLE_WORKERS", "4"))
+
+# Sub-folder of the bundle that holds the audio files
+MUSIC_DIR = "music"
+
+# Modification times closer than this are considered equal; FAT-formatted
+# USB sticks only store times with a two-second resolution
+MTIME_WINDOW_NS = 2_000_000_000
+
+_COPY_CHUNK = 8 * 1024 * 1024
+
+
+def _is_up_to_date(source_stat: os.stat_result, destination: str) -> bool:
+    try:
+        dest_stat = os.stat(destination)
+    except FileNotFoundError:
+        return False
+    return (
+        dest_stat.st_size == source_stat.st_size
+        and abs(dest_stat.st_mtime_ns - source_stat.st_mtime_ns) <= MTIME_WINDOW_NS
+    )
+
+
+def _copy_contents(source: str, destination: str, size: int):
+    """Copy file data in the kernel where possible (copy_file_range, then sendfile)."""
+    if hasattr(os, "copy_file_range"):
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            try:
+                copied = 0
+                while copied < size:
+                    sent = os.copy_file_range(src.fileno(), dst.fileno(), min(_COPY_CHUNK, size - copied))
+                    if sent == 0:
+                        break
+                    copied += sent
+                if copied == size:
+                    return
+            except OSError:
+                # Not supported between these filesystems: fall through
+                pass
+    # shutil uses sendfile on Linux and fcopyfile on macOS
+    shutil.copyfile(source, destination)
+
+
+def sync_file(source: str, destination: str, hardlink: bool = True) -> Dict:
+    """
+    Bring destination up to date with source.
+
+    Returns:
+        Dict with the action taken ("skipped", "linked" or "copied") and the
+        file size in bytes
+    """
+    source_stat = os.stat(source)
+    if _is_up_to_date(source_stat, destination):
+        return {"action": "skipped", "bytes": source_stat.st_size}
+
+    dest_dir = os.path.dirname(destination)
+    # Write under a temporary name so an interrupted copy never looks complete
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, suffix=".part")
+    os.close(fd)
+    try:
+        if hardlink:
+            try:
+                os.remove(tmp_path)
+                os.link(source, tmp_path)
+                os.replace(tmp_path, destination)
+                return {"action": "linked", "bytes": source_stat.st_size}
+            except OSError:
+                # Different filesystem, or links not supported
+                pass
+        _copy_contents(source, tmp_path, source_stat.st_size)
+        # mkstemp creates the file owner-only: give it the source's mode, as copy2 would
+        shutil.copymode(source, tmp_path)
+        os.utime(tmp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        os.replace(tmp_path, destination)
+        return {"action": "copied", "bytes": source_stat.st_size}
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _bundle_names(song_paths: List[str]) -> Dict[str, str]:
+    """Map each distinct source path to a unique file name inside music/."""
+    names = {}
+    used = set()
+    for path in song_paths:
+        if path in names:
+            continue
+        base, ext = os.path.splitext(os.path.basename(path))
+        name, counter = f"{base}{ext}", 2
+        while name.lower() in used:
+            name, counter = f"{base}_{counter}{ext}", counter + 1
+        used.add(name.lower())
+        names[path] = name
+    return names
+
+
+def export_bundle(
+    session_name: str,
+    session_exercises,
+    export_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    hardlink: bool = True,
+    fmt: str = "m3u",
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict:
+    """
+    Export a session playlist with its audio files into a bundle folder.
+
+    Args:
+        session_name: Name of the session (bundle folder and playlist name)
+        session_exercises: Session exercise tuples
+        export_path: Parent folder of the bundle (defaults to EXPORT_PATH)
+        workers: Number of parallel copies (defaults to BUNDLE_WORKERS)
+        hardlink: Link instead of copying when on the same filesystem
+        fmt: Playlist format ("m3u", "xspf" or "pls")
+        progress: Called as progress(files_done, files_total) after each file
+
+    Returns:
+        Dict with the bundle and playlist paths, per-file records
+        (source, file, action, bytes), the missing source files, bytes
+        copied, linked and skipped, elapsed seconds and the copy throughput
+        in bytes per second (of the bytes actually copied)
+    """
+    load_dotenv()
+    started = time.perf_counter()
+    if export_path is None:
+        export_path = os.getenv("EXPORT_PATH", os.getcwd())
+    safe_name = re.sub(r"[^\w\- ]+", "_", session_name or "").strip() or "Session"
+    bundle_dir = os.path.join(export_path, safe_name)
+    music_dir = os.path.join(bundle_dir, MUSIC_DIR)
+    os.makedirs(music_dir, exist_ok=True)
+
+    entries = session_playlist_entries(session_exercises)
+    names = _bundle_names([entry["path"] for entry in entries])
+    report = {
+        "bundle_dir": bundle_dir,
+        "playlist_path": None,
+        "files": [],
+        "missing": [],
+        "bytes_copied": 0,
+        "bytes_linked": 0,
+        "bytes_skipped": 0,
+        "seconds": 0.0,
+        "throughput": 0.0,
+    }
+
+    with ThreadPoolExecutor(max_workers=workers or BUNDLE_WORKERS) as pool:
+        futures = {
+            pool.submit(sync_file, source, os.path.join(music_dir, name), hardlink): source
+            for source, name in names.items()
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            source = futures[future]
+            try:
+                record = future.result()
+            except FileNotFoundError:
+                report["missing"].append(source)
+            else:
+                record.update(source=source, file=f"{MUSIC_DIR}/{names[source]}")
+                report["files"].append(record)
+                report[f"bytes_{record['action']}"] += record["bytes"]
+            if progress:
+                progress(done, len(futures))
+
+    # Playlist entries are relative to the playlist, in session order
+    missing = set(report["missing"])
+    bundled = [
+        dict(entry, path=f"{MUSIC_DIR}/{names[entry['path']]}")
+        for entry in entries
+        if entry["path"] not in missing
+    ]
+    if bundled:
+        playlist_path = os.path.join(bundle_dir, f"{safe_name}{playlist_extension(fmt)}")
+        write_playlist(bundled, playlist_path, fmt, title=session_name)
+        report["playlist_path"] = playlist_path
+
+    report["seconds"] = time.perf_counter() - started
+    if report["seconds"] > 0:
+        report["throughput"] = report["bytes_copied"] / report["seconds"]
+    return report
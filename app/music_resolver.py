@@ -0,0 +1,33 @@
+"""
+Resolve the music references of a session to song details in one query.
+"""
+from typing import Dict, Iterable, List
+
+from app.db.queries import get_songs_by_refs
+
+
+def session_music_refs(session_exercises) -> List[str]:
+    """Return the music_ref of every session entry that has a song, in session order."""
+    return [
+        exercise_tuple[1]
+        for exercise_tuple in session_exercises
+        if len(exercise_tuple) >= 2 and exercise_tuple[1]
+    ]
+
+
+def resolve_music_refs(music_refs: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Fetch only the referenced songs and index them by music_ref.
+
+    Args:
+        music_refs: music_ref values to resolve (duplicates and None are ignored)
+
+    Returns:
+        Dict of music_ref -> song dict; unknown references are absent
+    """
+    return {song["music_ref"]: dict(song) for song in get_songs_by_refs(music_refs)}
+
+
+def resolve_session_songs(session_exercises) -> Dict[str, Dict]:
+    """Resolve every song referenced by a session's exercise tuples."""
+    return resolve_music_refs(session_music_refs(session_exercises))
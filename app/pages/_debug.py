@@ -0,0 +1,167 @@
+"""
+LSB Music App - Debug page (hidden: open /debug in the browser)
+
+Query latency histograms and plans collected in this server process (see
+app/db/query_stats.py), and the SQL of the last traced reruns and jobs
+(see app/db/tracing.py).
+
+The page shows literal SQL with session data and switches instrumentation
+for the whole process, so it is only served with DEBUG_PAGE set in .env.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+import sys
+
+import streamlit as st
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (the page may be opened first)
+load_dotenv()
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.db.query_stats import (
+    LARGE_TABLE_ROWS,
+    QUERY_STATS_PATH,
+    dump_query_stats,
+    get_query_stats,
+    query_stats_enabled,
+    reset_query_stats,
+    start_query_stats,
+    stop_query_stats,
+)
+from app.db.tracing import SQL_TRACE, recent_traces
+
+# Serve this page (DEBUG_PAGE in .env)
+DEBUG_PAGE = os.getenv("DEBUG_PAGE", "").lower() in ("1", "true", "yes")
+
+# Queries detailed with their histogram and plan
+DETAILED_QUERIES = 20
+
+
+def render_controls():
+    """Start, stop, reset and dump the statistics."""
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        if query_stats_enabled():
+            if st.button("Stop Collecting", key="debug_stop_button"):
+                stop_query_stats()
+                st.rerun()
+        elif st.button("Start Collecting", key="debug_start_button"):
+            start_query_stats()
+            st.rerun()
+    with col2:
+        if st.button("Reset", key="debug_reset_button"):
+            reset_query_stats()
+            st.rerun()
+    with col3:
+        st.download_button(
+            "Download JSON",
+            data=json.dumps(dump_query_stats(), indent=2),
+            file_name=f"query_stats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            key="debug_download_button",
+        )
+    with col4:
+        if st.button("Write JSON", key="debug_write_button", help=f"Write the statistics to {QUERY_STATS_PATH}"):
+            dump_query_stats(QUERY_STATS_PATH)
+            st.success(f"Written to {QUERY_STATS_PATH}")
+
+
+def render_query_table(stats):
+    """One row per query, slowest in total first; large scans marked ⚠️."""
+    st.dataframe(
+        [
+            {
+                "": "⚠️" if query["flagged"] else "",
+                "Query": query["fingerprint"],
+                "Runs": query["count"],
+                "Total ms": query["total_ms"],
+                "Mean ms": query["mean_ms"],
+                "p50 ms": query["p50_ms"],
+                "p99 ms": query["p99_ms"],
+                "Max ms": query["max_ms"],
+            }
+            for query in stats
+        ],
+        hide_index=True,
+    )
+
+
+def render_query_details(query):
+    """Latency histogram and query plan of one query."""
+    title = f"{'⚠️ ' if query['flagged'] else ''}{query['total_ms']:.1f} ms, {query['count']} runs: {query['fingerprint'][:90]}"
+    with st.expander(title):
+        st.code(query["example"], language="sql")
+        for scan in query["scans"]:
+            how = f"with index {scan['index']}" if scan["index"] else "row by row"
+            st.write(f"Scans {scan['table']} ({scan['rows']} rows) {how}")
+        if query["plan"]:
+            st.code("\n".join(query["plan"]), language=None)
+        if query["buckets"]:
+            st.bar_chart(
+                {
+                    "Latency (ms)": [f"{upper:g}" for _, upper, _ in query["buckets"]],
+                    "Runs": [count for _, _, count in query["buckets"]],
+                },
+                x="Latency (ms)",
+                y="Runs",
+            )
+
+
+def render_recent_traces():
+    """Statements of the last traced reruns and jobs, with their N+1 suspects."""
+    st.subheader("Recent Reruns and Jobs")
+    traces = recent_traces()
+    if not SQL_TRACE and not traces:
+        st.caption("Set SQL_TRACE=1 in .env to trace the SQL of every rerun and background job.")
+        return
+    for trace in reversed(traces):
+        suspects = f", {len(trace['n_plus_one'])} N+1 suspects" if trace["n_plus_one"] else ""
+        with st.expander(
+            f"{trace['started_at']} {trace['label']}: {trace['statements']} statements, "
+            f"{trace['sql_ms']:.1f} ms in SQL{suspects}"
+        ):
+            for fingerprint in trace["n_plus_one"]:
+                st.warning(f"N+1 suspect: {fingerprint}")
+            st.dataframe(
+                [
+                    {"Runs": stats["count"], "ms": stats["total_ms"], "Query": stats["fingerprint"]}
+                    for stats in trace["fingerprints"]
+                ],
+                hide_index=True,
+            )
+
+
+def main():
+    st.set_page_config(page_title="LSB Music App - Debug", page_icon="🛠️", layout="wide")
+    if not DEBUG_PAGE:
+        st.error("Page not found")
+        st.stop()
+    st.title("Query Statistics")
+
+    render_controls()
+    if not query_stats_enabled():
+        st.info("Statistics are not being collected. Start collecting here, or set SQL_STATS=1 in .env.")
+
+    stats = get_query_stats()
+    if stats:
+        flagged = sum(query["flagged"] for query in stats)
+        st.caption(
+            f"{len(stats)} queries, {sum(query['count'] for query in stats)} runs; "
+            f"{flagged} scan a table of {LARGE_TABLE_ROWS} rows or more (⚠️)"
+        )
+        render_query_table(stats)
+        for query in stats[:DETAILED_QUERIES]:
+            render_query_details(query)
+
+    render_recent_traces()
+
+
+main()
@@ -0,0 +1,171 @@
+"""
+Playlist writers (extended M3U, XSPF and PLS) for the LSB Music App.
+
+Playlists are generated purely from catalogue metadata: titles, artists and
+durations come from the musics table, so no audio file is opened. Every
+format is produced by a generator of text chunks, which can be written to a
+file path, to any text or binary file-like object (an in-memory buffer, an
+HTTP response) or returned directly as a streaming response body.
+"""
+import io
+import os
+import re
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, Iterator, Optional
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+# Bump when the generated output changes, so cached playlists are rebuilt
+PLAYLIST_WRITER_VERSION = 2
+
+_DURATION_RE = re.compile(r"^\s*(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)\s*$")
+
+
+def duration_to_seconds(duration) -> Optional[int]:
+    """
+    Convert a catalogue duration ("HH:MM:SS", "MM:SS", fractional seconds
+    allowed) to whole seconds, or None when it is missing or malformed.
+    """
+    if duration is None:
+        return None
+    match = _DURATION_RE.match(str(duration))
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + round(float(seconds))
+
+
+def _one_line(text) -> str:
+    return " ".join(str(text).split()) if text else ""
+
+
+def entry_display_title(entry: Dict) -> str:
+    """'Artist - Title', or whichever of the two is known."""
+    artist, title = _one_line(entry.get("artist")), _one_line(entry.get("title"))
+    if artist and title:
+        return f"{artist} - {title}"
+    return title or artist or os.path.basename(entry["path"])
+
+
+def _location_uri(path: str) -> str:
+    # Absolute paths become file:// URIs; relative ones stay relative references
+    if os.path.isabs(path):
+        return Path(path).as_uri()
+    return quote(PurePosixPath(*Path(path).parts).as_posix())
+
+
+def m3u_chunks(entries: Iterable[Dict], title: Optional[str] = None) -> Iterator[str]:
+    """Extended M3U: an #EXTINF line (seconds, display title) before each path."""
+    yield "#EXTM3U\n"
+    if title:
+        yield f"#PLAYLIST:{_one_line(title)}\n"
+    for entry in entries:
+        seconds = entry.get("seconds")
+        yield f"#EXTINF:{seconds if seconds is not None else -1},{entry_display_title(entry)}\n"
+        yield f"{entry['path']}\n"
+
+
+def xspf_chunks(entries: Iterable[Dict], title: Optional[str] = None) -> Iterator[str]:
+    """XSPF (XML Shareable Playlist Format); durations are in milliseconds."""
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<playlist version="1" xmlns="http://xspf.org/ns/0/">\n'
+    if title:
+        yield f"  <title>{escape(_one_line(title))}</title>\n"
+    yield "  <trackList>\n"
+    for entry in entries:
+        parts = [f"    <track>\n      <location>{escape(_location_uri(entry['path']))}</location>\n"]
+        if entry.get("title"):
+            parts.append(f"      <title>{escape(_one_line(entry['title']))}</title>\n")
+        if entry.get("artist"):
+            parts.append(f"      <creator>{escape(_one_line(entry['artist']))}</creator>\n")
+        if entry.get("seconds") is not None:
+            parts.append(f"      <duration>{entry['seconds'] * 1000}</duration>\n")
+        parts.append("    </track>\n")
+        yield "".join(parts)
+    yield "  </trackList>\n</playlist>\n"
+
+
+def pls_chunks(entries: Iterable[Dict], title: Optional[str] = None) -> Iterator[str]:
+    """PLS; the entry count goes after the entries so the list can be streamed."""
+    yield "[playlist]\n"
+    count = 0
+    for count, entry in enumerate(entries, 1):
+        seconds = entry.get("seconds")
+        yield (
+            f"File{count}={entry['path']}\n"
+            f"Title{count}={entry_display_title(entry)}\n"
+            f"Length{count}={seconds if seconds is not None else -1}\n"
+        )
+    yield f"NumberOfEntries={count}\nVersion=2\n"
+
+
+# Format name -> (chunk generator, file extension, MIME type)
+PLAYLIST_FORMATS = {
+    "m3u": (m3u_chunks, ".m3u", "audio/x-mpegurl"),
+    "xspf": (xspf_chunks, ".xspf", "application/xspf+xml"),
+    "pls": (pls_chunks, ".pls", "audio/x-scpls"),
+}
+
+
+def iter_playlist(entries: Iterable[Dict], fmt: str = "m3u", title: Optional[str] = None) -> Iterator[str]:
+    """
+    Generate a playlist as text chunks.
+
+    Args:
+        entries: Dicts with "path" and optional "title", "artist", "seconds"
+        fmt: One of PLAYLIST_FORMATS
+        title: Optional playlist title
+
+    Returns:
+        Iterator of text chunks (UTF-8 when encoded)
+    """
+    if fmt not in PLAYLIST_FORMATS:
+        raise ValueError(f"Unknown playlist format: {fmt}")
+    return PLAYLIST_FORMATS[fmt][0](entries, title)
+
+
+def _write_encoded(chunks: Iterator[str], target) -> int:
+    written = 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        target.write(data)
+        written += len(data)
+    return written
+
+
+def write_playlist(entries: Iterable[Dict], target, fmt: str = "m3u", title: Optional[str] = None) -> int:
+    """
+    Stream a playlist to a path or a text/binary file-like object.
+
+    Returns:
+        Number of bytes (binary targets and paths) or characters written
+    """
+    chunks = iter_playlist(entries, fmt, title)
+    if isinstance(target, (str, os.PathLike)):
+        # Binary, so the count is in UTF-8 bytes and newlines stay "\n"
+        with open(target, "wb") as f:
+            return _write_encoded(chunks, f)
+    if isinstance(target, (io.RawIOBase, io.BufferedIOBase)) or "b" in getattr(target, "mode", ""):
+        return _write_encoded(chunks, target)
+    return sum(target.write(chunk) for chunk in chunks)
+
+
+def playlist_extension(fmt: str) -> str:
+    return PLAYLIST_FORMATS[fmt][1]
+
+
+def playlist_mime_type(fmt: str) -> str:
+    return PLAYLIST_FORMATS[fmt][2]
+
+
+def count_playlist_entries(path: str) -> int:
+    """Count the tracks of a playlist file written by this module."""
+    fmt = {ext: name for name, (_, ext, _) in PLAYLIST_FORMATS.items()}.get(
+        os.path.splitext(path)[1].lower(), "m3u"
+    )
+    with open(path, encoding="utf-8") as f:
+        if fmt == "xspf":
+            return sum(line.count("<track>") for line in f)
+        if fmt == "pls":
+            return sum(1 for line in f if line.startswith("File"))
+        return sum(1 for line in f if line.strip() and not line.startswith("#"))
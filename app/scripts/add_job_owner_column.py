@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the owner column to the jobs table.
+"""
+
+import sys
+import sqlite3
+import os
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.db.schema import DB_PATH
+
+
+def add_job_owner_column():
+    """
+    Add an 'owner' column to the jobs table if it doesn't exist.
+    """
+    print(f"Connecting to database at {DB_PATH}...")
+
+    if not os.path.exists(DB_PATH):
+        print(f"Database file not found at {DB_PATH}")
+        return False
+
+    conn = None
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        # Check if the jobs table and its owner column exist
+        cursor.execute("PRAGMA table_info(jobs)")
+        columns = cursor.fetchall()
+        column_names = [col["name"] for col in columns]
+
+        if not column_names:
+            print("jobs table not found; it is created with the owner column on first use.")
+            return True
+        if "owner" in column_names:
+            print("owner column already exists in jobs table.")
+            return True
+
+        # Add the owner column (existing jobs have none and count as interrupted)
+        print("Adding owner column to jobs table...")
+        cursor.execute("ALTER TABLE jobs ADD COLUMN owner TEXT;")
+        conn.commit()
+
+        print("Migration completed successfully.")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}")
+        if conn:
+            conn.rollback()
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    success = add_job_owner_column()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the session_tags table and backfill it from sessions.tags.
+"""
+
+import sys
+import os
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.db.schema import DB_PATH, init_db
+from app.db.queries import rebuild_session_tags
+
+
+def add_session_tags_table():
+    """
+    Create the session_tags table and its index if they don't exist,
+    then rebuild the tag rows from the tags column of every session.
+    """
+    print(f"Connecting to database at {DB_PATH}...")
+
+    if not os.path.exists(DB_PATH):
+        print(f"Database file not found at {DB_PATH}")
+        return False
+
+    # init_db creates any missing table and index with CREATE ... IF NOT EXISTS
+    print("Creating session_tags table if needed...")
+    if not init_db():
+        return False
+
+    print("Backfilling session tags...")
+    written = rebuild_session_tags()
+    if written is None:
+        return False
+
+    print(f"Migration completed successfully ({written} tag rows written).")
+    return True
+
+
+if __name__ == "__main__":
+    success = add_session_tags_table()
+    sys.exit(0 if success else 1)
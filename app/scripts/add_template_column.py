@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the is_template column to the sessions table.
+"""
+
+import sys
+import sqlite3
+import os
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.db.schema import DB_PATH
+
+
+def add_template_column():
+    """
+    Add an 'is_template' column to the sessions table if it doesn't exist.
+    """
+    print(f"Connecting to database at {DB_PATH}...")
+
+    if not os.path.exists(DB_PATH):
+        print(f"Database file not found at {DB_PATH}")
+        return False
+
+    conn = None
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        # Check if is_template column exists
+        cursor.execute("PRAGMA table_info(sessions)")
+        columns = cursor.fetchall()
+        column_names = [col["name"] for col in columns]
+
+        if "is_template" in column_names:
+            print("is_template column already exists in sessions table.")
+            return True
+
+        # Add the is_template column (existing sessions are not templates)
+        print("Adding is_template column to sessions table...")
+        cursor.execute("ALTER TABLE sessions ADD COLUMN is_template INTEGER DEFAULT 0;")
+        conn.commit()
+
+        print("Migration completed successfully.")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}")
+        if conn:
+            conn.rollback()
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    success = add_template_column()
+    sys.exit(0 if success else 1)
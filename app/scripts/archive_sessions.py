@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Move old sessions into the compressed archive tier, or restore one from it.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/archive_sessions.py [--days DAYS]
+    python app/scripts/archive_sessions.py --restore SESSION_ID
+
+- Sessions not updated for more than DAYS days (default: SESSION_ARCHIVE_DAYS
+  from .env, or 365) are archived. Templates are never archived.
+- Archived sessions remain loadable from the app and are moved back to the
+  regular tables as soon as they are saved again.
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.db.schema import init_db
+from app.db.queries import archive_sessions, restore_archived_session
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Archive or restore saved sessions.")
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=int(os.getenv("SESSION_ARCHIVE_DAYS", "365")),
+        help="Archive sessions not updated for this many days",
+    )
+    parser.add_argument("--restore", type=str, help="Restore the archived session with this ID")
+    args = parser.parse_args()
+
+    if not init_db():
+        return False
+
+    if args.restore:
+        if restore_archived_session(args.restore):
+            print(f"Session {args.restore} restored from the archive.")
+            return True
+        print(f"Archived session {args.restore} not found.")
+        return False
+
+    archived = archive_sessions(older_than_days=args.days)
+    if archived is None:
+        print("Failed to archive sessions.")
+        return False
+    print(f"Archived {archived} sessions not updated in the last {args.days} days.")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,177 @@
+"""
+Save benchmark results as named baselines and check new runs against them.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/benchmark_baseline.py save main
+    python app/scripts/benchmark_baseline.py save main --results data/benchmarks/latest.json
+    python app/scripts/benchmark_baseline.py list
+    python app/scripts/benchmark_baseline.py compare main
+    python app/scripts/benchmark_baseline.py compare main --results new.json --tolerance 0.1 --metric p95_ms
+
+- save runs the benchmark suite (or takes an existing results file) and
+  stores it in data/benchmarks/baselines/<name>.json, which can be
+  committed.
+- compare runs the cases of the baseline again, at its scales and with its
+  seed and repeat count (or takes --results; baselines of
+  run_ui_benchmarks.py results rerun the UI script), prints a per-case
+  table and exits with status 1 if any case got slower than the tolerance
+  allows or has no result in the new run.
+  Record the baseline and the new run on the same machine: the results of
+  different machines are not comparable.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.benchmarks import run_benchmarks, write_results
+from app.benchmarks.baselines import (
+    DEFAULT_MIN_DELTA_MS,
+    DEFAULT_TOLERANCE,
+    METRICS,
+    STATUS_MISSING,
+    STATUS_REGRESSION,
+    baseline_path,
+    compare_results,
+    environment_differences,
+    format_comparison,
+    list_baselines,
+    load_baseline,
+    load_results,
+    save_baseline,
+    summarise_comparison,
+)
+from app.benchmarks.runner import DEFAULT_MAX_SECONDS, DEFAULT_REPEAT
+from app.benchmarks.ui_reruns import HARNESS as UI_HARNESS, run_ui_benchmarks
+from app.synthetic_data import SCALES
+
+DEFAULT_OUTPUT = project_root / "data" / "benchmarks" / "latest.json"
+UI_OUTPUT = project_root / "data" / "benchmarks" / "ui_latest.json"
+
+
+def _progress(message):
+    print(f"  {message:<70}", end="\r", flush=True)
+
+
+def _run(scales, seed, patterns, repeat, max_seconds, names=None):
+    results = run_benchmarks(scales, seed=seed, patterns=patterns, names=names, repeat=repeat,
+                             max_seconds=max_seconds, progress=_progress)
+    print(" " * 74, end="\r")
+    print(f"Run results written to {write_results(results, str(DEFAULT_OUTPUT))}")
+    return results
+
+
+def save(args):
+    try:
+        baseline_path(args.name)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    if args.results:
+        results = load_results(args.results)
+    else:
+        results = _run(args.scale, args.seed, args.only, args.repeat, args.max_seconds)
+    path = save_baseline(results, args.name)
+    print(f"Saved {len(results.get('results', []))} results as baseline '{args.name}': {path}")
+    return True
+
+
+def show_list(args):
+    baselines = list_baselines()
+    if not baselines:
+        print("No baselines saved yet")
+    for baseline in baselines:
+        print(
+            f"{baseline['name']:<24} {baseline['created_at'] or '-':<20} commit {baseline['commit'] or '-':<9} "
+            f"{baseline['cases']} results ({', '.join(baseline['scales'])})"
+        )
+    return True
+
+
+def compare(args):
+    try:
+        baseline = load_baseline(args.name)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    if baseline is None:
+        print(f"Error: no baseline named '{args.name}' (see the list command)")
+        return False
+
+    if args.results:
+        current = load_results(args.results)
+    elif baseline.get("harness") == UI_HARNESS:
+        current = run_ui_benchmarks(list(baseline.get("scales", {})), seed=baseline.get("seed", 0),
+                                    measure_memory=False, progress=_progress)
+        print(" " * 74, end="\r")
+        print(f"Run results written to {write_results(current, str(UI_OUTPUT))}")
+    elif baseline.get("harness"):
+        print(f"Error: baseline '{args.name}' comes from the {baseline['harness']} harness; compare it with --results")
+        return False
+    else:
+        current = _run(
+            list(baseline.get("scales", {})),
+            baseline.get("seed", 0),
+            None,
+            baseline.get("repeat", DEFAULT_REPEAT),
+            baseline.get("max_seconds", DEFAULT_MAX_SECONDS),
+            names=sorted({result["name"] for result in baseline.get("results", [])}),
+        )
+
+    for difference in environment_differences(baseline, current):
+        print(f"Warning: environment differs from the baseline ({difference})")
+    rows = compare_results(baseline, current, args.tolerance, args.min_delta_ms, args.metric)
+    print(format_comparison(rows, args.metric, only_changes=args.changes_only))
+    counts = summarise_comparison(rows)
+    print(
+        f"\nBaseline '{args.name}' (commit {baseline.get('commit') or '-'}) vs. commit {current.get('commit') or '-'}, "
+        f"{args.metric}, tolerance {args.tolerance:.0%} / {args.min_delta_ms} ms: "
+        + ", ".join(f"{count} {status}" for status, count in counts.items() if count)
+    )
+    if counts[STATUS_MISSING]:
+        # A case that no longer runs cannot be checked: save a new baseline
+        # if it was removed or renamed on purpose
+        print(f"Error: {counts[STATUS_MISSING]} baseline cases have no result in the new run (marked 'gone')")
+    return counts[STATUS_REGRESSION] == 0 and counts[STATUS_MISSING] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark baselines and regression checks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    save_parser = commands.add_parser("save", help="Save results as a named baseline")
+    save_parser.add_argument("name", help="Baseline name, e.g. main")
+    save_parser.add_argument("--results", help="Results file to save instead of running the suite")
+    save_parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=list(SCALES), help="Scales to run")
+    save_parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data")
+    save_parser.add_argument("--only", nargs="+", metavar="PATTERN", help="Glob patterns of the cases to run")
+    save_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Maximum timed calls per case")
+    save_parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS,
+                             help="Time budget per case once a few calls are done")
+    save_parser.set_defaults(handler=save)
+
+    list_parser = commands.add_parser("list", help="List the saved baselines")
+    list_parser.set_defaults(handler=show_list)
+
+    compare_parser = commands.add_parser("compare", help="Compare a run with a baseline")
+    compare_parser.add_argument("name", help="Baseline name")
+    compare_parser.add_argument("--results", help="Results file to compare instead of running the suite")
+    compare_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                                help="Relative slowdown tolerated as noise (0.25 = 25%%)")
+    compare_parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS,
+                                help="Slowdowns below this many milliseconds are tolerated")
+    compare_parser.add_argument("--metric", choices=METRICS, default="p50_ms", help="Latency compared")
+    compare_parser.add_argument("--changes-only", action="store_true", help="Only list cases that changed")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,125 @@
+"""
+Benchmark Word export: cell-by-cell python-docx vs. the prebuilt template.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/benchmark_docx_export.py [--rows 10 100 1000] [--repeat 5]
+
+The benchmark builds a throwaway database in a temporary directory, so the
+real catalogue is never touched.
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from docx import Document
+from docx.enum.section import WD_ORIENT
+from docx.shared import Cm
+
+from app.db import schema
+from app.db.queries import insert_musics
+from app.docx_template import load_template
+from app.scripts.export_session_to_word import export_session_to_word
+
+
+def build_catalogue(track_count):
+    """Fill the temporary database with synthetic tracks."""
+    insert_musics(
+        [
+            {
+                "music_ref": f"BENCH-{i:06d}",
+                "collection_cd": f"Bench CD {i // 20}",
+                "filename": f"Bench Artist {i % 500} - Track {i}.mp3",
+                "title": f"Track {i}",
+                "artist": f"Bench Artist {i % 500}",
+                "duration": f"00:0{i % 6}:{i % 60:02d}",
+                "v": None,
+                "c": None,
+                "a": None,
+                "s": None,
+                "t": None,
+                "bpm": 60 + i % 80,
+            }
+            for i in range(track_count)
+        ]
+    )
+
+
+def legacy_export(session_metadata, rows, filepath):
+    """The previous approach: build every table cell through python-docx."""
+    doc = Document()
+    section = doc.sections[0]
+    section.orientation = WD_ORIENT.LANDSCAPE
+    section.page_width, section.page_height = section.page_height, section.page_width
+    doc.add_heading(f"Session: {session_metadata['name']}", 0)
+    doc.add_heading("Exercise - Music List", level=1)
+    table = doc.add_table(rows=1, cols=5)
+    table.autofit = False
+    for idx, width in enumerate([Cm(0.7), Cm(6.0), Cm(9.0), Cm(2.5), Cm(5.0)]):
+        table.columns[idx].width = width
+    table.style = "Table Grid"
+    for cell, text in zip(table.rows[0].cells, ("#", "Exercise", "Music", "Duration", "Notes")):
+        cell.text = text
+    for row in rows:
+        for cell, text in zip(table.add_row().cells, row):
+            cell.text = str(text)
+    doc.add_heading("Session Metadata", level=1)
+    for key, value in session_metadata.items():
+        doc.add_paragraph(f"{key}: {value}")
+    doc.save(filepath)
+
+
+def time_it(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Word export.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000], help="Session sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per approach")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        schema.DB_PATH = Path(tmp_dir) / "benchmark.db"
+        schema.init_db()
+        build_catalogue(max(args.rows))
+        # Load the template up front: it is loaded once per process in the app too
+        load_template()
+
+        session_metadata = {"id": "bench", "name": "Benchmark", "date": "2024-01-01", "tags": "#bench"}
+        print("Exporting sessions to Word:")
+        for row_count in args.rows:
+            session_exercises = [
+                (f"Exercise {i} [id {i}]", f"BENCH-{i:06d}", str(i), f"Note {i}")
+                for i in range(row_count)
+            ]
+            rows = [
+                (i + 1, f"Exercise {i} [id {i}] ", f"BENCH-{i:06d} Track {i} {{Bench Artist {i % 500}}}",
+                 f"00:0{i % 6}:{i % 60:02d}", f"Note {i}")
+                for i in range(row_count)
+            ]
+            legacy_path = os.path.join(tmp_dir, "legacy.docx")
+            results = [
+                ("python-docx cells", time_it(lambda: legacy_export(session_metadata, rows, legacy_path), args.repeat)),
+                ("template", time_it(lambda: export_session_to_word(session_metadata, session_exercises, tmp_dir), args.repeat)),
+            ]
+            for label, (best, mean) in results:
+                print(f"  {row_count:>5} rows  {label:<18} best {best * 1000:9.2f} ms   mean {mean * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark music_ref resolution for exports: full-catalogue scan vs. the shared resolver.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/benchmark_music_resolver.py [--tracks 50000] [--rows 200] [--repeat 5]
+
+The benchmark builds a throwaway database in a temporary directory, so the
+real catalogue is never touched.
+"""
+
+import sys
+import random
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.db import schema
+from app.db.queries import insert_musics, get_all_songs
+from app.music_resolver import resolve_session_songs
+
+
+def build_catalogue(track_count):
+    """Fill the temporary database with synthetic tracks."""
+    insert_musics(
+        [
+            {
+                "music_ref": f"BENCH-{i:06d}",
+                "collection_cd": f"Bench CD {i // 20}",
+                "filename": f"Bench Artist {i % 500} - Track {i}.mp3",
+                "title": f"Track {i}",
+                "artist": f"Bench Artist {i % 500}",
+                "duration": f"00:0{i % 6}:{i % 60:02d}",
+                "v": "x" if i % 5 == 0 else None,
+                "c": None,
+                "a": "x" if i % 3 == 0 else None,
+                "s": None,
+                "t": None,
+                "bpm": 60 + i % 80,
+            }
+            for i in range(track_count)
+        ]
+    )
+
+
+def legacy_resolve(session_exercises):
+    """The previous approach: load the whole catalogue, scan it for every row."""
+    all_songs = get_all_songs()
+    all_songs = [{k: s[k] for k in s.keys()} for s in all_songs]
+    return [
+        next((s for s in all_songs if s["music_ref"] == exercise_tuple[1]), None)
+        for exercise_tuple in session_exercises
+    ]
+
+
+def resolver_resolve(session_exercises):
+    songs_by_ref = resolve_session_songs(session_exercises)
+    return [songs_by_ref.get(exercise_tuple[1]) for exercise_tuple in session_exercises]
+
+
+def time_it(func, session_exercises, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(session_exercises)
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark music_ref resolution.")
+    parser.add_argument("--tracks", type=int, default=50000, help="Catalogue size")
+    parser.add_argument("--rows", type=int, default=200, help="Session rows")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per approach")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        schema.DB_PATH = Path(tmp_dir) / "benchmark.db"
+        schema.init_db()
+        print(f"Building a catalogue of {args.tracks} tracks...")
+        build_catalogue(args.tracks)
+
+        rng = random.Random(42)
+        session_exercises = [
+            (f"Exercise {i} [id {i}]", f"BENCH-{rng.randrange(args.tracks):06d}", str(i), "")
+            for i in range(args.rows)
+        ]
+
+        assert legacy_resolve(session_exercises) == resolver_resolve(session_exercises)
+
+        print(f"\nResolving a {args.rows}-row session against {args.tracks} tracks:")
+        for label, func in (
+            ("full catalogue scan", legacy_resolve),
+            ("shared resolver", resolver_resolve),
+        ):
+            best, mean = time_it(func, session_exercises, args.repeat)
+            print(f"  {label:<20} best {best * 1000:9.2f} ms   mean {mean * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
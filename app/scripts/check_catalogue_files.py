@@ -0,0 +1,86 @@
+"""
+Check every catalogue song against the music library and report the ones
+that are missing or unusable.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/check_catalogue_files.py [--full] [--force] [--output report.csv]
+
+- Only library folders whose modification time changed are listed again,
+  and when neither the library nor the catalogue changed since the last
+  check the stored results are reported as they are.
+- Songs found under another name or extension still play, but their
+  catalogue filename should be corrected.
+- Songs that are not .mp3 or .m4a are left out of exported playlists.
+"""
+import sys
+import argparse
+import csv
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.library_integrity import (
+    STATUS_LABELS,
+    check_catalogue_files,
+    get_catalogue_file_problems,
+)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Check catalogue songs against the music library.")
+    parser.add_argument("--full", action="store_true", help="List every library folder again")
+    parser.add_argument("--force", action="store_true", help="Match every song again")
+    parser.add_argument("--root", help="Library folder (default: MUSIC_LIBRARY_PATH)")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel folder listings")
+    parser.add_argument("--output", help="Write the problem songs to this CSV file")
+    parser.add_argument("--limit", type=int, default=50, help="Problem songs printed per status")
+    args = parser.parse_args()
+
+    report = check_catalogue_files(root=args.root, full=args.full, force=args.force, workers=args.workers)
+    if report is None:
+        print("Error: MUSIC_LIBRARY_PATH is not set or does not exist.")
+        return False
+
+    scan = report["scan"]
+    print(
+        f"Library {report['root']}: {scan['directories']} folders, {scan['listed']} listed "
+        f"in {scan['seconds']:.2f} s"
+    )
+    print(
+        f"Catalogue songs playable: {report['playable']} of {report['songs']}"
+        + (" (unchanged since the last check)" if report["reused"] else "")
+    )
+
+    problems = get_catalogue_file_problems()
+    by_status = {}
+    for row in problems:
+        by_status.setdefault(row["status"], []).append(row)
+    for status, rows in by_status.items():
+        print(f"\n{STATUS_LABELS[status]} ({len(rows)}):")
+        for row in rows[:args.limit]:
+            found = f" -> {row['path']}" if row["path"] else ""
+            print(f"  [{row['music_ref']}] {row['title']} - {row['artist']}: {row['filename']}{found}")
+        if len(rows) > args.limit:
+            print(f"  ... {len(rows) - args.limit} more")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["MusicRef", "Status", "Music filename", "Title", "Artist", "Matched file"])
+            for row in problems:
+                writer.writerow(
+                    [row["music_ref"], STATUS_LABELS[row["status"]], row["filename"], row["title"],
+                     row["artist"], row["path"]]
+                )
+        print(f"\nReport written to {args.output}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
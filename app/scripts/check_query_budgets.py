@@ -0,0 +1,138 @@
+"""
+Check that the exercise list, the session list and the exporters run no
+more SQL statements than their budget, so that batched queries do not
+quietly turn back into a query per exercise, per session or per song.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/check_query_budgets.py
+    python app/scripts/check_query_budgets.py --scale medium --verbose
+
+- Runs on a copy of the synthetic fixture database of --scale (see
+  run_benchmarks.py), with the session that has the most exercises.
+- Exits with status 1 if a budget is exceeded, listing the statements that
+  ran most often. The budgets do not depend on the catalogue size: a count
+  that grows with it is the regression this check is for.
+"""
+import sys
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.db import schema
+from app.db.tracing import assert_max_queries
+from app.synthetic_data import SCALES
+
+# Most SQL statements each checked unit of work may run
+QUERY_BUDGETS = {
+    # Songs and phases of all exercises, custom songs, the catalogue
+    "render_session_list": 4,
+    "render_session_list_ui": 5,
+    "export_session_to_word": 1,
+    "export_playlist": 1,
+    "export_catalogue": 4,
+    "export_sessions_data": 4,
+}
+
+
+def _render_exercise_list(session_exercises):
+    """Streamlit script of the exercise list of a loaded session, run through AppTest."""
+    import streamlit as st
+
+    from app.ui import initialize_session_state
+    from app.ui.exercise_list import render_session_list
+
+    initialize_session_state()
+    st.session_state.session_exercises = list(session_exercises)
+    render_session_list()
+
+
+def _render_session_list():
+    """Streamlit script of the session list, run through AppTest."""
+    from app.ui import initialize_session_state
+    from app.sessions import render_session_list_ui
+
+    initialize_session_state()
+    render_session_list_ui()
+
+
+def _largest_session(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT session_id FROM session_exercises GROUP BY session_id ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _checks(work_dir, session_id):
+    """(name, call) of every checked unit of work."""
+    from streamlit.testing.v1 import AppTest
+
+    from app.data_export import export_catalogue, export_sessions_data
+    from app.db.queries import get_session_by_id
+    from app.exporter import export_playlist
+    from app.scripts.export_session_to_word import export_session_to_word
+
+    session_data, session_exercises = get_session_by_id(session_id)
+    export_dir = os.path.join(work_dir, "exports")
+
+    def run_script(script, *args):
+        at = AppTest.from_function(script, args=args).run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    return [
+        ("render_session_list", lambda: run_script(_render_exercise_list, session_exercises)),
+        ("render_session_list_ui", lambda: run_script(_render_session_list)),
+        ("export_session_to_word", lambda: export_session_to_word(session_data, session_exercises, export_dir)),
+        ("export_playlist", lambda: export_playlist(session_data["name"], session_exercises, export_dir)),
+        ("export_catalogue", lambda: export_catalogue(os.path.join(export_dir, "catalogue"), "csv")),
+        ("export_sessions_data", lambda: export_sessions_data(os.path.join(export_dir, "sessions"), "csv")),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the SQL statement budgets of the session list and exporters.")
+    parser.add_argument("--scale", choices=list(SCALES), default="small", help="Synthetic fixture to copy")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data")
+    parser.add_argument("--verbose", action="store_true", help="Print the statements of every check")
+    args = parser.parse_args()
+
+    from app.benchmarks.fixtures import fixture_database
+
+    os.environ["MUSIC_LIBRARY_PATH"] = ""
+    source = fixture_database(args.scale, args.seed, lambda message: print(f"  {message}"))
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix="lsb-query-budgets-") as work_dir:
+        schema.DB_PATH = Path(work_dir) / "budgets.db"
+        shutil.copyfile(source, schema.DB_PATH)
+        for name, call in _checks(work_dir, _largest_session(schema.DB_PATH)):
+            budget = QUERY_BUDGETS[name]
+            try:
+                # AppTest runs its script in another thread
+                with assert_max_queries(budget, name, all_threads=True) as trace:
+                    call()
+            except AssertionError as e:
+                failures += 1
+                print(f"FAIL {name}: {trace.count} statements, budget {budget}\n{e}")
+                continue
+            print(f"ok   {name}: {trace.count} statements, budget {budget}")
+            if args.verbose:
+                print(trace.format())
+    if failures:
+        print(f"\n{failures} of {len(QUERY_BUDGETS)} checks over budget")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,55 @@
+"""
+Export the catalogue or the saved sessions to XLSX or CSV.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/export_data.py catalogue --output catalogue.xlsx
+    python app/scripts/export_data.py catalogue --output catalogue_csv/
+    python app/scripts/export_data.py sessions --output sessions.xlsx [--no-archived]
+
+- Rows are streamed from the database, so memory use stays flat.
+- An .xlsx output is one workbook; any other output is a directory with
+  one CSV file per sheet (or use --format).
+- A catalogue export can be loaded back with app/data_loader.py:
+  load_lsb_catalogue("catalogue.xlsx") or load_lsb_catalogue("catalogue_csv/").
+"""
+import sys
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.data_export import export_catalogue, export_sessions_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the catalogue or sessions to XLSX/CSV.")
+    parser.add_argument("what", choices=["catalogue", "sessions"], help="Data to export")
+    parser.add_argument("--output", required=True, help=".xlsx file or CSV directory")
+    parser.add_argument("--format", choices=["xlsx", "csv"], help="Output format (default: from --output)")
+    parser.add_argument("--no-archived", action="store_true", help="Leave out archived sessions")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        if args.what == "catalogue":
+            counts = export_catalogue(args.output, args.format)
+        else:
+            counts = export_sessions_data(args.output, args.format, include_archived=not args.no_archived)
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return False
+
+    for sheet, count in counts.items():
+        print(f"  {sheet:<25} {count:>8} rows")
+    print(f"Exported {args.what} to {args.output} in {time.perf_counter() - start:.2f} s")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,67 @@
+"""
+Export a saved session as a media bundle: its playlist plus the audio files.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/export_session_bundle.py --id SESSION_ID [--output DIR]
+
+- Tracks are copied into <output>/<session name>/music/ in parallel, or
+  hardlinked when the output is on the same filesystem as the library.
+- Tracks whose size and modification time already match are skipped.
+- The playlist refers to the tracks by relative path.
+"""
+import sys
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.db.queries import get_session_by_id
+from app.media_bundle import export_bundle
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export a session with its audio files.")
+    parser.add_argument("--id", required=True, help="Session ID to export")
+    parser.add_argument("--output", help="Parent folder of the bundle (default: EXPORT_PATH)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parallel copies")
+    parser.add_argument("--no-hardlink", action="store_true", help="Always copy, never hardlink")
+    args = parser.parse_args()
+
+    session_data, session_exercises = get_session_by_id(args.id)
+    if not session_data:
+        print(f"Session {args.id} not found.")
+        return False
+
+    report = export_bundle(
+        session_data["name"],
+        session_exercises,
+        export_path=args.output,
+        workers=args.workers,
+        hardlink=not args.no_hardlink,
+    )
+
+    for record in report["files"]:
+        print(f"  {record['action']:<8} {record['bytes'] / 1024 / 1024:8.1f} MB  {record['file']}")
+    for source in report["missing"]:
+        print(f"  missing  {source}")
+
+    mb = 1024 * 1024
+    print(
+        f"Bundle written to {report['bundle_dir']}: "
+        f"{report['bytes_copied'] / mb:.1f} MB copied, {report['bytes_linked'] / mb:.1f} MB linked, "
+        f"{report['bytes_skipped'] / mb:.1f} MB skipped "
+        f"in {report['seconds']:.2f} s ({report['throughput'] / mb:.1f} MB/s)"
+    )
+    if not report["playlist_path"]:
+        print("No audio files found: playlist not created.")
+    return not report["missing"]
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
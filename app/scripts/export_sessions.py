@@ -0,0 +1,79 @@
+"""
+Export several sessions (M3U playlists and Word documents) into one ZIP archive.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/export_sessions.py --ids ID [ID ...] [--output sessions.zip]
+    python app/scripts/export_sessions.py --tags retreat --from 2025-01-01 --to 2025-03-31
+
+- Sessions can be selected by IDs, tags (any-of, or all-of with --match-all)
+  and/or a date range; tags and dates narrow each other down.
+- Sessions are exported in a process pool and streamed into the archive.
+- Sessions that have not changed since the previous run are not re-exported.
+"""
+import os
+import sys
+import argparse
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.bulk_export import EXPORT_FORMATS, select_sessions, export_sessions
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export several sessions into one ZIP archive.")
+    parser.add_argument("--ids", nargs="*", default=[], help="Session IDs to export")
+    parser.add_argument("--tags", nargs="*", default=[], help="Export sessions with these tags")
+    parser.add_argument("--match-all", action="store_true", help="Require every tag instead of any")
+    parser.add_argument("--from", dest="date_from", help="First session date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="Last session date (YYYY-MM-DD)")
+    parser.add_argument(
+        "--formats", nargs="*", default=list(EXPORT_FORMATS), choices=EXPORT_FORMATS,
+        help="File formats to export",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--output", help="ZIP file to write (default: EXPORT_PATH/sessions_<timestamp>.zip)")
+    args = parser.parse_args()
+
+    session_ids = select_sessions(
+        session_ids=args.ids,
+        tags=args.tags,
+        match_all=args.match_all,
+        date_from=args.date_from,
+        date_to=args.date_to,
+    )
+    if not session_ids:
+        print("No sessions match the given criteria.")
+        return False
+
+    output = args.output or os.path.join(
+        os.getenv("EXPORT_PATH", os.getcwd()),
+        f"sessions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+    )
+    print(f"Exporting {len(session_ids)} sessions to {output}...")
+    report = export_sessions(session_ids, output, formats=args.formats, workers=args.workers)
+
+    for record in report["files"]:
+        status = "skipped (unchanged)" if record["skipped"] else f"{record['seconds'] * 1000:8.1f} ms"
+        print(f"  {record['arcname']:<50} {status}")
+    for error in report["errors"]:
+        print(f"  Error exporting session {error['session_id']}: {error['error']}")
+
+    exported = sum(1 for r in report["files"] if not r["skipped"])
+    skipped = len(report["files"]) - exported
+    print(
+        f"Wrote {len(report['files'])} files ({exported} exported, {skipped} unchanged) "
+        f"in {report['seconds']:.2f} s"
+    )
+    return not report["errors"]
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
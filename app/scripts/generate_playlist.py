@@ -24,7 +24,8 @@ project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from app.db.queries import get_all_sessions, get_session_by_id, get_all_songs
+from app.db.queries import get_all_sessions, get_session_by_id
+from app.music_resolver import resolve_session_songs
 from app.ui.components import get_song_file_path
 
 def get_latest_session():
@@ -61,14 +62,14 @@ def main():
     session_data, session_exercises = get_session_by_id(session_id)
 
     # Collect song file paths in order
+    songs_by_ref = resolve_session_songs(session_exercises)
     song_paths = []
     for exercise_tuple in session_exercises:
         if len(exercise_tuple) >= 2:
             music_ref = exercise_tuple[1]
             if music_ref:
                 # Find song details
-                all_songs = get_all_songs()
-                song_details = next((s for s in all_songs if s["music_ref"] == music_ref), None)
+                song_details = songs_by_ref.get(music_ref)
                 if song_details:
                     file_path = get_song_file_path(song_details)
                     if file_path and os.path.splitext(file_path)[1].lower() in [".mp3", ".m4a"]:
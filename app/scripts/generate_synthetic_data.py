@@ -0,0 +1,100 @@
+"""
+Generate a synthetic catalogue (and saved sessions) for scale testing.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/generate_synthetic_data.py --scale medium --db data/synthetic_medium.db
+    python app/scripts/generate_synthetic_data.py --scale small --output synthetic.xlsx
+    python app/scripts/generate_synthetic_data.py --exercises 5000 --tracks 60000 --sessions 0 --db big.db
+
+- The same --seed and sizes always give the same data.
+- --db writes the catalogue and the sessions straight into a SQLite
+  database; run the app on it with LSB_DB_PATH=<path>.
+- --library also writes a synthetic music library index (library files,
+  song file statuses and audio durations) into --db; no audio files are
+  created.
+- --output writes the catalogue in the LSB workbook layout (.xlsx, or a
+  directory of CSV files), loadable with app/data_loader.py. Sessions are
+  only written with --db.
+"""
+import sys
+import argparse
+import os
+import time
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.db import schema
+from app.synthetic_data import (
+    SCALES,
+    generate_catalogue,
+    generate_library_index,
+    generate_sessions,
+    write_catalogue_database,
+    write_catalogue_workbook,
+    write_library_database,
+    write_sessions_database,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic LSB data.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Named size")
+    parser.add_argument("--exercises", type=int, help="Number of exercises (overrides --scale)")
+    parser.add_argument("--tracks", type=int, help="Number of tracks (overrides --scale)")
+    parser.add_argument("--sessions", type=int, help="Number of saved sessions (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--db", help="SQLite database to create")
+    parser.add_argument("--replace", action="store_true", help="Replace the --db file if it exists")
+    parser.add_argument("--library", action="store_true", help="Also write a synthetic library index into --db")
+    parser.add_argument("--output", help="Workbook (.xlsx) or CSV directory for the catalogue")
+    args = parser.parse_args()
+
+    if not args.db and not args.output:
+        parser.error("give --db and/or --output")
+    if args.library and not args.db:
+        parser.error("--library needs --db")
+    if args.db and os.path.exists(args.db):
+        if not args.replace:
+            print(f"Error: {args.db} already exists (use --replace to overwrite it)")
+            return False
+        os.remove(args.db)
+
+    sizes = dict(SCALES[args.scale])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    start = time.perf_counter()
+    catalogue = generate_catalogue(sizes["exercises"], sizes["tracks"], seed=args.seed)
+    print(
+        f"Generated {len(catalogue['exercises'])} exercises, {len(catalogue['musics'])} tracks, "
+        f"{len(catalogue['mappings'])} recommendations (seed {args.seed}) "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
+
+    if args.output:
+        counts = write_catalogue_workbook(catalogue, args.output)
+        print(f"Wrote {args.output}: " + ", ".join(f"{name} {count}" for name, count in counts.items()))
+
+    if args.db:
+        schema.DB_PATH = Path(args.db)
+        write_catalogue_database(catalogue)
+        sessions = generate_sessions(catalogue, sizes["sessions"], seed=args.seed)
+        saved = write_sessions_database(
+            sessions, progress=lambda done, total: print(f"  saved {done} of {total} sessions", end="\r")
+        )
+        print()
+        if args.library:
+            counts = write_library_database(generate_library_index(catalogue, seed=args.seed))
+            print("Library index: " + ", ".join(f"{name} {count}" for name, count in counts.items()))
+        print(f"Wrote {args.db}: catalogue and {saved} sessions in {time.perf_counter() - start:.2f} s")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,88 @@
+"""
+Run the benchmark suite: every public query function, the catalogue loader
+and the exporters, over synthetic catalogues of several sizes.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/run_benchmarks.py
+    python app/scripts/run_benchmarks.py --scale small medium large --output bench.json
+    python app/scripts/run_benchmarks.py --only "queries.get_*" "exporters.*" --repeat 50
+
+- Each scale runs on a copy of a synthetic database (app/synthetic_data.py);
+  the database is built once per scale and seed and kept in
+  data/benchmarks/fixtures/ (the large one takes a few minutes to build).
+  The real catalogue and music library are never touched.
+- Results are written as JSON: per case and scale the number of timed
+  calls, p50/p95/mean/min/max in milliseconds and calls per second, with
+  the sizes, commit and environment they were measured on.
+- Public query functions without a benchmark case are listed, so new
+  queries do not go unmeasured.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.benchmarks import get_benchmarks, run_benchmarks, write_results
+from app.benchmarks.runner import DEFAULT_MAX_SECONDS, DEFAULT_REPEAT
+from app.synthetic_data import SCALES
+
+DEFAULT_OUTPUT = project_root / "data" / "benchmarks" / "latest.json"
+
+
+def print_results(results):
+    for scale, info in results["scales"].items():
+        sizes = ", ".join(f"{count} {name}" for name, count in info["sizes"].items())
+        print(f"\n{scale} ({sizes}; set up in {info['setup_seconds']} s)")
+        print(f"  {'case':<44} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>10}")
+        for result in results["results"]:
+            if result["scale"] == scale:
+                print(
+                    f"  {result['name']:<44} {result['runs']:>5} {result['p50_ms']:>10.3f} "
+                    f"{result['p95_ms']:>10.3f} {result['ops_per_sec']:>10.1f}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the LSB benchmark suite.")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=list(SCALES), help="Scales to run")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data")
+    parser.add_argument("--only", nargs="+", metavar="PATTERN", help="Glob patterns of the cases to run")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Maximum timed calls per case")
+    parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS,
+                        help="Time budget per case once a few calls are done")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="JSON results file")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for case in get_benchmarks(args.only):
+            scales = f" ({', '.join(case.scales)} only)" if case.scales else ""
+            print(f"{case.group:<10} {case.name}{scales}")
+        return True
+    if args.only and not get_benchmarks(args.only):
+        print(f"Error: no benchmark case matches {' '.join(args.only)}")
+        return False
+
+    results = run_benchmarks(
+        args.scale,
+        seed=args.seed,
+        patterns=args.only,
+        repeat=args.repeat,
+        max_seconds=args.max_seconds,
+        progress=lambda message: print(f"  {message:<70}", end="\r", flush=True),
+    )
+    print(" " * 74, end="\r")
+    print_results(results)
+    if results["uncovered"]:
+        print(f"\nQuery functions without a benchmark: {', '.join(results['uncovered'])}")
+    print(f"\nResults written to {write_results(results, args.output)}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
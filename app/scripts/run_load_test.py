@@ -0,0 +1,119 @@
+"""
+Load test the session store with several facilitators sharing one SQLite
+database: each worker process autosaves its own session, loads and exports
+saved sessions at the given rates.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/run_load_test.py
+    python app/scripts/run_load_test.py --workers 16 --duration 60 --save-rate 1 --load-rate 2
+    python app/scripts/run_load_test.py --db data/lsb_catalogue.db --busy-timeout-ms 200 --journal-mode wal
+
+- The test runs on a copy of the database: the synthetic fixture of
+  --scale (see run_benchmarks.py) or the file given with --db. The
+  original is never written.
+- Reports per action kind the throughput, p50/p95/p99 latency (retries
+  included), failed actions, "database is locked" errors and retries, and
+  writes them as JSON in the layout of run_benchmarks.py so
+  benchmark_baseline.py can save and compare them (with --results).
+- --busy-timeout-ms and --journal-mode try out SQLite settings the app does
+  not use yet, to size a multi-user deployment before changing it.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.benchmarks import write_results
+from app.benchmarks.load_test import (
+    DEFAULT_BACKOFF_MS,
+    DEFAULT_DURATION,
+    DEFAULT_RATES,
+    DEFAULT_RETRIES,
+    DEFAULT_WORKERS,
+    run_load_test,
+)
+from app.synthetic_data import SCALES
+
+DEFAULT_OUTPUT = project_root / "data" / "benchmarks" / "load_latest.json"
+
+
+def _progress(message):
+    print(f"  {message:<70}", end="\r", flush=True)
+
+
+def print_results(results):
+    config = results["config"]
+    rates = ", ".join(f"{kind} {rate:g}/s" for kind, rate in config["rates"].items())
+    print(
+        f"{config['workers']} facilitators for {config['duration']:g} s ({rates} each), "
+        f"{config['retries']} retries, busy timeout "
+        f"{'default' if config['busy_timeout_ms'] is None else config['busy_timeout_ms']} ms, "
+        f"journal {config['journal_mode'] or 'unchanged'}"
+    )
+    print(f"  {'action':<12} {'done':>6} {'ops/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'failed':>7} {'locked':>7} {'retries':>8}")
+    for result in results["results"]:
+        print(
+            f"  {result['name']:<12} {result['runs'] - result['failed']:>6} {result['ops_per_sec']:>8.2f} "
+            f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['max_ms']:>9.1f} "
+            f"{result['failed']:>7} {result['locked_errors']:>7} {result['retries']:>8}"
+        )
+    for error, count in results["errors"]:
+        print(f"  {count} x {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the session store with concurrent facilitators.")
+    parser.add_argument("--db", help="Database to copy (default: the synthetic fixture of --scale)")
+    parser.add_argument("--scale", choices=list(SCALES), default="small", help="Synthetic fixture to copy")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data and the facilitators")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Facilitator processes")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Seconds to run")
+    for kind, rate in DEFAULT_RATES.items():
+        parser.add_argument(f"--{kind}-rate", type=float, default=rate,
+                            help=f"{kind.capitalize()}s per second per facilitator")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Retries of a locked action")
+    parser.add_argument("--backoff-ms", type=float, default=DEFAULT_BACKOFF_MS, help="First retry delay")
+    parser.add_argument("--busy-timeout-ms", type=int, help="PRAGMA busy_timeout of every connection")
+    parser.add_argument("--journal-mode", choices=["delete", "truncate", "wal"], help="Journal mode of the copy")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="JSON results file")
+    args = parser.parse_args()
+
+    if args.db and not Path(args.db).exists():
+        print(f"Error: database not found: {args.db}")
+        return False
+    if args.workers < 1 or args.duration <= 0:
+        print("Error: --workers and --duration must be positive")
+        return False
+
+    try:
+        results = run_load_test(
+            Path(args.db) if args.db else None,
+            scale=args.scale,
+            seed=args.seed,
+            workers=args.workers,
+            duration=args.duration,
+            rates={kind: getattr(args, f"{kind}_rate") for kind in DEFAULT_RATES},
+            retries=args.retries,
+            backoff_ms=args.backoff_ms,
+            busy_timeout_ms=args.busy_timeout_ms,
+            journal_mode=args.journal_mode,
+            progress=_progress,
+        )
+    except RuntimeError as e:
+        print(" " * 74, end="\r")
+        print(f"Error: {e}")
+        return False
+    print(" " * 74, end="\r")
+    print_results(results)
+    print(f"\nResults written to {write_results(results, args.output)}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,102 @@
+"""
+Measure the rerun latency of the Streamlit app while a scripted user builds
+a session: adds 30 exercises, picks songs, reorders, types in the song
+filter, saves the session and loads another one.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/run_ui_benchmarks.py
+    python app/scripts/run_ui_benchmarks.py --scale small medium --no-memory
+    python app/scripts/benchmark_baseline.py save ui-main --results data/benchmarks/ui_latest.json
+
+- app/main.py runs headlessly through Streamlit's AppTest on a copy of the
+  synthetic database of each scale (see run_benchmarks.py); the real
+  catalogue and music library are never touched.
+- Every interaction records its wall time (one rerun, plus any st.rerun()
+  it triggers), the SQL statements run and connections opened, and the peak
+  memory allocated, measured in a second pass unless --no-memory is given.
+  Queries run once per item within one interaction are listed as N+1
+  suspects (see app/db/tracing.py).
+- Results are written as JSON, per interaction kind in the layout of
+  run_benchmarks.py so benchmark_baseline.py can save and compare them, and
+  per interaction under "reruns".
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.benchmarks import write_results
+from app.benchmarks.ui_reruns import run_ui_benchmarks
+from app.synthetic_data import SCALES
+
+DEFAULT_OUTPUT = project_root / "data" / "benchmarks" / "ui_latest.json"
+
+
+def _progress(message):
+    print(f"  {message:<70}", end="\r", flush=True)
+
+
+def print_results(results, verbose):
+    for scale, info in results["scales"].items():
+        sizes = ", ".join(f"{count} {name}" for name, count in info["sizes"].items())
+        print(f"\n{scale} ({sizes})")
+        if verbose:
+            print(f"  {'interaction':<44} {'wall ms':>10} {'SQL':>6} {'conns':>6} {'peak KiB':>10}")
+            for rerun in results["reruns"]:
+                if rerun["scale"] == scale:
+                    peak = f"{rerun['peak_kib']:.1f}" if "peak_kib" in rerun else "-"
+                    print(
+                        f"  {rerun['label'][:44]:<44} {rerun['wall_ms']:>10.1f} {rerun['sql_statements']:>6} "
+                        f"{rerun['connections']:>6} {peak:>10}"
+                    )
+            print()
+        print(f"  {'interaction kind':<24} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} {'SQL avg':>8} {'SQL max':>8} "
+              f"{'peak KiB':>10}")
+        for result in results["results"]:
+            if result["scale"] == scale:
+                peak = f"{result['peak_kib_max']:.1f}" if "peak_kib_max" in result else "-"
+                print(
+                    f"  {result['name']:<24} {result['runs']:>5} {result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} "
+                    f"{result['sql_statements_mean']:>8.1f} {result['sql_statements_max']:>8} {peak:>10}"
+                )
+        suspects = sorted({key for result in results["results"] if result["scale"] == scale
+                           for key in result["n_plus_one"]})
+        for key in suspects:
+            print(f"  N+1 suspect: {key[:110]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the rerun latency of the Streamlit app.")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=["small"], help="Scales to run")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory pass")
+    parser.add_argument("--verbose", action="store_true", help="Print every interaction")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="JSON results file")
+    args = parser.parse_args()
+
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        print("Error: this Streamlit version has no AppTest (streamlit.testing.v1); upgrade Streamlit")
+        return False
+
+    try:
+        results = run_ui_benchmarks(args.scale, seed=args.seed, measure_memory=not args.no_memory,
+                                    progress=_progress)
+    except RuntimeError as e:
+        print(" " * 74, end="\r")
+        print(f"Error: {e}")
+        return False
+    print(" " * 74, end="\r")
+    print_results(results, args.verbose)
+    print(f"\nResults written to {write_results(results, args.output)}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
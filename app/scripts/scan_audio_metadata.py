@@ -0,0 +1,79 @@
+"""
+Read duration and bitrate from the headers of the music library files and
+report the catalogue songs whose spreadsheet duration is wrong or missing.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/scan_audio_metadata.py [--force] [--tolerance 2] [--output report.csv]
+
+- Only files added or changed since the previous scan are read; use
+  --force to read every file again.
+- No audio is decoded: MP3 Xing/VBRI headers, MP4 mdhd atoms, WAV chunks
+  and FLAC STREAMINFO blocks are enough.
+"""
+import sys
+import argparse
+import csv
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.audio_metadata import get_duration_discrepancies, scan_audio_metadata
+
+
+def _format_seconds(seconds):
+    return f"{seconds // 60}:{seconds % 60:02}" if seconds is not None else "-"
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Read audio headers and compare catalogue durations.")
+    parser.add_argument("--full", action="store_true", help="List every library folder again")
+    parser.add_argument("--force", action="store_true", help="Read every file again")
+    parser.add_argument("--root", help="Library folder (default: MUSIC_LIBRARY_PATH)")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel file reads")
+    parser.add_argument("--tolerance", type=int, default=None,
+                        help="Seconds of difference to ignore (default: DURATION_TOLERANCE_SECONDS)")
+    parser.add_argument("--output", help="Write the discrepancies to this CSV file")
+    parser.add_argument("--limit", type=int, default=50, help="Discrepancies printed")
+    args = parser.parse_args()
+
+    report = scan_audio_metadata(root=args.root, full=args.full, force=args.force, workers=args.workers)
+    if report is None:
+        print("Error: MUSIC_LIBRARY_PATH is not set or does not exist.")
+        return False
+    print(
+        f"Read the headers of {report['read']} files in {report['seconds']:.2f} s "
+        f"({report['unreadable']} unreadable)"
+    )
+
+    discrepancies = get_duration_discrepancies(args.tolerance)
+    print(f"Catalogue durations to review: {len(discrepancies)}")
+    for d in discrepancies[:args.limit]:
+        difference = f"{d['difference']:+d} s" if d["difference"] is not None else "no catalogue duration"
+        print(
+            f"  [{d['music_ref']}] {d['title']} - {d['artist']}: catalogue "
+            f"{_format_seconds(d['catalogue_seconds'])}, file {_format_seconds(d['measured_seconds'])} "
+            f"({difference})"
+        )
+    if len(discrepancies) > args.limit:
+        print(f"  ... {len(discrepancies) - args.limit} more")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["MusicRef", "Title", "Artist", "File", "Catalogue Time",
+                             "File Seconds", "Difference (s)"])
+            for d in discrepancies:
+                writer.writerow([d["music_ref"], d["title"], d["artist"], d["path"],
+                                 d["catalogue_duration"], d["measured_seconds"], d["difference"]])
+        print(f"Report written to {args.output}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,53 @@
+"""
+Build or refresh the index of the audio files under MUSIC_LIBRARY_PATH.
+
+Usage:
+    source .venv/bin/activate
+    python app/scripts/scan_music_library.py [--full] [--root PATH] [--workers 8]
+
+- The first run walks the whole library; later runs only list again the
+  folders whose modification time changed.
+- Use --full after editing files in place (tags, re-encodes), which does
+  not change the folder modification time.
+"""
+import sys
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.db.queries import get_all_songs
+from app.library_index import get_library_index, refresh_library_index
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Index the music library.")
+    parser.add_argument("--full", action="store_true", help="List every folder again")
+    parser.add_argument("--root", help="Library folder (default: MUSIC_LIBRARY_PATH)")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel folder listings")
+    args = parser.parse_args()
+
+    report = refresh_library_index(root=args.root, full=args.full, workers=args.workers)
+    if report is None:
+        print("Error: MUSIC_LIBRARY_PATH is not set or does not exist.")
+        return False
+
+    index = get_library_index(report["root"])
+    songs = get_all_songs()
+    found = sum(1 for song in songs if index.resolve(song["filename"], song["artist"], song["title"]))
+    print(
+        f"{'Full scan' if report['full'] else 'Refresh'} of {report['root']}: "
+        f"{report['directories']} folders, {report['listed']} listed, "
+        f"{len(index)} audio files indexed in {report['seconds']:.2f} s"
+    )
+    print(f"Catalogue songs with a file: {found} of {len(songs)}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,127 @@
+"""
+Tests for the header-only audio readers (app/audio_metadata.py), on small
+synthetic files: VBR and CBR MP3s, and truncated or damaged headers.
+
+Run with: uv run python app/scripts/test_audio_metadata.py
+"""
+
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.audio_metadata import read_audio_info
+
+# MPEG-1 Layer III at 44.1 kHz: bitrate index by kbit/s
+_BITRATE_INDEX = {64: 5, 128: 9, 192: 11, 320: 14}
+_SAMPLES_PER_FRAME = 1152
+
+_tmp_dir = tempfile.mkdtemp()
+
+
+def _write(name: str, data: bytes) -> str:
+    path = os.path.join(_tmp_dir, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _mp3_frame(kbps: int, payload: bytes = b"") -> bytes:
+    """One MPEG-1 Layer III stereo frame at 44.1 kHz, padded with zeros."""
+    length = 144 * kbps * 1000 // 44100
+    header = bytes([0xFF, 0xFB, _BITRATE_INDEX[kbps] << 4, 0x00])
+    return (header + payload).ljust(length, b"\x00")
+
+
+def _xing_frame(frames: int, audio_bytes: int) -> bytes:
+    # The Xing tag follows the 32 bytes of stereo side information
+    return _mp3_frame(128, b"\x00" * 32 + b"Xing" + struct.pack(">III", 3, frames, audio_bytes))
+
+
+def _id3(size: int) -> bytes:
+    syncsafe = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x03\x00\x00" + syncsafe
+
+
+def test_vbr_mp3_with_xing_header():
+    """The Xing frame count gives the duration, however the bitrate varies."""
+    print("\n--- Testing VBR MP3 (Xing) ---")
+    frames = [_mp3_frame(kbps) for kbps in [64, 320, 128, 192] * 25]
+    audio = b"".join(frames)
+    path = _write("vbr.mp3", _id3(20) + b"\x00" * 20 + _xing_frame(len(frames), len(audio)) + audio)
+    info = read_audio_info(path)
+    expected = len(frames) * _SAMPLES_PER_FRAME / 44100
+    assert info["format"] == "mp3" and info["sample_rate"] == 44100 and info["channels"] == 2
+    assert abs(info["duration"] - expected) < 1e-6, info
+    assert abs(info["bitrate"] - len(audio) * 8 / expected) < 1, info
+    print(f"{len(frames)} frames: {info['duration']:.3f} s at {info['bitrate']} bit/s")
+
+
+def test_vbr_mp3_without_header():
+    """Without a Xing header, frames of different bitrates are counted one by one."""
+    print("\n--- Testing VBR MP3 (no header) ---")
+    frames = [_mp3_frame(kbps) for kbps in [128, 64, 320, 192] * 30]
+    info = read_audio_info(_write("vbr_noheader.mp3", b"".join(frames)))
+    expected = len(frames) * _SAMPLES_PER_FRAME / 44100
+    assert abs(info["duration"] - expected) < 1e-6, info
+    print(f"{len(frames)} frames counted: {info['duration']:.3f} s")
+
+
+def test_cbr_mp3():
+    """A constant bitrate file is timed from its size and bitrate, ignoring an ID3v1 tag."""
+    print("\n--- Testing CBR MP3 ---")
+    frames = [_mp3_frame(128) for _ in range(200)]
+    audio = b"".join(frames)
+    info = read_audio_info(_write("cbr.mp3", audio + b"TAG" + b"\x00" * 125))
+    assert info["bitrate"] == 128000
+    assert abs(info["duration"] - len(audio) * 8 / 128000) < 1e-6, info
+    print(f"{info['duration']:.3f} s at {info['bitrate']} bit/s")
+
+
+def test_truncated_headers():
+    """Damaged or truncated files give None instead of raising or a wrong duration."""
+    print("\n--- Testing Truncated Headers ---")
+    xing = _xing_frame(100, 41700)
+    cases = {
+        "empty.mp3": b"",
+        "not_audio.mp3": b"Not an MP3 file at all" * 10,
+        # ID3 tag claiming more bytes than the file has
+        "id3_only.mp3": _id3(10000) + b"\x00" * 50,
+        # File cut inside the Xing fields
+        "cut_xing.mp3": xing[:40],
+        "cut_flac.flac": b"fLaC\x00\x00\x00\x22" + b"\x00" * 6,
+        "cut_wav.wav": b"RIFF\x24\x00\x00\x00WAVEfmt \x10\x00\x00\x00\x01\x00",
+        # moov atom claiming more bytes than the file has, with no usable header inside
+        "cut_moov.m4a": struct.pack(">I4s", 24, b"ftyp") + b"M4A \x00\x00\x00\x00M4A "
+        + struct.pack(">I4s", 5000, b"moov") + struct.pack(">I4s", 100, b"mvhd"),
+    }
+    for name, data in cases.items():
+        info = read_audio_info(_write(name, data))
+        assert info is None, (name, info)
+    print(f"{len(cases)} damaged files rejected")
+
+
+def test_wav_with_oversized_data_chunk():
+    """A WAV whose data chunk size runs past the end is timed from the bytes present."""
+    print("\n--- Testing Truncated WAV ---")
+    byte_rate = 44100 * 2 * 2
+    fmt = struct.pack("<4sIHHIIHH", b"fmt ", 16, 1, 2, 44100, byte_rate, 4, 16)
+    data = struct.pack("<4sI", b"data", 10 * byte_rate) + b"\x00" * byte_rate
+    info = read_audio_info(_write("long_header.wav", b"RIFF\x00\x00\x00\x00WAVE" + fmt + data))
+    assert info["duration"] == 1.0 and info["channels"] == 2, info
+    print(f"{info['duration']} s of 10 s declared")
+
+
+if __name__ == "__main__":
+    test_vbr_mp3_with_xing_header()
+    test_vbr_mp3_without_header()
+    test_cbr_mp3()
+    test_truncated_headers()
+    test_wav_with_oversized_data_chunk()
+    print("\nAll audio metadata tests passed")
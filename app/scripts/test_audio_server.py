@@ -0,0 +1,102 @@
+"""
+Tests for the audio preview server (app/audio_server.py): Range parsing,
+signed URLs and range requests past the end of the file.
+
+Run with: uv run python app/scripts/test_audio_server.py
+"""
+
+import os
+import sys
+import tempfile
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.audio_server import audio_stream_url, parse_range, stop_audio_server
+
+_library = tempfile.mkdtemp()
+_song = os.path.join(_library, "Artist_Title.mp3")
+_content = bytes(range(256)) * 40
+with open(_song, "wb") as f:
+    f.write(_content)
+with open(os.path.join(_library, "notes.txt"), "w") as f:
+    f.write("not audio")
+
+
+def _get(url, range_header=None):
+    """(status, headers, body) of a GET request, including error statuses."""
+    request = urllib.request.Request(url, headers={"Range": range_header} if range_header else {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_parse_range():
+    print("\n--- Testing Range Parsing ---")
+    size = 1000
+    cases = {
+        None: None,
+        "bytes=0-99": (0, 99),
+        "bytes=900-": (900, 999),
+        "bytes=-100": (900, 999),
+        "bytes=-5000": (0, 999),
+        "bytes=990-5000": (990, 999),
+        # Past the end of the file: unsatisfiable (start > end)
+        "bytes=1000-": (1000, 999),
+        "bytes=5000-6000": (5000, 999),
+        "bytes=-0": (1000, 999),
+        # Malformed or multi-range: the whole file
+        "bytes=10-5": None,
+        "bytes=0-10,20-30": None,
+        "items=0-10": None,
+        "bytes=-": None,
+    }
+    for header, expected in cases.items():
+        assert parse_range(header, size) == expected, (header, parse_range(header, size))
+    print(f"{len(cases)} Range headers parsed")
+
+
+def test_range_requests():
+    print("\n--- Testing Range Requests ---")
+    os.environ["MUSIC_LIBRARY_PATH"] = _library
+    try:
+        url = audio_stream_url(_song)
+        assert url, "audio server did not start"
+        size = len(_content)
+
+        status, headers, body = _get(url)
+        assert status == 200 and body == _content
+
+        status, headers, body = _get(url, "bytes=100-199")
+        assert status == 206 and body == _content[100:200]
+        assert headers["Content-Range"] == f"bytes 100-199/{size}"
+
+        status, headers, body = _get(url, f"bytes={size - 10}-{size + 500}")
+        assert status == 206 and body == _content[-10:]
+
+        for past_eof in (f"bytes={size}-", f"bytes={size + 100}-{size + 200}"):
+            status, headers, body = _get(url, past_eof)
+            assert status == 416 and body == b"", (past_eof, status)
+            assert headers["Content-Range"] == f"bytes */{size}"
+
+        # Tampered signature, and files that are not library audio
+        status, _, _ = _get(url.replace("sig=", "sig=0"))
+        assert status == 404
+        assert audio_stream_url(os.path.join(_library, "notes.txt")) is None
+        assert audio_stream_url(os.path.join(_library, "..", "elsewhere.mp3")) is None
+        print("Full, partial, clamped and past-EOF ranges served as expected")
+    finally:
+        stop_audio_server()
+
+
+if __name__ == "__main__":
+    test_parse_range()
+    test_range_requests()
+    print("\nAll audio server tests passed")
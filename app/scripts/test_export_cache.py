@@ -0,0 +1,143 @@
+"""
+Tests for the export cache (app/export_cache.py): what invalidates a cached
+export, and least-recently-used eviction.
+
+Run with: uv run python app/scripts/test_export_cache.py
+"""
+
+import os
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.db import schema
+
+# Work on a throwaway database so the real catalogue is never touched
+_tmp_dir = tempfile.mkdtemp()
+schema.DB_PATH = Path(_tmp_dir) / "test_export_cache.db"
+schema.init_db()
+
+from app.db.queries import insert_musics
+from app.export_cache import cached_export, evict_exports, export_cache_key
+
+SESSION = {
+    "id": "session-1",
+    "name": "Test Session",
+    "description": "A test session",
+    "date": "2025-05-23",
+    "tags": "#test",
+    "version": 3,
+    "facilitator": "Ana",
+}
+EXERCISES = [("WALK", "LSB27-02", 17, "Warmup"), ("DANCE OF JOY", "LSB15-01", 5, "")]
+
+
+def _cache_dir(name):
+    return Path(_tmp_dir) / name
+
+
+def _export(metadata, exercises, cache_dir, options=None):
+    """Cached export whose build writes its inputs; returns (path, from cache)."""
+    def build(tmp_dir):
+        path = os.path.join(tmp_dir, "export.txt")
+        with open(path, "w") as f:
+            f.write(repr((sorted(metadata.items()), exercises, options)))
+        return path
+
+    return cached_export(metadata, exercises, "txt", build, options=options, cache_dir=cache_dir)
+
+
+def test_unchanged_export_is_cached():
+    print("\n--- Testing Cache Hit ---")
+    cache_dir = _cache_dir("hit")
+    first, hit = _export(SESSION, EXERCISES, cache_dir)
+    assert not hit
+    second, hit = _export(dict(SESSION), list(EXERCISES), cache_dir)
+    assert hit and second == first
+    print(f"Second export served from {second}")
+
+
+def test_changes_invalidate_export():
+    """Any metadata field, the exercises, the options and the catalogue are part of the key."""
+    print("\n--- Testing Cache Invalidation ---")
+    cache_dir = _cache_dir("invalidation")
+    _export(SESSION, EXERCISES, cache_dir)
+    changes = {
+        "description": dict(SESSION, description="Changed"),
+        "extra field": dict(SESSION, facilitator="Ben"),
+        "new field": dict(SESSION, location="Hall"),
+    }
+    for label, metadata in changes.items():
+        _, hit = _export(metadata, EXERCISES, cache_dir)
+        assert not hit, label
+    _, hit = _export(SESSION, EXERCISES + [("CLOSING", None, 9, "")], cache_dir)
+    assert not hit, "exercises"
+    _, hit = _export(SESSION, [EXERCISES[0], EXERCISES[1][:3] + ("New notes",)], cache_dir)
+    assert not hit, "notes"
+    _, hit = _export(SESSION, EXERCISES, cache_dir, options={"exported_on": "2025-05-24"})
+    assert not hit, "options"
+
+    key = export_cache_key(SESSION, EXERCISES, "txt")
+    insert_musics([{
+        "music_ref": "TEST-01", "collection_cd": None, "filename": "test.mp3", "title": "Test",
+        "artist": "Tester", "duration": "00:03:00", "v": None, "c": None, "a": None, "s": None,
+        "t": None, "bpm": None,
+    }])
+    assert export_cache_key(SESSION, EXERCISES, "txt") != key, "catalogue generation"
+    _, hit = _export(SESSION, EXERCISES, cache_dir)
+    assert not hit, "catalogue change"
+    print("Metadata, exercises, notes, options and catalogue changes all miss the cache")
+
+
+def test_word_export_stamp_is_keyed():
+    """A cached Word document carries the export date, and the date is part of its key."""
+    print("\n--- Testing Word Export Stamp ---")
+    from datetime import datetime
+    from functools import partial
+    from app.scripts import export_session_to_word
+
+    # Keep the Word artifacts out of the app's cache folder
+    export_session_to_word.cached_export = partial(cached_export, cache_dir=_cache_dir("word"))
+    try:
+        path, _ = export_session_to_word.word_artifact(SESSION, [])
+        path_again, hit = export_session_to_word.word_artifact(SESSION, [])
+    finally:
+        export_session_to_word.cached_export = cached_export
+    document = zipfile.ZipFile(path).read("word/document.xml").decode("utf-8")
+    today = datetime.now().strftime("%Y-%m-%d")
+    assert f"Exported on {today}<" in document
+    assert "facilitator: Ana" in document
+    assert hit and path_again == path
+    print(f"Document stamped {today} and reused on the same day")
+
+
+def test_eviction_drops_least_recently_used():
+    print("\n--- Testing Eviction ---")
+    cache_dir = _cache_dir("eviction")
+    os.makedirs(cache_dir)
+    for n, name in enumerate(["old", "used", "new"]):
+        path = cache_dir / f"{name}.txt"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + n, 1000 + n))
+    # Using an artifact makes it the most recent
+    os.utime(cache_dir / "used.txt")
+    freed = evict_exports(max_bytes=200, cache_dir=cache_dir)
+    assert freed == 100
+    assert sorted(os.listdir(cache_dir)) == ["new.txt", "used.txt"]
+    freed = evict_exports(max_bytes=0, cache_dir=cache_dir, keep=cache_dir / "used.txt")
+    assert freed == 100 and os.listdir(cache_dir) == ["used.txt"]
+    print("Least recently used artifacts evicted first")
+
+
+if __name__ == "__main__":
+    test_unchanged_export_is_cached()
+    test_changes_invalidate_export()
+    test_word_export_stamp_is_keyed()
+    test_eviction_drops_least_recently_used()
+    print("\nAll export cache tests passed")
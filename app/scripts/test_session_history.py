@@ -0,0 +1,149 @@
+"""
+Tests for the undo/redo history of session edits (app/session_history.py and
+the edit/undo/redo helpers in app/sessions.py).
+
+Run with: uv run python app/scripts/test_session_history.py
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Make sure the app directory is in the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+import streamlit as st
+
+from app.session_history import PersistentSequence, SessionHistory, apply_edit
+from app.sessions import edit_session_exercises, redo_session_edit, undo_session_edit
+
+
+def _exercise(n):
+    return (f"Exercise {n} [id {n}]", f"LSB{n:02}-01", n, "")
+
+
+def test_persistent_sequence_matches_list():
+    """Random edits on a PersistentSequence give the same result as on a list, and never change older versions."""
+    print("\n--- Testing PersistentSequence ---")
+    rng = random.Random(7)
+    expected = [_exercise(n) for n in range(50)]
+    sequence = PersistentSequence(expected)
+    versions = [(sequence, list(expected))]
+    for step in range(500):
+        kind = rng.choice(["set", "insert", "delete", "move"])
+        if kind == "set":
+            args = (rng.randrange(len(expected)), _exercise(1000 + step))
+        elif kind == "insert":
+            args = (rng.randint(0, len(expected)), [_exercise(2000 + step), _exercise(3000 + step)])
+        elif kind == "delete":
+            args = (rng.randrange(len(expected)),)
+        else:
+            args = (rng.randrange(len(expected)), rng.randrange(len(expected)))
+        sequence = apply_edit(sequence, kind, *args)
+        apply_edit(expected, kind, *args)
+        assert sequence.to_list() == expected, f"step {step}: {kind}{args}"
+        versions.append((sequence, list(expected)))
+
+    for old_sequence, old_list in versions:
+        assert old_sequence.to_list() == old_list
+    assert sequence[-1] == expected[-1]
+    print(f"{len(versions)} versions checked, final length {len(sequence)}")
+
+
+def test_undo_redo_round_trip():
+    """Undoing every edit gets back to the start, redoing them all gets back to the end."""
+    print("\n--- Testing Undo/Redo Round Trip ---")
+    start = [_exercise(n) for n in range(10)]
+    history = SessionHistory(start)
+    states = [start]
+    for edit, args in [
+        ("move", (0, 9)),
+        ("set", (3, _exercise(42))),
+        ("insert", (5, [_exercise(43), _exercise(44)])),
+        ("delete", (0,)),
+    ]:
+        history.apply(edit, *args)
+        states.append(history.current.to_list())
+
+    for state in reversed(states[:-1]):
+        assert history.undo().to_list() == state
+    assert history.undo() is None and not history.can_undo
+
+    for state in states[1:]:
+        assert history.redo().to_list() == state
+    assert history.redo() is None and not history.can_redo
+    print(f"{len(states) - 1} edits undone and redone")
+
+
+def test_new_edit_clears_redo():
+    """An edit after an undo drops the undone edits."""
+    print("\n--- Testing Redo After New Edit ---")
+    history = SessionHistory([_exercise(n) for n in range(3)])
+    history.apply("delete", 0)
+    history.undo()
+    assert history.can_redo
+    history.apply("set", 0, _exercise(9))
+    assert not history.can_redo
+    assert history.current.to_list() == [_exercise(9), _exercise(1), _exercise(2)]
+    print("Redo stack cleared")
+
+
+def test_history_limits():
+    """The history keeps at most max_depth edits and stays within its memory budget."""
+    print("\n--- Testing History Limits ---")
+    history = SessionHistory([_exercise(n) for n in range(100)], max_depth=5)
+    for n in range(20):
+        history.apply("set", n, _exercise(500 + n))
+    undone = 0
+    while history.undo() is not None:
+        undone += 1
+    assert undone == 5
+    # The oldest state kept is the one before the 16th edit
+    assert history.current[14] == _exercise(514) and history.current[15] == _exercise(15)
+
+    budget = SessionHistory.NODE_BYTES * 50
+    history = SessionHistory([_exercise(n) for n in range(1000)], memory_budget=budget)
+    for n in range(100):
+        history.apply("move", n, 999 - n)
+    assert history.memory_used <= budget
+    assert history.can_undo
+    print(f"Depth capped at 5; {history.memory_used} of {budget} bytes used")
+
+
+def test_session_undo_redo():
+    """edit_session_exercises, undo_session_edit and redo_session_edit keep st.session_state in step."""
+    print("\n--- Testing Session Undo/Redo ---")
+    start = [_exercise(n) for n in range(4)]
+    st.session_state.session_exercises = list(start)
+    st.session_state.session_metadata = {"name": "Test", "has_unsaved_changes": False}
+    st.session_state.pop("session_history", None)
+
+    edit_session_exercises("move", 0, 3)
+    edit_session_exercises("delete", 1)
+    after = list(st.session_state.session_exercises)
+    assert after == [_exercise(1), _exercise(3), _exercise(0)]
+    assert st.session_state.session_metadata["has_unsaved_changes"]
+
+    assert undo_session_edit() and undo_session_edit()
+    assert st.session_state.session_exercises == start
+    assert not undo_session_edit()
+    assert redo_session_edit() and redo_session_edit()
+    assert st.session_state.session_exercises == after
+    assert not redo_session_edit()
+
+    # Loading another session replaces the list: undo must not cross into it
+    st.session_state.session_exercises = [_exercise(7)]
+    assert not undo_session_edit()
+    assert st.session_state.session_exercises == [_exercise(7)]
+    print("Session list restored through undo and redo")
+
+
+if __name__ == "__main__":
+    test_persistent_sequence_matches_list()
+    test_undo_redo_round_trip()
+    test_new_edit_clears_redo()
+    test_history_limits()
+    test_session_undo_redo()
+    print("\nAll session history tests passed")
@@ -0,0 +1,304 @@
+"""
+Undo/redo history for session edits in the LSB Music App.
+
+Snapshots of the session exercise list are kept as persistent (immutable)
+sequences that share structure with each other: an edit copies only the path
+from the root to the changed position, so each snapshot costs O(log n) nodes
+instead of a full copy of the list.
+"""
+import sys
+from typing import Any, Iterable, Iterator, List, Optional
+
+
+class _Node:
+    """A node of a persistent AVL tree keyed implicitly by position."""
+
+    __slots__ = ("value", "left", "right", "size", "height")
+
+    def __init__(self, value, left, right):
+        self.value = value
+        self.left = left
+        self.right = right
+        self.size = _size(left) + _size(right) + 1
+        self.height = max(_height(left), _height(right)) + 1
+        PersistentSequence.nodes_created += 1
+
+
+def _size(node) -> int:
+    return node.size if node else 0
+
+
+def _height(node) -> int:
+    return node.height if node else 0
+
+
+def _balance(value, left, right) -> _Node:
+    """Build a node from its parts, rotating once or twice to restore AVL balance."""
+    if _height(left) > _height(right) + 1:
+        if _height(left.left) >= _height(left.right):
+            return _Node(left.value, left.left, _Node(value, left.right, right))
+        pivot = left.right
+        return _Node(
+            pivot.value,
+            _Node(left.value, left.left, pivot.left),
+            _Node(value, pivot.right, right),
+        )
+    if _height(right) > _height(left) + 1:
+        if _height(right.right) >= _height(right.left):
+            return _Node(right.value, _Node(value, left, right.left), right.right)
+        pivot = right.left
+        return _Node(
+            pivot.value,
+            _Node(value, left, pivot.left),
+            _Node(right.value, pivot.right, right.right),
+        )
+    return _Node(value, left, right)
+
+
+def _build(items: List[Any], lo: int, hi: int):
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    return _Node(items[mid], _build(items, lo, mid), _build(items, mid + 1, hi))
+
+
+def _get(node, index: int):
+    while True:
+        left_size = _size(node.left)
+        if index < left_size:
+            node = node.left
+        elif index == left_size:
+            return node.value
+        else:
+            index -= left_size + 1
+            node = node.right
+
+
+def _set(node, index: int, value) -> _Node:
+    left_size = _size(node.left)
+    if index < left_size:
+        return _Node(node.value, _set(node.left, index, value), node.right)
+    if index == left_size:
+        return _Node(value, node.left, node.right)
+    return _Node(node.value, node.left, _set(node.right, index - left_size - 1, value))
+
+
+def _insert(node, index: int, value) -> _Node:
+    if node is None:
+        return _Node(value, None, None)
+    left_size = _size(node.left)
+    if index <= left_size:
+        return _balance(node.value, _insert(node.left, index, value), node.right)
+    return _balance(node.value, node.left, _insert(node.right, index - left_size - 1, value))
+
+
+def _pop_first(node):
+    """Return (first value, tree without its first element)."""
+    if node.left is None:
+        return node.value, node.right
+    value, left = _pop_first(node.left)
+    return value, _balance(node.value, left, node.right)
+
+
+def _delete(node, index: int):
+    left_size = _size(node.left)
+    if index < left_size:
+        return _balance(node.value, _delete(node.left, index), node.right)
+    if index > left_size:
+        return _balance(node.value, node.left, _delete(node.right, index - left_size - 1))
+    if node.left is None:
+        return node.right
+    if node.right is None:
+        return node.left
+    successor, right = _pop_first(node.right)
+    return _balance(successor, node.left, right)
+
+
+def _iterate(node) -> Iterator[Any]:
+    stack = []
+    while stack or node:
+        while node:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node.value
+        node = node.right
+
+
+class PersistentSequence:
+    """
+    Immutable sequence backed by a persistent AVL tree.
+
+    Every edit returns a new sequence and leaves the original untouched; the
+    two share all nodes off the edited path.
+    """
+
+    # Running count of tree nodes allocated, used to cost snapshots
+    nodes_created = 0
+
+    __slots__ = ("_root",)
+
+    def __init__(self, items: Iterable[Any] = (), _root=None):
+        items = list(items)
+        self._root = _root if _root is not None or not items else _build(items, 0, len(items))
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def __iter__(self) -> Iterator[Any]:
+        return _iterate(self._root)
+
+    def __getitem__(self, index: int):
+        index = self._check_index(index)
+        return _get(self._root, index)
+
+    def _check_index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("sequence index out of range")
+        return index
+
+    def set(self, index: int, value) -> "PersistentSequence":
+        return PersistentSequence(_root=_set(self._root, self._check_index(index), value))
+
+    def insert(self, index: int, value) -> "PersistentSequence":
+        index = max(0, min(index, len(self)))
+        return PersistentSequence(_root=_insert(self._root, index, value))
+
+    def delete(self, index: int) -> "PersistentSequence":
+        return PersistentSequence(_root=_delete(self._root, self._check_index(index)))
+
+    def to_list(self) -> List[Any]:
+        return list(self)
+
+
+def apply_edit(entries, edit: str, *args):
+    """
+    Apply an edit to a sequence of session entries.
+
+    Works on both a plain list (mutated in place, returned) and a
+    PersistentSequence (left untouched, new sequence returned).
+
+    Edits:
+        ("set", index, value): replace the entry at index
+        ("insert", index, values): insert the list of values at index
+        ("delete", index): remove the entry at index
+        ("move", src, dst): remove the entry at src and reinsert it at dst
+    """
+    persistent = isinstance(entries, PersistentSequence)
+    if edit == "set":
+        index, value = args
+        if persistent:
+            return entries.set(index, value)
+        entries[index] = value
+    elif edit == "insert":
+        index, values = args
+        if persistent:
+            for offset, value in enumerate(values):
+                entries = entries.insert(index + offset, value)
+            return entries
+        entries[index:index] = list(values)
+    elif edit == "delete":
+        (index,) = args
+        if persistent:
+            return entries.delete(index)
+        entries.pop(index)
+    elif edit == "move":
+        src, dst = args
+        if persistent:
+            value = entries[src]
+            return entries.delete(src).insert(dst, value)
+        entries.insert(dst, entries.pop(src))
+    else:
+        raise ValueError(f"Unknown session edit: {edit}")
+    return entries
+
+
+class SessionHistory:
+    """
+    Bounded undo/redo stack of session exercise snapshots.
+
+    The history is capped both by depth and by an estimate of the memory held
+    by the tree nodes unique to the stored snapshots; the oldest snapshots are
+    dropped first.
+    """
+
+    # Approximate size of one tree node, for the memory budget
+    NODE_BYTES = sys.getsizeof(_Node(None, None, None))
+
+    def __init__(
+        self,
+        entries: Iterable[Any] = (),
+        max_depth: int = 100,
+        memory_budget: int = 4 * 1024 * 1024,
+    ):
+        self.max_depth = max_depth
+        self.memory_budget = memory_budget
+        self.reset(entries)
+
+    def reset(self, entries: Iterable[Any] = ()):
+        """Start a fresh history from the given entries."""
+        self.current = PersistentSequence(entries)
+        # Each stack item is (snapshot, nodes allocated to produce the next state)
+        self._undo: List[tuple] = []
+        self._redo: List[tuple] = []
+        self._bound_list_id: Optional[int] = None
+
+    def bind(self, entries: list):
+        """Remember which list object this history mirrors."""
+        self._bound_list_id = id(entries)
+
+    def tracks(self, entries: list) -> bool:
+        """Whether this history still mirrors the given list."""
+        return self._bound_list_id == id(entries) and len(self.current) == len(entries)
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    @property
+    def memory_used(self) -> int:
+        """Estimated bytes held by the undo and redo snapshots."""
+        nodes = sum(cost for _, cost in self._undo) + sum(cost for _, cost in self._redo)
+        return nodes * self.NODE_BYTES
+
+    def apply(self, edit: str, *args) -> PersistentSequence:
+        """Apply an edit (see apply_edit) and record the previous state for undo."""
+        before = PersistentSequence.nodes_created
+        updated = apply_edit(self.current, edit, *args)
+        cost = PersistentSequence.nodes_created - before
+
+        self._undo.append((self.current, cost))
+        self._redo.clear()
+        self.current = updated
+        self._enforce_limits()
+        return updated
+
+    def undo(self) -> Optional[PersistentSequence]:
+        """Step back one edit; returns the restored sequence or None."""
+        if not self._undo:
+            return None
+        previous, cost = self._undo.pop()
+        self._redo.append((self.current, cost))
+        self.current = previous
+        return previous
+
+    def redo(self) -> Optional[PersistentSequence]:
+        """Re-apply the last undone edit; returns the restored sequence or None."""
+        if not self._redo:
+            return None
+        following, cost = self._redo.pop()
+        self._undo.append((self.current, cost))
+        self.current = following
+        return following
+
+    def _enforce_limits(self):
+        while len(self._undo) > self.max_depth:
+            self._undo.pop(0)
+        while self._undo and self.memory_used > self.memory_budget:
+            self._undo.pop(0)
@@ -2,6 +2,7 @@
 Session management functionality for the LSB Music App.
 """
 
+import os
 import streamlit as st
 import uuid
 from datetime import datetime
@@ -9,10 +10,18 @@ import time
 from typing import Dict, List, Tuple, Optional
 import threading
 
+from app.session_history import SessionHistory, apply_edit
 from app.db.queries import (
     save_session,
     get_session_by_id,
-    get_all_sessions,
+    get_sessions_page,
+    count_sessions,
+    get_sessions_by_tags,
+    get_tag_counts,
+    get_template_sessions,
+    clone_session,
+    instantiate_template,
+    set_session_template,
     delete_session,
 )
 
@@ -21,6 +30,13 @@ from app.db.queries import (
 _autosave_timer = None
 _autosave_interval = 30  # seconds
 
+# Number of sessions shown per page in the saved-session browser
+SESSION_PAGE_SIZE = 50
+
+# Undo history bounds for session edits
+_history_max_depth = 100
+_history_memory_budget = 4 * 1024 * 1024  # bytes
+
 
 def initialize_session_metadata():
     """Initialize session metadata state if it doesn't exist."""
@@ -161,6 +177,59 @@ def mark_session_changed():
         st.session_state.session_metadata["has_unsaved_changes"] = True
 
 
+def get_session_history() -> SessionHistory:
+    """
+    Get the undo history for the current session exercise list.
+
+    The history is rebuilt whenever the list has been replaced (for example
+    when a session is loaded or cleared), so undo never crosses sessions.
+    """
+    exercises = st.session_state.session_exercises
+    history = st.session_state.get("session_history")
+    if history is None or not history.tracks(exercises):
+        history = SessionHistory(
+            exercises,
+            max_depth=_history_max_depth,
+            memory_budget=_history_memory_budget,
+        )
+        history.bind(exercises)
+        st.session_state.session_history = history
+    return history
+
+
+def edit_session_exercises(edit: str, *args):
+    """
+    Apply an edit to the session exercise list and record it for undo.
+
+    Args:
+        edit: One of "set", "insert", "delete" or "move" (see app.session_history.apply_edit)
+        *args: Arguments of the edit
+    """
+    history = get_session_history()
+    history.apply(edit, *args)
+    apply_edit(st.session_state.session_exercises, edit, *args)
+    mark_session_changed()
+
+
+def _restore_session_exercises(snapshot) -> bool:
+    if snapshot is None:
+        return False
+    # Replace the contents in place so the history keeps tracking the same list
+    st.session_state.session_exercises[:] = snapshot.to_list()
+    mark_session_changed()
+    return True
+
+
+def undo_session_edit() -> bool:
+    """Undo the last session edit. Returns True if anything changed."""
+    return _restore_session_exercises(get_session_history().undo())
+
+
+def redo_session_edit() -> bool:
+    """Redo the last undone session edit. Returns True if anything changed."""
+    return _restore_session_exercises(get_session_history().redo())
+
+
 def setup_autosave():
     """Setup autosave functionality."""
     global _autosave_timer
@@ -202,6 +271,47 @@ def render_session_metadata_ui():
     pass
 
 
+def render_template_instantiation_ui(templates: List[Dict]) -> bool:
+    """
+    Render the controls for creating a new session from a template.
+
+    Args:
+        templates: Template session metadata dicts
+
+    Returns:
+        Boolean indicating if a session was created and loaded
+    """
+    with st.expander("New Session from Template", expanded=False):
+        template_options = {t["name"]: t["id"] for t in templates}
+        template_name = st.selectbox(
+            "Template",
+            options=list(template_options.keys()),
+            key="template_select",
+        )
+        new_name = st.text_input("New session name", key="template_new_name")
+        new_date = st.date_input(
+            "New session date", value=datetime.now(), key="template_new_date"
+        )
+        if st.button("Create from Template", key="instantiate_template_button"):
+            if not new_name:
+                st.error("Session name is required")
+                return False
+            if st.session_state.session_metadata.get("has_unsaved_changes", False):
+                st.warning("Save or clear your current session first.")
+                return False
+            success, message, session_id = instantiate_template(
+                template_options[template_name],
+                sanitize_input(new_name),
+                new_date.strftime("%Y-%m-%d"),
+            )
+            if success and load_session(session_id):
+                st.success(f"Session '{new_name}' created from template")
+                return True
+            if not success:
+                st.error(message)
+    return False
+
+
 def render_session_list_ui():
     """
     Render the session list UI component for loading saved sessions.
@@ -211,18 +321,81 @@ def render_session_list_ui():
     """
     st.subheader("Saved Sessions")
 
-    # Get all sessions
-    sessions = get_all_sessions()
+    # Tag facets: filter the list through the session_tags index
+    tag_counts = {t["tag"]: t["session_count"] for t in get_tag_counts()}
+    selected_tags = []
+    match_all = False
+    if tag_counts:
+        selected_tags = st.multiselect(
+            "Filter by tags",
+            options=list(tag_counts.keys()),
+            format_func=lambda tag: f"#{tag} ({tag_counts[tag]})",
+            key="session_tag_filter",
+        )
+        if selected_tags:
+            match_all = st.checkbox(
+                "Match all selected tags", key="session_tag_match_all"
+            )
+
+    # Get the tagged sessions, or page over the hot and archived tiers
+    if selected_tags:
+        sessions = get_sessions_by_tags(selected_tags, match_all=match_all)
+    else:
+        include_archived = st.checkbox(
+            "Include archived sessions", value=True, key="session_include_archived"
+        )
+        total = count_sessions(include_archived=include_archived)
+        page_count = max(1, -(-total // SESSION_PAGE_SIZE))
+        page = 1
+        if page_count > 1:
+            page = st.number_input(
+                f"Page (of {page_count})",
+                min_value=1,
+                max_value=page_count,
+                value=1,
+                step=1,
+                key="session_page",
+            )
+        sessions = get_sessions_page(
+            limit=SESSION_PAGE_SIZE,
+            offset=(page - 1) * SESSION_PAGE_SIZE,
+            include_archived=include_archived,
+        )
+
+    # Start a new session from a template
+    templates = get_template_sessions()
+    if templates and render_template_instantiation_ui(templates):
+        return True
 
     if not sessions:
         st.info("No saved sessions found")
         return False
 
-    # Create a selectbox with session names
+    # Export the listed sessions into one ZIP in the background
+    if st.button(f"Export Listed Sessions (.zip, {len(sessions)})", key="bulk_export_button"):
+        # Imported here: app.ui imports this module
+        from app.ui.job_status import start_job
+
+        export_dir = os.getenv("EXPORT_PATH", os.getcwd())
+        # Re-run so the job panel in main.py picks up the new job
+        return start_job(
+            "bulk_export",
+            f"Export of {len(sessions)} sessions",
+            session_ids=[s["id"] for s in sessions],
+            zip_path=os.path.join(
+                export_dir, f"sessions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+            ),
+        )
+
+    # Create a selectbox with session names (templates are marked with 📋,
+    # archived sessions with 🗄️)
     session_options = {
-        f"{s['name']} ({s['date']})" if s["date"] else s["name"]: s["id"]
+        ("🗄️ " if s.get("archived") else "📋 " if s.get("is_template") else "")
+        + (f"{s['name']} ({s['date']})" if s["date"] else s["name"]): s["id"]
         for s in sessions
     }
+    templates_by_id = {t["id"] for t in templates}
+    archived_ids = {s["id"] for s in sessions if s.get("archived")}
     selected_session_name = st.selectbox(
         "Select a session to load",
         options=list(session_options.keys()),
@@ -280,6 +453,32 @@ def render_session_list_ui():
                         )
                         return True
 
+        # Duplicate and template actions run server-side, without loading
+        if not st.session_state.get("confirming_load", False) and (
+            selected_session_id not in archived_ids
+        ):
+            dup_col, template_col = st.columns([1, 1])
+            with dup_col:
+                if st.button("Duplicate Session", key="duplicate_session_button"):
+                    # The option label carries the date and markers: use the stored name
+                    source_name = next(s["name"] for s in sessions if s["id"] == selected_session_id)
+                    success, message, _ = clone_session(
+                        selected_session_id,
+                        f"{source_name} (copy)",
+                        datetime.now().strftime("%Y-%m-%d"),
+                    )
+                    if success:
+                        st.success(f"Session '{source_name}' duplicated")
+                        return True
+                    st.error(message)
+            with template_col:
+                is_template = selected_session_id in templates_by_id
+                label = "Unmark Template" if is_template else "Mark as Template"
+                if st.button(label, key="toggle_template_button"):
+                    if set_session_template(selected_session_id, not is_template):
+                        return True
+                    st.error("Failed to update template flag")
+
         with col2:
             # Only show delete button if not in confirmation mode for loading
             if not st.session_state.get("confirming_load", False):
@@ -0,0 +1,417 @@
+"""
+Deterministic synthetic catalogues and sessions for scale testing.
+
+The real LSB workbook is small; benchmarks and load tests need catalogues
+the size of several merged partner collections. The generator reproduces the
+shape of the real data at any scale:
+
+- exercises spread over phases with the real phase mix (including the
+  multi-phase values like 34 and 23) and over categories, a few with
+  letter-suffixed IDs like "14a"
+- tracks grouped into collection CDs, with Biodanza line letters (V, C, A,
+  S, T), BPM and "HH:MM:SS" times, a few missing
+- a heavy-tailed number of recommended tracks per exercise (median about
+  8, some over 100) with a skewed track popularity, so some tracks are
+  recommended for many exercises and about half for none; about 56 % are
+  'y' recommendations and the rest 'r'
+- saved sessions of 8-20 exercises in phase order, most with a recommended
+  song, some with notes and tags
+- optionally, the music library index of the catalogue (library files,
+  song file statuses and audio metadata), as stored by a library scan
+
+Everything is derived from a seeded random.Random, so the same seed and
+sizes always give the same data.
+"""
+import math
+import os
+import random
+import uuid
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.data_export import CATALOGUE_SHEETS, open_sheet_writer
+from app.db.queries import (
+    apply_library_scan,
+    get_catalogue_generation,
+    insert_exercise_categories,
+    insert_exercise_music_mappings,
+    insert_exercises,
+    insert_musics,
+    save_session,
+    store_audio_metadata,
+    store_song_file_statuses,
+)
+from app.db.schema import init_db
+from app.library_index import normalise_name
+from app.library_integrity import PLAYABLE_EXTENSIONS, STATUS_MISSING, STATUS_OK, STATUS_WRONG_EXTENSION
+from app.playlists import duration_to_seconds
+
+# Named sizes: exercises, tracks and saved sessions
+SCALES = {
+    "small": {"exercises": 330, "tracks": 2400, "sessions": 200},
+    "medium": {"exercises": 3000, "tracks": 25000, "sessions": 5000},
+    "large": {"exercises": 10000, "tracks": 100000, "sessions": 50000},
+}
+
+# Mean number of recommended tracks per exercise in the real catalogue
+MEAN_FANOUT = 13.6
+
+# Share of tracks recommended for at least one exercise in the real catalogue
+MAPPED_SHARE = 0.55
+
+# Phase values and their frequency in the real catalogue
+_PHASES = [(4.0, 97), (34.0, 33), (2.0, 32), (23.0, 20), (1.0, 13), (3.0, 13), (5.0, 4),
+           (14.0, 3), (45.0, 2), (12.0, 1), (13.0, 1), (15.0, 1), (145.0, 1), (234.0, 1)]
+
+_CATEGORIES = ["CIRCLES", "WALKS", "RHYTHM", "MELODY", "FLUIDITY", "CONTACT", "SYNERGY",
+               "EXPRESSION", "VITALITY", "AFFECTIVITY", "CREATIVITY", "TRANSCENDENCE",
+               "SEXUALITY", "INTEGRATION", "FEEDBACK", "ACTIVATION", "RELAXATION", "CARESSES"]
+
+_WORDS = ["circle", "walk", "dance", "sinuous", "light", "embrace", "rhythm", "wave", "flight",
+          "seed", "river", "fire", "water", "earth", "wind", "heart", "hands", "eyes", "joy",
+          "game", "mirror", "harmony", "encounter", "tenderness", "freedom", "spiral", "balance",
+          "cradle", "dream", "sun", "moon", "ocean", "forest", "song", "breath", "silence"]
+
+_FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elena", "Felipe", "Gloria", "Hugo", "Ines",
+                "Jorge", "Karin", "Luis", "Marta", "Nuno", "Olga", "Pablo", "Rosa", "Sergio"]
+_LAST_NAMES = ["Silva", "Costa", "Moreno", "Ortega", "Ferreira", "Lopez", "Santos", "Vidal",
+               "Rocha", "Mendes", "Navarro", "Pereira", "Ramos", "Torres", "Vega", "Zapata"]
+
+_COLLECTION_PREFIXES = ["DBO", "SYN", "PRT", "CIM", "IBF", "ALT", "LAT", "WLD"]
+
+_COMMENTS = ["Good for complete beginners", "Fast - use later in the session",
+             "Stand still for the short opening", "Slow build, wait for the second theme",
+             "Good for the enunciation", "Only with an experienced group"]
+
+_NOTES = ["Explain the consigna slowly", "Pairs change at the chorus", "Lower the lights",
+          "Invite eye contact", "Keep the circle closed", "Offer the option to sit out",
+          "Longer version if the group is large", "Follow with silence"]
+
+_TAGS = ["beginners", "advanced", "workshop", "regular", "retreat", "online", "affectivity",
+         "vitality", "creativity", "sexuality", "transcendence", "summer", "winter"]
+
+# Sessions are dated within the three years before this day
+_SESSION_EPOCH = date(2024, 1, 1)
+
+
+def _title(rng: random.Random, low: int = 1, high: int = 4) -> str:
+    return " ".join(rng.sample(_WORDS, rng.randint(low, high))).title()
+
+
+def _skewed_picker(rng: random.Random, items: List, exponent: float = 0.8) -> Callable[[], object]:
+    """Pick items with Zipf-like weights: a few are picked very often, most rarely."""
+    order = items[:]
+    rng.shuffle(order)
+    cumulative, total = [], 0.0
+    for rank in range(len(order)):
+        total += 1.0 / (rank + 1) ** exponent
+        cumulative.append(total)
+    return lambda: rng.choices(order, cum_weights=cumulative)[0]
+
+
+def generate_catalogue(
+    exercises: int = 330,
+    tracks: int = 2400,
+    seed: int = 0,
+    mean_fanout: float = MEAN_FANOUT,
+) -> Dict[str, List]:
+    """
+    Generate a catalogue.
+
+    Args:
+        exercises: Number of exercises
+        tracks: Number of tracks
+        seed: Random seed; the same seed and sizes give the same catalogue
+        mean_fanout: Mean number of recommended tracks per exercise
+
+    Returns:
+        Dict with "categories" (names), "exercises", "musics" and "mappings"
+        (lists of dicts with the keys of the insert_* query functions)
+    """
+    rng = random.Random(seed)
+
+    category_count = max(1, min(exercises // 11, 300))
+    categories = [
+        _CATEGORIES[i % len(_CATEGORIES)] + (f" {i // len(_CATEGORIES) + 1}" if i >= len(_CATEGORIES) else "")
+        for i in range(category_count)
+    ]
+
+    phases, phase_weights = zip(*_PHASES)
+    reviewers = [rng.choice(_FIRST_NAMES) for _ in range(8)]
+    exercise_rows, number = [], 0
+    while len(exercise_rows) < exercises:
+        number += 1
+        ids = [str(number)]
+        if rng.random() < 0.05 and len(exercise_rows) + 1 < exercises:
+            ids.append(f"{number}a")
+        for exercise_id in ids:
+            name = _title(rng, 2, 4).upper()
+            exercise_rows.append(
+                {
+                    "id": exercise_id,
+                    "phase": rng.choices(phases, weights=phase_weights)[0],
+                    "category": rng.choice(categories),
+                    "name": name,
+                    "short_name": name.capitalize() if rng.random() < 0.8 else None,
+                    "aka": "aka " + " / ".join(_title(rng) for _ in range(rng.randint(1, 3)))
+                    if rng.random() < 0.4 else None,
+                    "phase_reviewer": rng.choice(reviewers) if rng.random() < 0.7 else None,
+                    "cimeb": 1 if rng.random() < 0.9 else 0,
+                }
+            )
+
+    artists = [f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}" for _ in range(max(1, tracks // 8))]
+    pick_artist = _skewed_picker(rng, artists, exponent=0.6)
+    musics, collection = [], 0
+    while len(musics) < tracks:
+        collection += 1
+        prefix = _COLLECTION_PREFIXES[collection % len(_COLLECTION_PREFIXES)]
+        collection_code = f"{prefix}{collection:03d}"
+        for track in range(1, min(rng.randint(10, 20), tracks - len(musics)) + 1):
+            music_ref = f"{collection_code}-{track:02d}"
+            title, artist = _title(rng), pick_artist()
+            ext = rng.choices([".mp3", ".m4a", ".wav"], weights=[96, 3, 1])[0]
+            seconds = rng.randint(90, 480)
+            lines = {letter: (letter if rng.random() < 0.5 else letter.upper()) if rng.random() < 0.2 else None
+                     for letter in "vcast"}
+            musics.append(
+                {
+                    "music_ref": music_ref,
+                    "collection_cd": f"{prefix} CD {collection:03d}",
+                    "filename": f"{music_ref}_{title}_-_{artist}{ext}".replace(" ", "_"),
+                    "title": title,
+                    "artist": artist,
+                    "duration": f"00:{seconds // 60:02d}:{seconds % 60:02d}" if rng.random() < 0.97 else None,
+                    **lines,
+                    "bpm": rng.randint(50, 140) if rng.random() < 0.95 else None,
+                }
+            )
+
+    mapped_pool = [m["music_ref"] for m in musics if rng.random() < MAPPED_SHARE] or [musics[0]["music_ref"]]
+    pick_track = _skewed_picker(rng, mapped_pool, exponent=0.3)
+    # Log-normal fan-out with the requested mean and the real catalogue's spread
+    sigma = 0.9
+    mu = math.log(mean_fanout) - sigma * sigma / 2
+    mappings = []
+    for exercise in exercise_rows:
+        fanout = min(len(mapped_pool), max(1, round(rng.lognormvariate(mu, sigma))))
+        chosen, attempts = [], 0
+        seen = set()
+        while len(chosen) < fanout and attempts < fanout * 4:
+            attempts += 1
+            music_ref = pick_track()
+            if music_ref not in seen:
+                seen.add(music_ref)
+                chosen.append(music_ref)
+        for music_ref in chosen:
+            mappings.append(
+                {
+                    "exercise_id": exercise["id"],
+                    "music_ref": music_ref,
+                    "recommendation": "y" if rng.random() < 0.56 else "r",
+                    "specific_comment": rng.choice(_COMMENTS) if rng.random() < 0.1 else None,
+                }
+            )
+
+    return {"categories": categories, "exercises": exercise_rows, "musics": musics, "mappings": mappings}
+
+
+def _first_phase(phase: Optional[float]) -> int:
+    return int(str(int(phase))[0]) if phase else 9
+
+
+def generate_sessions(catalogue: Dict[str, List], count: int, seed: int = 0) -> List[Tuple[Dict, List[tuple]]]:
+    """
+    Generate saved sessions over a catalogue.
+
+    Returns:
+        List of (session_data, session_exercises) pairs in the form taken by
+        save_session; session IDs are derived from the seed too
+    """
+    rng = random.Random(f"sessions-{seed}")
+    exercises = catalogue["exercises"]
+    songs_by_exercise: Dict[str, List[Tuple[str, str]]] = {}
+    for mapping in catalogue["mappings"]:
+        songs_by_exercise.setdefault(mapping["exercise_id"], []).append(
+            (mapping["music_ref"], mapping["recommendation"])
+        )
+
+    sessions = []
+    for number in range(1, count + 1):
+        chosen = rng.sample(exercises, min(len(exercises), rng.randint(8, 20)))
+        chosen.sort(key=lambda ex: _first_phase(ex["phase"]))
+        session_exercises = []
+        for exercise in chosen:
+            songs = songs_by_exercise.get(exercise["id"], [])
+            music_ref = None
+            if songs and rng.random() < 0.85:
+                preferred = [ref for ref, recommendation in songs if recommendation == "y"]
+                music_ref = rng.choice(preferred or [ref for ref, _ in songs])
+            notes = rng.choice(_NOTES) if rng.random() < 0.25 else ""
+            session_exercises.append((f"{exercise['name']} [id {exercise['id']}]", music_ref, exercise["id"], notes))
+
+        session_date = _SESSION_EPOCH - timedelta(days=rng.randint(0, 3 * 365))
+        tags = " ".join(f"#{tag}" for tag in rng.sample(_TAGS, rng.randint(0, 3)))
+        session_data = {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "name": f"Session {number}: {_title(rng, 1, 3)}",
+            "description": _title(rng, 3, 6) if rng.random() < 0.5 else "",
+            "date": session_date.isoformat(),
+            "tags": tags,
+            "updated_at": f"{session_date.isoformat()}T19:00:00",
+        }
+        sessions.append((session_data, session_exercises))
+    return sessions
+
+
+def generate_library_index(catalogue: Dict[str, List], seed: int = 0, root: str = "/synthetic-library") -> Dict:
+    """
+    Generate the music library index of a catalogue, as a library scan and
+    the catalogue file check would store it, without any files on disk.
+
+    About 92 % of the tracks have a file, one directory per collection CD;
+    most files have their header metadata read, with the catalogue time
+    give or take a second and a few clearly different.
+
+    Returns:
+        Dict with "root", "seen_dirs" and "rescanned" (the arguments of
+        apply_library_scan), "statuses" (for store_song_file_statuses) and
+        "audio_metadata" (rows for store_audio_metadata)
+    """
+    rng = random.Random(f"library-{seed}")
+    seen_dirs = {"": (None, 1_700_000_000_000_000_000)}
+    rescanned: Dict[str, List[Dict]] = {"": []}
+    statuses, metadata = [], []
+    for music in catalogue["musics"]:
+        if rng.random() >= 0.92:
+            statuses.append((music["music_ref"], STATUS_MISSING, None))
+            continue
+        directory = music["music_ref"].split("-")[0]
+        if directory not in seen_dirs:
+            seen_dirs[directory] = ("", 1_700_000_000_000_000_000 + len(seen_dirs))
+            rescanned[directory] = []
+        stem, ext = os.path.splitext(music["filename"])
+        stem_key, ext = normalise_name(stem), ext.lower()
+        path = f"{directory}/{music['filename']}"
+        size = rng.randint(2_000_000, 12_000_000)
+        mtime_ns = 1_690_000_000_000_000_000 + rng.randint(0, 10**16)
+        rescanned[directory].append(
+            {
+                "path": path,
+                "directory": directory,
+                "name_key": f"{stem_key}{ext}",
+                "stem_key": stem_key,
+                "ext": ext,
+                "size": size,
+                "mtime_ns": mtime_ns,
+            }
+        )
+        status = STATUS_OK if ext in PLAYABLE_EXTENSIONS else STATUS_WRONG_EXTENSION
+        statuses.append((music["music_ref"], status, path))
+        if rng.random() < 0.9:
+            seconds = duration_to_seconds(music["duration"]) or rng.randint(90, 480)
+            if rng.random() < 0.03:
+                seconds += rng.choice([-1, 1]) * rng.randint(10, 120)
+            metadata.append(
+                (path, size, mtime_ns, "mp4" if ext == ".m4a" else ext.lstrip("."),
+                 max(1.0, seconds + rng.uniform(-1, 1)), 320000, 44100, 2, None)
+            )
+    return {
+        "root": root,
+        "seen_dirs": seen_dirs,
+        "rescanned": rescanned,
+        "statuses": statuses,
+        "audio_metadata": metadata,
+    }
+
+
+def write_catalogue_workbook(catalogue: Dict[str, List], output: str, fmt: Optional[str] = None) -> Dict[str, int]:
+    """
+    Write a catalogue in the LSB workbook layout (an .xlsx file or a
+    directory of CSV files), loadable with data_loader.load_lsb_catalogue.
+
+    Returns:
+        Dict of sheet name to number of rows written
+    """
+    rows = {
+        "Musics": (
+            (m["music_ref"], m["collection_cd"], m["filename"], m["title"], m["artist"], m["duration"],
+             m["v"], m["c"], m["a"], m["s"], m["t"], m["bpm"])
+            for m in catalogue["musics"]
+        ),
+        "Exercises-to-Musics": (
+            (m["exercise_id"], m["music_ref"], m["recommendation"], m["specific_comment"])
+            for m in catalogue["mappings"]
+        ),
+        "Exercises": (
+            (e["id"], e["phase"], e["category"], e["name"], e["short_name"], e["aka"],
+             e["phase_reviewer"], e["cimeb"])
+            for e in catalogue["exercises"]
+        ),
+        "Exercise-Category": ((name,) for name in catalogue["categories"]),
+    }
+    writer = open_sheet_writer(output, fmt)
+    counts = {name: writer.write_sheet(name, headers, rows[name]) for name, _, headers in CATALOGUE_SHEETS}
+    writer.close()
+    return counts
+
+
+def write_catalogue_database(catalogue: Dict[str, List]) -> Dict[str, int]:
+    """
+    Insert a catalogue into the database at schema.DB_PATH.
+
+    Returns:
+        Dict of table name to number of rows inserted
+    """
+    init_db()
+    insert_exercise_categories(catalogue["categories"])
+    insert_exercises(catalogue["exercises"])
+    insert_musics(catalogue["musics"])
+    insert_exercise_music_mappings(catalogue["mappings"])
+    return {
+        "exercise_categories": len(catalogue["categories"]),
+        "exercises": len(catalogue["exercises"]),
+        "musics": len(catalogue["musics"]),
+        "exercise_music_mapping": len(catalogue["mappings"]),
+    }
+
+
+def write_sessions_database(
+    sessions: List[Tuple[Dict, List[tuple]]],
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """
+    Save sessions into the database at schema.DB_PATH with save_session.
+
+    Returns:
+        The number of sessions saved
+    """
+    saved = 0
+    for done, (session_data, session_exercises) in enumerate(sessions, 1):
+        success, message, _ = save_session(session_data, session_exercises)
+        if success:
+            saved += 1
+        else:
+            print(f"Error saving {session_data['name']}: {message}")
+        if progress and done % 100 == 0:
+            progress(done, len(sessions))
+    return saved
+
+
+def write_library_database(library: Dict) -> Dict[str, int]:
+    """
+    Store a generated library index (see generate_library_index) in the
+    database at schema.DB_PATH, replacing any previous index.
+
+    Returns:
+        Dict of table name to number of rows written
+    """
+    init_db()
+    generation = apply_library_scan(library["root"], library["seen_dirs"], library["rescanned"], full=True)
+    store_song_file_statuses(library["root"], generation, get_catalogue_generation(), library["statuses"])
+    store_audio_metadata(library["audio_metadata"])
+    return {
+        "library_files": sum(len(files) for files in library["rescanned"].values()),
+        "song_file_status": len(library["statuses"]),
+        "audio_metadata": len(library["audio_metadata"]),
+    }
@@ -3,7 +3,7 @@ Add Exercise UI component for LSB Music App.
 """
 import streamlit as st
 from app.db.queries import add_new_exercise, get_next_exercise_id, get_all_exercise_categories
-from app.sessions import mark_session_changed
+from app.sessions import edit_session_exercises
 
 
 def render_add_exercise_form():
@@ -133,8 +133,9 @@ def render_add_exercise_form():
                 exercise_info['id'],
                 "",  # No notes initially
             )
-            st.session_state.session_exercises.append(exercise_tuple)
-            mark_session_changed()
+            edit_session_exercises(
+                "insert", len(st.session_state.session_exercises), [exercise_tuple]
+            )
             st.success(f"Added to current session!")
             # Clear the last added exercise to hide the button
             del st.session_state.last_added_exercise
@@ -3,9 +3,16 @@ Shared UI components and helpers for LSB Music App.
 """
 import os
 
+from app.library_index import resolve_song_file
+
+
 def get_song_file_path(song_details):
     if not song_details:
         return None
+    # Indexed library: in-memory lookup, including the fallback name patterns
+    indexed_path = resolve_song_file(song_details)
+    if indexed_path:
+        return indexed_path
     music_library_path = os.getenv("MUSIC_LIBRARY_PATH")
     artist = song_details["artist"] if song_details["artist"] else "Unknown_Artist"
     artist = artist.replace(" ", "_")
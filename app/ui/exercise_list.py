@@ -3,35 +3,45 @@ Session Exercise List UI component for LSB Music App.
 """
 import streamlit as st
 import os
-from app.db.queries import get_songs_for_exercise, get_all_songs, get_exercise_phase_by_id
-from app.sessions import mark_session_changed
+from app.db.queries import get_songs_for_exercises, get_songs_by_refs, get_all_songs, get_exercise_phases_by_ids
+from app.sessions import (
+    edit_session_exercises,
+    get_session_history,
+    undo_session_edit,
+    redo_session_edit,
+)
 from .components import get_song_file_path
+from app.library_index import library_file_exists
+from app.audio_prefetch import prefetch_song_previews
+from app.audio_server import audio_stream_url
 
 def move_exercise_up(index: int):
     if index > 0:
-        (
-            st.session_state.session_exercises[index],
-            st.session_state.session_exercises[index - 1],
-        ) = (
-            st.session_state.session_exercises[index - 1],
-            st.session_state.session_exercises[index],
-        )
-        mark_session_changed()
+        edit_session_exercises("move", index, index - 1)
 
 def move_exercise_down(index: int):
     if index < len(st.session_state.session_exercises) - 1:
-        (
-            st.session_state.session_exercises[index],
-            st.session_state.session_exercises[index + 1],
-        ) = (
-            st.session_state.session_exercises[index + 1],
-            st.session_state.session_exercises[index],
-        )
-        mark_session_changed()
+        edit_session_exercises("move", index, index + 1)
+
+def move_exercise_to(index: int, insert_at: int):
+    if insert_at != index:
+        edit_session_exercises("move", index, insert_at)
 
 def remove_exercise(index: int):
-    st.session_state.session_exercises.pop(index)
-    mark_session_changed()
+    edit_session_exercises("delete", index)
+
+def set_exercise_song(index: int, music_ref):
+    exercise_tuple = st.session_state.session_exercises[index]
+    notes = exercise_tuple[3] if len(exercise_tuple) >= 4 else ""
+    edit_session_exercises(
+        "set", index, (exercise_tuple[0], music_ref, exercise_tuple[2], notes)
+    )
+
+def set_exercise_notes(index: int, notes: str):
+    exercise_tuple = st.session_state.session_exercises[index]
+    edit_session_exercises(
+        "set", index, (exercise_tuple[0], exercise_tuple[1], exercise_tuple[2], notes)
+    )
 
 def get_vivencia_lines(song_dict):
     """
@@ -50,11 +60,44 @@ def render_session_list():
         st.subheader(f"Current Session: {session_name}")
     else:
         st.subheader("Current Session:")
+    history = get_session_history()
+    undo_col, redo_col, _ = st.columns([1, 1, 4])
+    with undo_col:
+        if st.button("↶ Undo", key="undo_session_edit", disabled=not history.can_undo):
+            if undo_session_edit():
+                st.rerun()
+    with redo_col:
+        if st.button("↷ Redo", key="redo_session_edit", disabled=not history.can_redo):
+            if redo_session_edit():
+                st.rerun()
     if not st.session_state.session_exercises:
         st.info(
             "No exercises added to session yet. Use the selector above to add exercises."
         )
         return
+    # The songs and phases of every exercise, read in one statement each
+    # rather than once per exercise
+    exercise_ids = [exercise_tuple[2] for exercise_tuple in st.session_state.session_exercises]
+    songs_by_exercise = get_songs_for_exercises(exercise_ids)
+    phases = get_exercise_phases_by_ids(exercise_ids)
+    # Selected songs that are not among their exercise's recommendations
+    other_songs = {
+        song["music_ref"]: song
+        for song in get_songs_by_refs(
+            exercise_tuple[1]
+            for exercise_tuple in st.session_state.session_exercises
+            if exercise_tuple[1] is not None
+            and all(song["music_ref"] != exercise_tuple[1] for song in songs_by_exercise.get(exercise_tuple[2], []))
+        )
+    }
+    catalogue = []
+
+    def all_songs():
+        # The whole catalogue, for custom song selection; read once per run
+        if not catalogue:
+            catalogue.extend(get_all_songs())
+        return catalogue
+
     total_songs = sum(
         1
         for exercise_tuple in st.session_state.session_exercises
@@ -67,7 +110,7 @@ def render_session_list():
         song_ref = exercise_tuple[1]
         exercise_id = exercise_tuple[2]
         if song_ref is not None:
-            songs = get_songs_for_exercise(exercise_id)
+            songs = songs_by_exercise.get(exercise_id, [])
             song_details = next(
                 (song for song in songs if song["music_ref"] == song_ref), None
             )
@@ -93,7 +136,7 @@ def render_session_list():
         song_ref = exercise_tuple[1]
         exercise_id = exercise_tuple[2]
         if song_ref is not None:
-            songs = get_songs_for_exercise(exercise_id)
+            songs = songs_by_exercise.get(exercise_id, [])
             song_details = next((song for song in songs if song["music_ref"] == song_ref), None)
             if song_details:
                 for k in vivencia_keys:
@@ -115,8 +158,8 @@ def render_session_list():
                 exercise_id,
                 exercise_notes,
             )
-        songs = get_songs_for_exercise(exercise_id)
-        phase = get_exercise_phase_by_id(exercise_id)
+        songs = songs_by_exercise.get(exercise_id, [])
+        phase = phases.get(exercise_id)
         phase_digits = list(str(int(phase))) if phase else []
         phase_text = f"[{','.join(phase_digits)}]" if phase_digits else "[ ]"
         song_options = {"📂 No song selected": None, "🎼 Custom music selection": "__custom__"}
@@ -139,8 +182,7 @@ def render_session_list():
         if selected_song:
             song_details = next((song for song in songs if song["music_ref"] == selected_song), None)
             if not song_details:
-                all_songs = get_all_songs()
-                song_details = next((song for song in all_songs if song["music_ref"] == selected_song), None)
+                song_details = other_songs.get(selected_song)
         if song_details:
             music_title = f"{song_details['title']}"
             if song_details["duration"]:
@@ -163,15 +205,11 @@ def render_session_list():
         # Use a single open_expander_key instead of a set
         if "open_expander_key" not in st.session_state:
             st.session_state.open_expander_key = None
-        with st.expander(
-            expander_title, expanded=(st.session_state.open_expander_key == expander_key)
-        ) as expanded:
-            if expanded:
-                # Set this as the only open expander
-                st.session_state.open_expander_key = expander_key
-            elif st.session_state.open_expander_key == expander_key:
-                # If closed, clear the open expander key
-                st.session_state.open_expander_key = None
+        is_open = st.session_state.open_expander_key == expander_key
+        if is_open:
+            # Reopened once after a move or an edit; the browser keeps it open after that
+            st.session_state.open_expander_key = None
+        with st.expander(expander_title, expanded=is_open):
             st.write(f"**Exercise:** {exercise_name}")
             ctrl_col1, ctrl_col2, ctrl_col3, ctrl_col4 = st.columns([1, 1, 1, 2])
             with ctrl_col1:
@@ -212,14 +250,11 @@ def render_session_list():
                     step=1,
                 )
                 if new_position != i+1:
-                    exercises = st.session_state.session_exercises
-                    tuple_to_move = exercises.pop(i)
                     insert_at = new_position - 1
                     if insert_at > i:
                         insert_at -= 1
-                    exercises.insert(insert_at, tuple_to_move)
+                    move_exercise_to(i, insert_at)
                     st.session_state.open_expander_key = f"expander_{insert_at}_{exercise_id}"
-                    mark_session_changed()
                     st.rerun()
             
             # Always show song selection options, regardless of whether there are recommended songs
@@ -245,11 +280,9 @@ def render_session_list():
                         current_key = k
                         break
                 else:
-                    all_songs = get_all_songs()
-                    for song in all_songs:
-                        if song["music_ref"] == selected_song:
-                            current_key = f"{song['title']} - {song['artist']}"
-                            break
+                    song = other_songs.get(selected_song)
+                    if song:
+                        current_key = f"{song['title']} - {song['artist']}"
                     else:
                         current_key = "📂 No song selected" if songs else "🎼 Select any song from the catalogue"
             
@@ -262,16 +295,19 @@ def render_session_list():
                     if current_key in song_options
                     else 0
                 ),
+                # Picking a song means the candidates are being auditioned:
+                # warm them so switching previews starts at once
+                on_change=prefetch_song_previews,
+                args=(songs,),
             )
             
             if song_options[selected_option] == "__custom__":
-                all_songs = get_all_songs()
                 # Remove the filter textbox and related filtering
                 custom_song_options = {
                     f"{song['title']} - {song['artist']}" +
                     (f"  \U0001F551 {song['duration']}" if song['duration'] else "") +
                     (f"  {get_vivencia_lines(song)}" if get_vivencia_lines(song) else "")
-                    : song["music_ref"] for song in all_songs
+                    : song["music_ref"] for song in all_songs()
                 }
                 custom_current_key = "-- Select a song --"
                 if selected_song:
@@ -291,39 +327,18 @@ def render_session_list():
                     new_song_ref = custom_song_options[custom_selected]
                     if new_song_ref != selected_song:
                         st.session_state.open_expander_key = expander_key
-                        notes = exercise_tuple[3] if len(exercise_tuple) >= 4 else ""
-                        st.session_state.session_exercises[i] = (
-                            exercise_name,
-                            new_song_ref,
-                            exercise_id,
-                            notes,
-                        )
-                        mark_session_changed()
+                        set_exercise_song(i, new_song_ref)
                         st.rerun()
             elif song_options[selected_option] is not None:
                 new_song_ref = song_options[selected_option]
                 if new_song_ref != selected_song:
                     st.session_state.open_expander_key = expander_key
-                    notes = exercise_tuple[3] if len(exercise_tuple) >= 4 else ""
-                    st.session_state.session_exercises[i] = (
-                        exercise_name,
-                        new_song_ref,
-                        exercise_id,
-                        notes,
-                    )
-                    mark_session_changed()
+                    set_exercise_song(i, new_song_ref)
                     st.rerun()
             else:
                 if selected_song is not None:
                     st.session_state.open_expander_key = expander_key
-                    notes = exercise_tuple[3] if len(exercise_tuple) >= 4 else ""
-                    st.session_state.session_exercises[i] = (
-                        exercise_name,
-                        None,
-                        exercise_id,
-                        notes,
-                    )
-                    mark_session_changed()
+                    set_exercise_song(i, None)
                     st.rerun()
             
             # Notes Section - ALWAYS show, regardless of song selection
@@ -336,20 +351,13 @@ def render_session_list():
             )
             if notes_value != exercise_notes:
                 st.session_state.open_expander_key = expander_key
-                st.session_state.session_exercises[i] = (
-                    exercise_name,
-                    selected_song,
-                    exercise_id,
-                    notes_value,
-                )
-                mark_session_changed()
+                set_exercise_notes(i, notes_value)
             
             # Audio Player and Song Details Section - ALWAYS check for selected song
             if selected_song:
                 song_details = next((song for song in songs if song["music_ref"] == selected_song), None)
                 if not song_details:
-                    all_songs = get_all_songs()
-                    song_details = next((song for song in all_songs if song["music_ref"] == selected_song), None)
+                    song_details = other_songs.get(selected_song)
                 
                 if song_details:
                     st.write("---")
@@ -357,7 +365,7 @@ def render_session_list():
                     audio_container = st.container()
                     
                     if file_path and not file_path.startswith("No music file"):
-                        if os.path.exists(file_path):
+                        if library_file_exists(file_path):
                             # Use a session state flag to remember if the audio was loaded for this exercise
                             audio_key = f"audio_loaded_{i}"
                             if audio_key not in st.session_state:
@@ -365,6 +373,8 @@ def render_session_list():
                             if not st.session_state[audio_key]:
                                 load_audio = audio_container.button("Load Audio Player", key=f"load_audio_{i}")
                                 if load_audio:
+                                    # Warm the other candidates too
+                                    prefetch_song_previews(songs)
                                     # Reset all other audio_loaded flags except for this one
                                     for j in range(len(st.session_state.session_exercises)):
                                         other_audio_key = f"audio_loaded_{j}"
@@ -373,8 +383,14 @@ def render_session_list():
                                     st.rerun()
                             if st.session_state[audio_key]:
                                 try:
+                                    # Stream through the audio server when it is running,
+                                    # so the file is not loaded into server memory
+                                    audio_source = (
+                                        audio_stream_url(file_path, st.context.headers.get("Host"))
+                                        or file_path
+                                    )
                                     with st.spinner("Loading audio..."):
-                                        audio_container.audio(file_path, format="audio/*")
+                                        audio_container.audio(audio_source, format="audio/*")
                                 except Exception as e:
                                     audio_container.error(f"Error playing audio: {str(e)}")
                         else:
@@ -404,25 +420,43 @@ def render_session_list():
     
     # Export Playlist Button (after session stats, before exercises)
     session_name = st.session_state.session_metadata.get("name", "Session")
-    export_clicked = st.button("Export Playlist (.m3u)", key="export_playlist_button")
+    # Exports run as background jobs; the job panel in main.py shows their progress
+    from app.ui.job_status import start_job
+    from app.playlists import PLAYLIST_FORMATS
+    format_col, export_col = st.columns([1, 2])
+    with format_col:
+        playlist_format = st.selectbox(
+            "Playlist format",
+            options=list(PLAYLIST_FORMATS.keys()),
+            format_func=lambda fmt: {"m3u": "M3U", "xspf": "XSPF", "pls": "PLS"}[fmt],
+            key="playlist_format",
+            label_visibility="collapsed",
+        )
+    with export_col:
+        export_clicked = st.button("Export Playlist", key="export_playlist_button")
     if export_clicked:
-        from app.exporter import export_playlist
-        export_path, song_count = export_playlist(
-            session_name=session_name,
-            session_exercises=st.session_state.session_exercises
+        start_job(
+            "export_playlist",
+            f"Playlist export of '{session_name}'",
+            session_metadata=dict(st.session_state.session_metadata, name=session_name),
+            session_exercises=list(st.session_state.session_exercises),
+            fmt=playlist_format,
         )
-        if export_path and song_count > 0:
-            st.success(f"Playlist exported to: {export_path} ({song_count} songs)")
-        else:
-            st.warning("No valid .mp3 or .m4a songs found in session. Playlist not created.")
     # Export Session to Word Button (after playlist export)
     export_word_clicked = st.button("Export Session to Word (.docx)", key="export_word_button")
     if export_word_clicked:
-        from app.scripts.export_session_to_word import export_session_to_word
-        session_metadata = st.session_state.session_metadata
-        session_exercises = st.session_state.session_exercises
-        try:
-            word_path = export_session_to_word(session_metadata, session_exercises)
-            st.success(f"Session exported to Word: {word_path}")
-        except Exception as e:
-            st.error(f"Failed to export session to Word: {e}")
+        start_job(
+            "export_word",
+            f"Word export of '{session_name}'",
+            session_metadata=dict(st.session_state.session_metadata),
+            session_exercises=list(st.session_state.session_exercises),
+        )
+    # Export the playlist together with copies of its audio files
+    export_bundle_clicked = st.button("Export Session Bundle (.m3u + audio)", key="export_bundle_button")
+    if export_bundle_clicked:
+        start_job(
+            "export_bundle",
+            f"Bundle export of '{session_name}'",
+            session_name=session_name,
+            session_exercises=list(st.session_state.session_exercises),
+        )
@@ -3,18 +3,80 @@ Exercise Selector UI component for LSB Music App.
 """
 import streamlit as st
 from app.db.queries import get_all_exercises, get_exercises_by_phase, get_exercises_by_song_name, get_exercises_by_cimeb_status
-from app.sessions import mark_session_changed
-from typing import Dict
+from app.library_integrity import get_exercise_playable_counts
+from app.sessions import edit_session_exercises
+from typing import Dict, List, Optional
 
-def add_exercise_to_session(exercise: Dict):
-    exercise_tuple = (
+def _exercise_tuple(exercise: Dict):
+    return (
         f"{exercise['name']} [id {exercise['id']}]",
         None,
         exercise["id"],
         "",
     )
-    st.session_state.session_exercises.append(exercise_tuple)
-    mark_session_changed()
+
+def add_exercise_to_session(exercise: Dict):
+    add_exercises_to_session([exercise])
+
+def add_exercises_to_session(exercises: List[Dict], position: Optional[int] = None):
+    """
+    Add several exercises to the session in a single edit.
+
+    Args:
+        exercises: Exercise rows/dicts to add, in order
+        position: Zero-based index to insert at; appends when None
+    """
+    if not exercises:
+        return
+    session_length = len(st.session_state.session_exercises)
+    if position is None or position > session_length:
+        position = session_length
+    edit_session_exercises(
+        "insert", max(position, 0), [_exercise_tuple(ex) for ex in exercises]
+    )
+
+def _bulk_select_key(category: str) -> str:
+    return f"bulk_select_{category}"
+
+def render_bulk_add_controls(categories: List[str], exercises_by_id: Dict) -> bool:
+    """
+    Render the insert position and the button that adds every exercise
+    ticked in the per-category multiselects in one go.
+
+    Returns:
+        Boolean indicating if exercises were added
+    """
+    selected_ids = [
+        exercise_id
+        for category in categories
+        for exercise_id in st.session_state.get(_bulk_select_key(category), [])
+        if exercise_id in exercises_by_id
+    ]
+    session_length = len(st.session_state.session_exercises)
+    pos_col, button_col = st.columns([1, 1])
+    with pos_col:
+        insert_position = st.number_input(
+            "Insert at position",
+            min_value=1,
+            max_value=session_length + 1,
+            value=session_length + 1,
+            step=1,
+            key="bulk_insert_position",
+        )
+    with button_col:
+        if st.button(
+            f"Add selected ({len(selected_ids)})",
+            key="bulk_add_button",
+            disabled=not selected_ids,
+        ):
+            add_exercises_to_session(
+                [exercises_by_id[exercise_id] for exercise_id in selected_ids],
+                position=insert_position - 1,
+            )
+            # Widget state can only be cleared before the widgets are created
+            st.session_state.bulk_add_reset = True
+            return True
+    return False
 
 def render_exercise_selector(phase: str = "All"):
     st.subheader("Available Exercises")
@@ -61,6 +123,24 @@ def render_exercise_selector(phase: str = "All"):
         exercises_by_category[category].append(ex)
     
     sorted_categories = sorted(exercises_by_category.keys())
+
+    # From the last catalogue file check: no filesystem access here
+    playable_counts = get_exercise_playable_counts()
+
+    bulk_mode = st.toggle(
+        "Select several exercises",
+        key="bulk_add_mode",
+        help="Tick exercises in several categories and add them all with one click",
+    )
+    if st.session_state.pop("bulk_add_reset", False):
+        st.session_state.pop("bulk_insert_position", None)
+        for category in sorted_categories:
+            st.session_state.pop(_bulk_select_key(category), None)
+    if bulk_mode:
+        exercises_by_id = {ex["id"]: ex for ex in exercises}
+        if render_bulk_add_controls(sorted_categories, exercises_by_id):
+            return True
+
     for category in sorted_categories:
         category_exercises = exercises_by_category[category]
         sorted_exercises = sorted(category_exercises, key=lambda ex: ex["name"])
@@ -76,6 +156,16 @@ def render_exercise_selector(phase: str = "All"):
             category_title = f"{category} ({len(category_exercises)} exercises)"
         
         with st.expander(category_title):
+            if bulk_mode:
+                st.multiselect(
+                    "Exercises to add",
+                    options=[ex["id"] for ex in sorted_exercises],
+                    format_func=lambda exercise_id: (
+                        f"{exercises_by_id[exercise_id]['name']} [id {exercise_id}]"
+                    ),
+                    key=_bulk_select_key(category),
+                )
+                continue
             for ex in sorted_exercises:
                 col1, col2, col3 = st.columns([4, 1, 1])
                 with col1:
@@ -85,6 +175,12 @@ def render_exercise_selector(phase: str = "All"):
                         st.caption("🔹 From other facilitators")
                     else:
                         st.write(f"**{ex['name']}** [id {ex['id']}]")
+                    if ex["id"] in playable_counts:
+                        playable, total = playable_counts[ex["id"]]
+                        if playable:
+                            st.caption(f"🎵 {playable} of {total} songs playable")
+                        else:
+                            st.caption(f"⚠️ None of {total} songs playable")
                 with col2:
                     if st.button("Add", key=f"add_{ex['id']}"):
                         add_exercise_to_session(ex)
@@ -0,0 +1,137 @@
+"""
+Progress display and controls for background jobs (exports, catalogue
+reloads, library scans).
+
+The status panel is a fragment that polls the jobs table on a timer while
+jobs are active, so the rest of the page is not re-run and the script
+thread never waits on the work itself.
+"""
+import os
+from pathlib import Path
+
+import streamlit as st
+
+from app.jobs import FINISHED_STATUSES, enqueue_job, poll_job, cancel_job
+
+# Seconds between status polls while a job is queued or running
+JOB_POLL_INTERVAL = 1.0
+
+CATALOGUE_PATH = Path(__file__).parent.parent.parent / "input" / "LSB_Base_flatfile.xlsx"
+
+
+def start_job(kind: str, label: str, **params) -> bool:
+    """Enqueue a job and add it to the status panel of this browser session."""
+    if "background_jobs" not in st.session_state:
+        st.session_state.background_jobs = []
+    job_id = enqueue_job(kind, **params)
+    if not job_id:
+        st.error(f"Could not start: {label}")
+        return False
+    st.session_state.background_jobs.append({"id": job_id, "label": label, "finished": False})
+    return True
+
+
+def _render_result(label: str, job):
+    result = job["result"] or {}
+    if job["status"] == "failed":
+        st.error(f"{label} failed: {job['error']}")
+    elif job["status"] == "cancelled":
+        st.info(f"{label} cancelled")
+    elif job["kind"] == "export_playlist":
+        if result.get("path") and result.get("song_count"):
+            st.success(f"Playlist exported to: {result['path']} ({result['song_count']} songs)")
+        else:
+            st.warning("No valid .mp3 or .m4a songs found in session. Playlist not created.")
+    elif job["kind"] == "export_word":
+        st.success(f"Session exported to Word: {result.get('path')}")
+    elif job["kind"] == "export_bundle":
+        mb = 1024 * 1024
+        st.success(
+            f"Bundle exported to: {result.get('path')} ({result.get('files', 0)} files, "
+            f"{result.get('bytes_copied', 0) / mb:.1f} MB copied at "
+            f"{result.get('throughput', 0) / mb:.1f} MB/s, "
+            f"{result.get('bytes_linked', 0) / mb:.1f} MB linked, "
+            f"{result.get('bytes_skipped', 0) / mb:.1f} MB unchanged)"
+        )
+        if result.get("missing"):
+            st.warning(f"{len(result['missing'])} audio files not found and left out of the playlist")
+    elif job["kind"] == "bulk_export":
+        st.success(f"{result.get('files', 0)} files exported to: {result.get('path')}")
+        for error in result.get("errors", []):
+            st.warning(f"Session {error['session_id']}: {error['error']}")
+    elif job["kind"] == "reload_catalogue":
+        st.success(f"Catalogue reloaded from: {result.get('path')}")
+    elif job["kind"] == "library_scan":
+        st.success(f"Music library: {result.get('found', 0)} of {result.get('songs', 0)} songs playable")
+        problems = result.get("songs", 0) - result.get("found", 0)
+        if problems:
+            st.caption(f"{problems} songs missing or unusable; see Catalogue File Check")
+    elif job["kind"] == "audio_metadata_scan":
+        st.success(
+            f"Audio headers read from {result.get('read', 0)} files "
+            f"({result.get('unreadable', 0)} unreadable) in {result.get('seconds', 0):.1f} s"
+        )
+        if result.get("discrepancies"):
+            st.caption(f"{result['discrepancies']} catalogue durations differ; see Catalogue File Check")
+    else:
+        st.success(f"{label} finished")
+
+
+def _job_panel():
+    jobs = st.session_state.get("background_jobs", [])
+    newly_finished = False
+    for entry in list(jobs):
+        job = poll_job(entry["id"])
+        if job is None:
+            jobs.remove(entry)
+            continue
+
+        if job["status"] in FINISHED_STATUSES:
+            if not entry["finished"]:
+                entry["finished"] = True
+                newly_finished = True
+            result_col, dismiss_col = st.columns([5, 1])
+            with result_col:
+                _render_result(entry["label"], job)
+            with dismiss_col:
+                if st.button("Dismiss", key=f"dismiss_job_{job['id']}"):
+                    jobs.remove(entry)
+                    st.rerun(scope="fragment")
+            continue
+
+        progress_col, cancel_col = st.columns([5, 1])
+        with progress_col:
+            status = job["message"] or job["status"].capitalize()
+            st.progress(job["progress"] or 0.0, text=f"{entry['label']}: {status}")
+        with cancel_col:
+            if st.button("Cancel", key=f"cancel_job_{job['id']}"):
+                cancel_job(job["id"])
+                st.rerun(scope="fragment")
+
+    if newly_finished:
+        # Re-run the whole page so it shows data changed by the job and the
+        # panel stops polling once nothing is active
+        st.rerun(scope="app")
+
+
+def render_job_status():
+    """Render the background job panel, polling only while jobs are active."""
+    jobs = st.session_state.get("background_jobs", [])
+    if not jobs:
+        return
+    active = any(not entry["finished"] for entry in jobs)
+    st.fragment(_job_panel, run_every=JOB_POLL_INTERVAL if active else None)()
+
+
+def render_maintenance_controls():
+    """Sidebar buttons for catalogue reloads and library scans."""
+    st.header("Maintenance")
+    if st.button("Reload Catalogue", key="reload_catalogue_button",
+                 help=f"Reload exercises and music from {CATALOGUE_PATH.name}"):
+        if os.path.exists(CATALOGUE_PATH):
+            start_job("reload_catalogue", "Catalogue reload", excel_path=str(CATALOGUE_PATH))
+        else:
+            st.error(f"Excel file not found at {CATALOGUE_PATH}")
+    if st.button("Scan Music Library", key="library_scan_button",
+                 help="Check which catalogue songs have a playable audio file"):
+        start_job("library_scan", "Library scan")
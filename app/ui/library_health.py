@@ -0,0 +1,167 @@
+"""
+Sidebar panels with the result of the last catalogue file check, the
+catalogue durations that differ from the audio files, and audio preview
+timings.
+
+Everything shown here comes from the song_file_status and audio_metadata
+tables and from in-process counters; the checks themselves run as the
+"library_scan" and "audio_metadata_scan" background jobs. The sidebar is
+drawn on every rerun, so the check results and their CSV report are cached
+until the next check.
+"""
+import csv
+import io
+from datetime import datetime
+
+import streamlit as st
+
+from app.audio_metadata import DURATION_TOLERANCE_SECONDS, get_duration_discrepancies
+from app.audio_prefetch import get_prefetch_stats
+from app.audio_server import get_preview_metrics
+from app.db import schema
+from app.db.queries import get_audio_metadata_generation, get_song_file_check_state, get_song_file_status_counts
+from app.library_integrity import (
+    PLAYABLE_STATUSES,
+    PROBLEM_STATUSES,
+    STATUS_LABELS,
+    get_catalogue_file_problems,
+)
+from app.ui.job_status import start_job
+
+# Problem rows listed in the panel; the CSV report has all of them
+MAX_LISTED_PROBLEMS = 200
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _check_results(db_path: str, root, library_generation, catalogue_generation, checked_at):
+    """
+    Status counts, problem songs and CSV report of one catalogue file
+    check, keyed by the check state (and the database, which benchmarks swap).
+    """
+    problems = get_catalogue_file_problems()
+    return get_song_file_status_counts(), problems, _problems_csv(problems) if problems else ""
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _duration_discrepancies(db_path: str, root, library_generation, catalogue_generation, checked_at,
+                            metadata_generation):
+    """Duration discrepancies, computed once per file check and audio metadata generation."""
+    return get_duration_discrepancies()
+
+
+def _check_key(state):
+    return (str(schema.DB_PATH), state["root"], state["library_generation"], state["catalogue_generation"],
+            state["checked_at"])
+
+
+def _problems_csv(problems) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["MusicRef", "Status", "Music filename", "Title", "Artist", "Matched file"])
+    for row in problems:
+        writer.writerow(
+            [row["music_ref"], STATUS_LABELS[row["status"]], row["filename"], row["title"],
+             row["artist"], row["path"]]
+        )
+    return buffer.getvalue()
+
+
+def _format_seconds(seconds) -> str:
+    return f"{seconds // 60}:{seconds % 60:02}" if seconds is not None else "-"
+
+
+def _render_duration_discrepancies(state):
+    # Matching every measured file to its song is a large join: only on request
+    if not st.toggle("Compare durations with the audio files", key="duration_discrepancies_toggle"):
+        return
+    discrepancies = _duration_discrepancies(*_check_key(state), get_audio_metadata_generation())
+    if not discrepancies:
+        st.caption("No catalogue durations to review (run Read Audio Durations to measure the files).")
+        return
+    mismatched = sum(1 for d in discrepancies if d["difference"] is not None)
+    st.write(
+        f"Durations off by more than {DURATION_TOLERANCE_SECONDS} s: {mismatched}; "
+        f"without a catalogue duration: {len(discrepancies) - mismatched}"
+    )
+    st.dataframe(
+        [
+            {
+                "Ref": d["music_ref"],
+                "Title": d["title"],
+                "Catalogue": _format_seconds(d["catalogue_seconds"]),
+                "File": _format_seconds(d["measured_seconds"]),
+                "Difference (s)": d["difference"],
+            }
+            for d in discrepancies[:MAX_LISTED_PROBLEMS]
+        ],
+        hide_index=True,
+    )
+
+
+def render_library_health_panel():
+    """Render the catalogue file check summary, problem list and report download."""
+    with st.expander("Catalogue File Check"):
+        state = get_song_file_check_state()
+        if not state["checked_at"]:
+            st.caption("The catalogue has not been checked against the music library yet.")
+        else:
+            counts, problems, report = _check_results(*_check_key(state))
+            total = sum(counts.values())
+            playable = sum(counts.get(status, 0) for status in PLAYABLE_STATUSES)
+            checked_at = datetime.fromisoformat(state["checked_at"]).strftime("%Y-%m-%d %H:%M")
+            st.caption(f"Checked {checked_at} against {state['root']}")
+            st.metric("Playable songs", f"{playable} / {total}")
+            for status in PROBLEM_STATUSES:
+                if counts.get(status):
+                    st.write(f"{STATUS_LABELS[status]}: {counts[status]}")
+
+            if problems:
+                st.dataframe(
+                    [
+                        {
+                            "Ref": row["music_ref"],
+                            "Status": STATUS_LABELS[row["status"]],
+                            "Title": row["title"],
+                            "Catalogue file": row["filename"],
+                            "Found": row["path"],
+                        }
+                        for row in problems[:MAX_LISTED_PROBLEMS]
+                    ],
+                    hide_index=True,
+                )
+                st.download_button(
+                    "Download Report (.csv)",
+                    data=report,
+                    file_name="catalogue_file_check.csv",
+                    mime="text/csv",
+                    key="library_health_download",
+                )
+            _render_duration_discrepancies(state)
+
+        if st.button("Check Now", key="library_health_check_button",
+                     help="Rescan changed library folders and match every catalogue song"):
+            start_job("library_scan", "Library scan")
+        if st.button("Read Audio Durations", key="audio_metadata_button",
+                     help="Read duration and bitrate from the headers of new or changed files"):
+            start_job("audio_metadata_scan", "Audio header scan")
+
+
+def render_preview_metrics():
+    """Render the time to first byte of audio previews, prefetched or not."""
+    metrics = get_preview_metrics()
+    if not any(m["requests"] for m in metrics.values()):
+        return
+    with st.expander("Audio Previews"):
+        for name, label in (("prefetched", "Prefetched"), ("cold", "Not prefetched")):
+            m = metrics[name]
+            if m["requests"]:
+                st.write(
+                    f"{label}: first byte in {m['p50_ms']:.1f} ms (p50), "
+                    f"{m['p95_ms']:.1f} ms (p95) over {m['requests']} requests"
+                )
+        stats = get_prefetch_stats()
+        mb = 1024 * 1024
+        st.caption(
+            f"{stats['tracks']} tracks warm, {stats['bytes'] / mb:.1f} of "
+            f"{stats['budget_bytes'] / mb:.0f} MB prefetch budget used"
+        )